@@ -0,0 +1,110 @@
+# benchmarks/bench_database_merge.py
+"""Время слияния результатов парсинга с базой магазинов
+
+В базе N магазинов, парсинг возвращает N записей: 90% уже есть в базе
+(из них десятая часть с новым телефоном), 10% новых.
+
+Запуск:
+    python benchmarks/bench_database_merge.py [--sizes 10000 100000 1000000] [--legacy-limit 10000]
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.database import PyroDatabase, SqlitePyroDatabase
+
+
+def make_shop(i: int, phone: str = "+79180000000") -> dict:
+    return {
+        "Название магазина": f"Пиротехника №{i}",
+        "Адрес": f"Ростов-на-Дону, ул. Садовая, {i}",
+        "Телефон": phone,
+        "Сайт": f"https://shop{i}.ru",
+        "Ссылка": f"https://yandex.ru/maps/org/shop_{i}/{1000000 + i}",
+        "Город": "Ростов-на-Дону",
+    }
+
+
+def make_run(size: int) -> list:
+    existing = int(size * 0.9)
+    run = [make_shop(i, "+79181111111" if i % 10 == 0 else "+79180000000") for i in range(existing)]
+    run += [make_shop(size + i) for i in range(size - existing)]
+    return run
+
+
+def legacy_merge(db: PyroDatabase, records: list):
+    """Слияние, как было раньше: линейный поиск по списку на каждую запись"""
+    for shop_data in records:
+        shop_id = db.extract_id(shop_data["Ссылка"])
+        existing = next((shop for shop in db.db["shops"] if shop.get("id") == shop_id), None)
+        if existing:
+            existing.update({key: shop_data[key] for key in ("Название магазина", "Адрес", "Телефон", "Сайт")})
+        else:
+            db.db["shops"].append(dict(shop_data, id=shop_id))
+
+
+def timed(func, *args):
+    started = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - started
+
+
+def bench(size: int, legacy_limit: int, workdir: str):
+    print(f"\n📦 Магазинов в базе: {size:,}".replace(',', ' '))
+    run = make_run(size)
+
+    # JSON база с индексом
+    json_file = os.path.join(workdir, f"db_{size}.json")
+    seed = PyroDatabase(json_file)
+    seed.bulk_upsert(make_shop(i) for i in range(size))
+    seed.save_db()
+    del seed
+
+    db, load_time = timed(PyroDatabase, json_file)
+    counts, merge_time = timed(db.bulk_upsert, run)
+    _, save_time = timed(db.save_db)
+    print(f"   JSON + индекс:  загрузка {load_time:7.2f} с, слияние {merge_time:7.2f} с, "
+          f"сохранение {save_time:7.2f} с  {counts}")
+
+    if size <= legacy_limit:
+        db = PyroDatabase(json_file)
+        db.db = json.loads(json.dumps(db.db))
+        _, legacy_time = timed(legacy_merge, db, run)
+        print(f"   JSON, перебор:  слияние {legacy_time:7.2f} с")
+    else:
+        print(f"   JSON, перебор:  пропущено (больше --legacy-limit)")
+
+    # SQLite
+    sqlite_file = os.path.join(workdir, f"db_{size}.sqlite")
+    seed = SqlitePyroDatabase(sqlite_file)
+    seed.bulk_upsert(make_shop(i) for i in range(size))
+    seed.save_db()
+    seed.close()
+
+    db, load_time = timed(SqlitePyroDatabase, sqlite_file)
+    counts, merge_time = timed(db.bulk_upsert, run)
+    _, save_time = timed(db.save_db)
+    db.close()
+    print(f"   SQLite:         открытие {load_time:7.2f} с, слияние {merge_time:7.2f} с, "
+          f"фиксация  {save_time:7.2f} с  {counts}")
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000])
+    arg_parser.add_argument('--legacy-limit', type=int, default=10000,
+                            help='Старый способ (O(n·m)) запускается только для баз не больше этого размера')
+    args = arg_parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        for size in args.sizes:
+            bench(size, args.legacy_limit, workdir)
+
+
+if __name__ == '__main__':
+    main()
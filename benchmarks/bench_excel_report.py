@@ -0,0 +1,81 @@
+# benchmarks/bench_excel_report.py
+"""Пиковая память и время create_excel_report: обычный режим и constant_memory
+
+Каждый замер - отдельный процесс (пиковое RSS процесса не сбрасывается).
+В базе N магазинов, спарсено N/2, новых N/10. Обычный режим получает списки,
+потоковый - генераторы.
+
+Запуск:
+    python benchmarks/bench_excel_report.py [--sizes 10000 100000 500000]
+"""
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def make_shops(count: int, start: int = 0, found: bool = True):
+    for i in range(start, start + count):
+        yield {
+            "Название магазина": f"Пиротехника №{i}",
+            "Адрес": f"Ростов-на-Дону, ул. Садовая, {i}",
+            "Телефон": "+79180000000",
+            "Сайт": f"https://shop{i}.ru" if i % 2 else "",
+            "Ссылка": f"https://yandex.ru/maps/org/shop_{i}/{1000000 + i}",
+            "Дата сбора": "2025-12-10 12:00:00",
+            "Дата добавления": "2025-12-01 12:00:00",
+            "Дата последнего обнаружения": "2025-12-10 12:00:00",
+            "Обнаружен_в_последнем_парсинге": found,
+        }
+
+
+def run_child(size: int, mode: str):
+    """Один замер в текущем процессе; печатает время и пиковое RSS"""
+    from core.excel_report import create_excel_report
+
+    streaming = mode == 'constant_memory'
+    new = make_shops(size // 10)
+    parsed = make_shops(size // 2)
+    all_shops = make_shops(size)
+    if not streaming:
+        new, parsed, all_shops = list(new), list(parsed), list(all_shops)
+
+    os.chdir(tempfile.mkdtemp())
+    started = time.perf_counter()
+    path = create_excel_report(new, parsed, all_shops, 'bench.xlsx', constant_memory=streaming)
+    elapsed = time.perf_counter() - started
+
+    # ru_maxrss в Linux - КБ
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"{elapsed:.2f} {peak_mb:.0f} {os.path.getsize(path) // 1024}")
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 500000])
+    arg_parser.add_argument('--child', nargs=2, metavar=('SIZE', 'MODE'), help=argparse.SUPPRESS)
+    args = arg_parser.parse_args()
+
+    if args.child:
+        run_child(int(args.child[0]), args.child[1])
+        return
+
+    print(f"{'Магазинов':>10} {'Режим':<16} {'Время, с':>9} {'Пик RSS, МБ':>12} {'Файл, КБ':>9}")
+    for size in args.sizes:
+        for mode in ('default', 'constant_memory'):
+            output = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), '--child', str(size), mode],
+                capture_output=True, text=True, check=True
+            ).stdout.split()
+            elapsed, peak_mb, file_kb = output[-3:]
+            print(f"{size:>10} {mode:<16} {elapsed:>9} {peak_mb:>12} {file_kb:>9}")
+
+
+if __name__ == '__main__':
+    main()
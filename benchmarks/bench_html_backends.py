@@ -0,0 +1,84 @@
+# benchmarks/bench_html_backends.py
+"""Сравнение HTML-парсеров parse_store_data на сохраненных страницах организаций
+
+Запуск:
+    python benchmarks/bench_html_backends.py [файлы или папки с .html] [--repeat 20] [--inflate 200]
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from parser import YandexPyroParser
+from parser.html_backends import HTML_BACKENDS
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+
+def load_fixtures(paths, inflate: int):
+    """Читаем страницы; inflate добавляет блоки отзывов для имитации больших страниц"""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(glob.glob(os.path.join(path, '*.html'))))
+        else:
+            files.append(path)
+
+    pages = []
+    for file in files:
+        with open(file, 'r', encoding='utf-8') as f:
+            html = f.read()
+        if inflate > 1 and '</body>' in html:
+            filler = ''.join(
+                f'<div class="business-review-view"><div class="business-review-view__author">Автор {i}</div>'
+                f'<span class="business-review-view__body">Хороший выбор фейерверков, отзыв №{i}</span>'
+                f'<a class="business-review-view__link" href="/maps/org/x/1/reviews/?review={i}">Ответить</a></div>'
+                for i in range(inflate * 10)
+            )
+            html = html.replace('</body>', filler + '</body>')
+        pages.append((os.path.basename(file), html))
+    return pages
+
+
+def without_date(data):
+    if not data:
+        return data
+    return {k: v for k, v in data.items() if k != 'Дата сбора'}
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument('paths', nargs='*', default=[FIXTURES_DIR])
+    arg_parser.add_argument('--repeat', type=int, default=20)
+    arg_parser.add_argument('--inflate', type=int, default=200)
+    args = arg_parser.parse_args()
+
+    pages = load_fixtures(args.paths, args.inflate)
+    if not pages:
+        print("❌ Не найдено HTML-файлов")
+        return
+
+    parsers = {}
+    for name in HTML_BACKENDS:
+        try:
+            parsers[name] = YandexPyroParser(html_backend=name)
+        except ImportError as e:
+            print(f"⚠ {name} не установлен: {e}")
+
+    print(f"{'Страница':<30} {'Размер':>10} {'Парсер':<12} {'мс/стр':>10} {'Совпадает с bs4':>16}")
+    for page_name, html in pages:
+        reference = without_date(parsers['bs4'].parse_store_data('https://yandex.ru/maps/org/x/1', html))
+        for name, parser in parsers.items():
+            started = time.perf_counter()
+            for _ in range(args.repeat):
+                data = parser.parse_store_data('https://yandex.ru/maps/org/x/1', html)
+            elapsed = (time.perf_counter() - started) / args.repeat * 1000
+            same = 'да' if without_date(data) == reference else 'НЕТ'
+            print(f"{page_name[:30]:<30} {len(html) // 1024:>8}КБ {name:<12} {elapsed:>10.1f} {same:>16}")
+
+
+if __name__ == '__main__':
+    main()
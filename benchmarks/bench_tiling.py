@@ -0,0 +1,156 @@
+# benchmarks/bench_tiling.py
+"""Покрытие и число скроллов: 6 фиксированных областей против квадродерева
+
+Модель выдачи: в области видны магазины внутри окна карты, список отсортирован
+по популярности и обрезан лимитом выдачи (--cap), за скролл подгружается
+--page карточек. Магазины: половина в плотном центре, остальные равномерно по
+городу. Фиксированные области прокручиваются по старому правилу (стоп после
+3 скроллов без новых для всего запуска ссылок). Квадродерево прокручивается до
+конца своего списка (ListScroller: признак конца списка под полным списком
+или stall_limit скроллов без роста), а делящаяся область - только до --probe
+результатов (схема «квадро-50» - до насыщения, как без probe). Повторные
+попадания - ссылки, уже найденные в других областях; областей - это загрузки
+страниц поиска.
+
+Схемы не равноценны: 6 зон дешевле по скроллам, но при сотнях магазинов
+находят лишь малую их часть. Квадродерево платит за полное покрытие
+дополнительными областями и скроллами, probe уменьшает повторные попадания
+и скроллы ценой лишних загрузок областей.
+
+Запуск:
+    python benchmarks/bench_tiling.py [--shops 100 300 1000] [--cap 50] [--page 10] [--probe 10]
+"""
+import argparse
+import math
+import os
+import random
+import sys
+from collections import deque
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from parser.scroller import ListScroller
+from parser.tiling import ROSTOV_BBOX, TilePlanner
+
+NO_NEW_LIMIT = 3
+MAX_SCROLLS = 30
+
+# Прежние области: (центр, размер окна)
+FIXED_AREAS = [
+    ((39.720451, 47.232724), (0.672226, 0.318267)),
+    ((39.720451, 47.232724), (0.336113, 0.159133)),
+    ((39.720451, 47.282724), (0.336113, 0.159133)),
+    ((39.720451, 47.182724), (0.336113, 0.159133)),
+    ((39.620451, 47.232724), (0.336113, 0.159133)),
+    ((39.820451, 47.232724), (0.336113, 0.159133)),
+]
+
+
+def make_shops(count: int, seed: int = 1):
+    """(долгота, широта, популярность) магазинов"""
+    rng = random.Random(seed)
+    west, south, east, north = ROSTOV_BBOX
+    center_lon, center_lat = (west + east) / 2, (south + north) / 2
+    shops = []
+    for i in range(count):
+        if i % 2:
+            lon, lat = rng.uniform(west, east), rng.uniform(south, north)
+        else:
+            lon = min(max(rng.gauss(center_lon, 0.04), west), east - 1e-9)
+            lat = min(max(rng.gauss(center_lat, 0.02), south), north - 1e-9)
+        shops.append((lon, lat, rng.random()))
+    return shops
+
+
+def search(area, shops, cap: int):
+    """Номера магазинов в выдаче области по популярности"""
+    visible = [i for i, (lon, lat, _) in enumerate(shops) if TilePlanner.contains(area, lon, lat)]
+    visible.sort(key=lambda i: -shops[i][2])
+    return visible[:cap]
+
+
+def scroll(results, found: set, page: int, global_stop: bool, limit: int = None,
+           no_new_limit: int = NO_NEW_LIMIT, cap: int = None):
+    """Прокрутка списка: (скроллов, попаданий, новых, дошли до конца)
+
+    limit - насыщенность: дальше прокручивать нет смысла, область будет разделена;
+    cap - лимит выдачи: список короче него заканчивается признаком конца
+    (ListScroller), прежнее правило признак не учитывает (cap=None)
+    """
+    scrolls = hits = new = no_new = 0
+    area_seen = set()
+    pages = math.ceil(len(results) / page)
+
+    while scrolls < MAX_SCROLLS:
+        chunk = results[scrolls * page:(scrolls + 1) * page] if scrolls < pages else []
+        scrolls += 1
+
+        added_area = [i for i in chunk if i not in area_seen]
+        added_global = [i for i in added_area if i not in found]
+        area_seen.update(added_area)
+        hits += len(added_area)
+        new += len(added_global)
+        found.update(added_area)
+
+        if cap and scrolls * page >= len(results) and len(results) < cap:
+            return scrolls, hits, new, True
+        no_new = 0 if (added_global if global_stop else added_area) else no_new + 1
+        if no_new >= no_new_limit:
+            return scrolls, hits, new, True
+        if limit and hits >= limit:
+            break
+    return scrolls, hits, new, False
+
+
+def run_fixed(shops, cap: int, page: int):
+    found = set()
+    totals = [0, 0, 0, 0]
+    for (lon, lat), (span_lon, span_lat) in FIXED_AREAS:
+        area = {"ll": [lon, lat], "spn": [span_lon, span_lat]}
+        scrolls, hits, new, _ = scroll(search(area, shops, cap), found, page, global_stop=True)
+        totals = [totals[0] + 1, totals[1] + scrolls, totals[2] + hits, totals[3] + new]
+    return totals, found
+
+
+def run_quadtree(shops, cap: int, page: int, max_depth: int, probe: int = None):
+    planner = TilePlanner(saturation=cap, max_depth=max_depth, probe=probe)
+    found = set()
+    totals = [0, 0, 0, 0]
+    pending = deque(planner.root())
+    while pending:
+        area = pending.popleft()
+        scrolls, hits, new, ended = scroll(search(area, shops, cap), found, page, global_stop=False,
+                                           limit=planner.scroll_limit(area),
+                                           no_new_limit=ListScroller().stall_limit, cap=cap)
+        totals = [totals[0] + 1, totals[1] + scrolls, totals[2] + hits, totals[3] + new]
+        pending.extend(planner.split(area, hits, ended))
+    return totals, found
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument('--shops', type=int, nargs='+', default=[100, 300, 1000])
+    arg_parser.add_argument('--cap', type=int, default=50, help="Лимит выдачи в одной области")
+    arg_parser.add_argument('--page', type=int, default=10, help="Карточек за один скролл")
+    arg_parser.add_argument('--max-depth', type=int, default=3)
+    arg_parser.add_argument('--probe', type=int, default=10,
+                            help="Результатов в делящейся области до решения о делении")
+    args = arg_parser.parse_args()
+
+    print(f"{'Магазинов':>10} {'Схема':<10} {'Областей':>9} {'Скроллов':>9} "
+          f"{'Попаданий':>10} {'Повторных':>10} {'Покрытие':>9} {'Скроллов/магазин':>17}")
+    for count in args.shops:
+        shops = make_shops(count)
+        for name, (totals, found) in (
+                ('6 зон', run_fixed(shops, args.cap, args.page)),
+                (f'квадро-{args.cap}', run_quadtree(shops, args.cap, args.page, args.max_depth, args.cap)),
+                (f'квадро-{args.probe}', run_quadtree(shops, args.cap, args.page, args.max_depth, args.probe))):
+            areas, scrolls, hits, new = totals
+            coverage = f"{len(found) / count * 100:.1f}%"
+            per_shop = f"{scrolls / len(found):.2f}" if found else "-"
+            print(f"{count:>10} {name:<10} {areas:>9} {scrolls:>9} {hits:>10} {hits - new:>10} "
+                  f"{coverage:>9} {per_shop:>17}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,12 +1,16 @@
-import json
+import os
 from datetime import datetime
 
+from core.database import PyroDatabase
+
 
 def check_database():
     """Проверяем состояние базы данных"""
     try:
-        with open("data/database.json", 'r', encoding='utf-8') as f:
-            db = json.load(f)
+        if not os.path.exists("data/database.json"):
+            raise FileNotFoundError("data/database.json")
+        # Снимок вместе с журналом изменений
+        db = PyroDatabase("data/database.json").db
 
         print("=" * 60)
         print("📊 ПРОВЕРКА БАЗЫ ДАННЫХ")
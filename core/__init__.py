@@ -1,3 +1,8 @@
 # core/__init__.py
+from .database import *
 from .excel_report import *
-
+from .history import *
+from .report_model import *
+from .report_stage import *
+from .report_writers import *
+from .shop_keys import *
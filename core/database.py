@@ -0,0 +1,691 @@
+import json
+import os
+import sqlite3
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from .run_diff import RunDiff, card_changes
+from .shop_keys import shop_key
+
+__all__ = ['PyroDatabase', 'SqlitePyroDatabase', 'SqliteShopsReader', 'open_database', 'DEFAULT_CITY']
+
+# Город магазинов, записанных до появления поля 'Город'
+DEFAULT_CITY = "Ростов-на-Дону"
+
+
+def shop_city(shop: Dict) -> str:
+    """Город магазина (в старых записях города нет - город по умолчанию)"""
+    return shop.get("Город") or DEFAULT_CITY
+
+
+class PyroDatabase:
+    """Простая JSON база данных для магазинов
+
+    database.json - снимок базы. Изменения каждого запуска дописываются в журнал
+    рядом (database.journal.jsonl), а при загрузке применяются поверх снимка.
+    Когда журнал разрастается, снимок переписывается целиком (compact).
+    """
+
+    # Журнал сворачивается в снимок, когда в нем больше записей, чем магазинов в базе
+    COMPACT_MIN_RECORDS = 1000
+
+    def __init__(self, db_file="data/database.json"):
+        self.db_file = db_file
+        self.journal_file = os.path.splitext(db_file)[0] + ".journal.jsonl"
+        os.makedirs(os.path.dirname(db_file), exist_ok=True)
+        self.db = self._load_db()
+        # Индекс ID -> магазин, ссылается на те же словари, что и список shops
+        self.index: Dict[str, Dict] = {shop.get("id"): shop for shop in self.db["shops"]}
+
+        # Изменения, еще не записанные в журнал
+        self.pending: List[Dict] = []
+        self.pending_ids = set()
+        self.journal_records = self._replay_journal()
+
+    def _load_db(self) -> Dict:
+        """Загружаем базу или создаем новую"""
+        if os.path.exists(self.db_file):
+            try:
+                with open(self.db_file, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+            except:
+                pass
+
+        # Создаем новую базу
+        return {
+            "last_update": None,
+            "total_shops": 0,
+            "shops": []
+        }
+
+    def _replay_journal(self) -> int:
+        """Применяем журнал изменений поверх снимка
+
+        Возвращает количество примененных записей
+        """
+        if not os.path.exists(self.journal_file):
+            return 0
+
+        applied = 0
+        valid_size = 0
+        with open(self.journal_file, 'rb') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break
+                if not line.endswith(b"\n"):
+                    break
+                valid_size += len(line)
+                applied += 1
+
+                if record["op"] == "upsert":
+                    shop = record["shop"]
+                    existing = self.index.get(shop["id"])
+                    if existing is None:
+                        self.db["shops"].append(shop)
+                        self.index[shop["id"]] = shop
+                    else:
+                        existing.clear()
+                        existing.update(shop)
+                elif record["op"] == "unfound_all":
+                    self._reset_found(record.get("cities"))
+                elif record["op"] == "meta":
+                    self.db["last_update"] = record["last_update"]
+
+        # Запись оборвалась при падении процесса - отрезаем ее
+        if valid_size < os.path.getsize(self.journal_file):
+            with open(self.journal_file, 'r+b') as f:
+                f.truncate(valid_size)
+
+        self.db["total_shops"] = len(self.db["shops"])
+        return applied
+
+    def _log_shop(self, shop: Dict):
+        """Магазин изменился - в журнал попадет его итоговое состояние"""
+        if shop["id"] not in self.pending_ids:
+            self.pending_ids.add(shop["id"])
+            self.pending.append({"op": "upsert", "shop": shop})
+
+    def _log_op(self, record: Dict):
+        """Операция над всей базой; изменения магазинов после нее пишутся отдельно"""
+        self.pending.append(record)
+        self.pending_ids.clear()
+
+    def save_db(self):
+        """Сохраняем базу
+
+        Дописываем в журнал только изменения этого запуска. Снимок переписывается,
+        когда журнал становится больше самой базы.
+        """
+        if self.pending:
+            with open(self.journal_file, 'a', encoding='utf-8') as f:
+                for record in self.pending:
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            self.journal_records += len(self.pending)
+            self.pending = []
+            self.pending_ids.clear()
+
+        if self.journal_records > max(self.COMPACT_MIN_RECORDS, len(self.db["shops"])):
+            self.compact()
+
+    def compact(self):
+        """Переписываем снимок целиком и очищаем журнал
+
+        Снимок пишется во временный файл и подменяется атомарно. Если процесс
+        упадет до очистки журнала, повторное применение журнала даст то же состояние.
+        """
+        tmp_file = f"{self.db_file}.{os.getpid()}.tmp"
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(self.db, f, ensure_ascii=False, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, self.db_file)
+
+        if os.path.exists(self.journal_file):
+            os.remove(self.journal_file)
+        self.journal_records = 0
+
+    def set_last_update(self, value: str = None):
+        """Время последнего обновления базы"""
+        self.db["last_update"] = value or datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        self._log_op({"op": "meta", "last_update": self.db["last_update"]})
+
+    def extract_id(self, url: str) -> str:
+        """Извлекаем уникальный ID магазина (см. core.shop_keys.shop_key)"""
+        return shop_key(url)
+
+    def find_shop_by_id(self, shop_id: str) -> Dict:
+        """Находим магазин по ID"""
+        return self.index.get(shop_id)
+
+    def add_or_update_shop(self, shop_data: Dict, seen_at: str = None) -> tuple:
+        """
+        Добавляем новый магазин или обновляем существующий
+
+        seen_at - время обнаружения (по умолчанию текущее)
+
+        Возвращает: (shop, is_new)
+        """
+        current_time = seen_at or datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        shop, status, _ = self._upsert(shop_data, current_time)
+        return shop, status == "new"
+
+    def bulk_upsert(self, records, seen_at: str = None) -> Dict[str, int]:
+        """Добавляем или обновляем магазины одним проходом
+
+        Возвращает: {"new": ..., "updated": ..., "unchanged": ...}, где updated -
+        изменились данные карточки, unchanged - магазин просто найден снова
+        """
+        current_time = seen_at or datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        counts = {"new": 0, "updated": 0, "unchanged": 0}
+        for shop_data in records:
+            _, status, _ = self._upsert(shop_data, current_time)
+            counts[status] += 1
+        return counts
+
+    def merge_run(self, records, fresh_urls: List[str] = (), seen_at: str = None,
+                  cities: Optional[Iterable[str]] = None) -> RunDiff:
+        """Слияние результатов запуска с базой
+
+        Один проход по результатам (добавление и обновление магазинов) и один
+        по базе (флаги обнаружения и пропавшие магазины). Заменяет
+        mark_all_unfound + add_or_update_shop + mark_seen + get_new_shops.
+
+        cities - города, которые обходил запуск: флаги обнаружения и пропавшие
+        магазины считаются только среди них, магазины других городов не
+        трогаются (None - вся база)
+        """
+        current_time = seen_at or datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        diff = RunDiff()
+        cities = sorted(set(cities)) if cities is not None else None
+        # В журнале сброс флагов идет раньше изменений магазинов этого запуска
+        self._log_op({"op": "unfound_all", "cities": cities} if cities is not None else {"op": "unfound_all"})
+
+        for shop_data in records:
+            diff.add(*self._upsert(shop_data, current_time))
+
+        for url in fresh_urls:
+            shop = self.index.get(self.extract_id(url))
+            if shop and diff.add_fresh(shop):
+                shop["Дата последнего обнаружения"] = current_time
+                self._log_shop(shop)
+
+        for shop in self.db["shops"]:
+            if cities is not None and shop_city(shop) not in cities:
+                continue
+            found = shop["id"] in diff.seen_ids
+            shop["Обнаружен_в_последнем_парсинге"] = found
+            if not found:
+                diff.missing.append(shop)
+
+        return diff
+
+    def _upsert(self, shop_data: Dict, current_time: str) -> tuple:
+        """Возвращает: (shop, status, changes), status - new, updated или unchanged"""
+        url = shop_data.get("Ссылка", "")
+        shop_id = self.extract_id(url)
+
+        existing = self.index.get(shop_id)
+
+        if existing:
+            # Обновляем существующий магазин
+            changes = card_changes(existing, shop_data)
+            existing.update({key: new for key, (_, new) in changes.items()})
+            existing.update({
+                "Дата последнего обнаружения": current_time,
+                "Дата обновления карточки": current_time,
+                "Дата сбора": current_time,
+                "Обнаружен_в_последнем_парсинге": True
+            })
+            self._log_shop(existing)
+            return existing, "updated" if changes else "unchanged", changes
+
+        else:
+            # Добавляем новый магазин
+            new_shop = {
+                "id": shop_id,
+                "Название магазина": shop_data.get("Название магазина", ""),
+                "Адрес": shop_data.get("Адрес", ""),
+                "Телефон": shop_data.get("Телефон", ""),
+                "Сайт": shop_data.get("Сайт", ""),
+                "Ссылка": url,
+                "Город": shop_data.get("Город", DEFAULT_CITY),
+                "Дата добавления": current_time,
+                "Дата последнего обнаружения": current_time,
+                "Дата обновления карточки": current_time,
+                "Дата сбора": current_time,  # Для Excel отчета
+                "Обнаружен_в_последнем_парсинге": True
+            }
+
+            self.db["shops"].append(new_shop)
+            self.index[shop_id] = new_shop
+            self.db["total_shops"] += 1
+            self._log_shop(new_shop)
+            return new_shop, "new", None
+
+    def mark_seen(self, urls: List[str], seen_at: str = None) -> List[Dict]:
+        """Отмечаем магазины найденными без обновления данных карточки
+
+        Возвращает: список отмеченных магазинов
+        """
+        current_time = seen_at or datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        seen = []
+        for url in urls:
+            shop = self.find_shop_by_id(self.extract_id(url))
+            if shop:
+                shop["Дата последнего обнаружения"] = current_time
+                shop["Обнаружен_в_последнем_парсинге"] = True
+                self._log_shop(shop)
+                seen.append(shop)
+        return seen
+
+    def mark_all_unfound(self, cities: Optional[Iterable[str]] = None):
+        """Помечаем магазины как не найденные в текущем парсинге (все или только городов cities)"""
+        cities = sorted(set(cities)) if cities is not None else None
+        self._reset_found(cities)
+        self._log_op({"op": "unfound_all", "cities": cities} if cities is not None else {"op": "unfound_all"})
+
+    def _reset_found(self, cities: Optional[List[str]] = None):
+        for shop in self.db.get("shops", []):
+            if cities is None or shop_city(shop) in cities:
+                shop["Обнаружен_в_последнем_парсинге"] = False
+
+    def get_new_shops(self) -> List[Dict]:
+        """Получаем магазины, добавленные в последнем парсинге"""
+        new_shops = []
+        for shop in self.db.get("shops", []):
+            # Магазин считается новым, если дата добавления = дате последнего обновления
+            if shop.get("Дата добавления") == shop.get("Дата последнего обнаружения"):
+                # Добавляем дату сбора для отчета
+                shop_with_date = shop.copy()
+                shop_with_date["Дата сбора"] = shop.get("Дата последнего обнаружения", "")
+                new_shops.append(shop_with_date)
+        return new_shops
+
+    def get_all_shops_for_excel(self) -> List[Dict]:
+        """Получаем все магазины для Excel (сами записи базы, без копирования)"""
+        # Сортируем по дате последнего обнаружения (новые сверху)
+        return sorted(self.db.get("shops", []),
+                      key=lambda shop: shop.get("Дата последнего обнаружения", ""), reverse=True)
+
+    def get_city_shops_for_excel(self, city: str) -> List[Dict]:
+        """Магазины одного города для отчета (новые сверху)
+
+        Копии записей: отчет сериализуется в процесс пула в фоновом потоке,
+        пока следующий город уже обновляет базу.
+        """
+        return [dict(shop) for shop in self.get_all_shops_for_excel() if shop_city(shop) == city]
+
+    def get_stats(self) -> Dict:
+        """Статистика базы"""
+        total = self.db.get("total_shops", 0)
+        found_in_last = sum(1 for s in self.db.get("shops", [])
+                            if s.get("Обнаружен_в_последнем_парсинге", False))
+
+        return {
+            "total_shops": total,
+            "found_in_last_parse": found_in_last,
+            "missing_in_last_parse": total - found_in_last,
+            "last_update": self.db.get("last_update")
+        }
+
+
+class SqlitePyroDatabase(PyroDatabase):
+    """База магазинов в SQLite с тем же интерфейсом, что и PyroDatabase
+
+    Магазины хранятся в таблице с первичным ключом по ID, поиск и обновление
+    не требуют перебора всей базы. Изменения копятся в одной транзакции и
+    фиксируются в save_db.
+    """
+
+    # Поле магазина -> колонка таблицы
+    FIELDS = {
+        "id": "id",
+        "Название магазина": "name",
+        "Адрес": "address",
+        "Телефон": "phone",
+        "Сайт": "site",
+        "Ссылка": "url",
+        "Город": "city",
+        "Дата добавления": "added_at",
+        "Дата последнего обнаружения": "last_seen_at",
+        "Дата обновления карточки": "refreshed_at",
+        "Дата сбора": "collected_at",
+        "Обнаружен_в_последнем_парсинге": "found_in_last_run",
+    }
+
+    # Сколько записей bulk_upsert читает и пишет за один запрос
+    BATCH_SIZE = 500
+
+    def __init__(self, db_file="data/database.sqlite"):
+        self.db_file = db_file
+        os.makedirs(os.path.dirname(db_file) or '.', exist_ok=True)
+
+        self.conn = sqlite3.connect(db_file, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS shops (
+                id TEXT PRIMARY KEY,
+                name TEXT NOT NULL DEFAULT '',
+                address TEXT NOT NULL DEFAULT '',
+                phone TEXT NOT NULL DEFAULT '',
+                site TEXT NOT NULL DEFAULT '',
+                url TEXT NOT NULL DEFAULT '',
+                city TEXT NOT NULL DEFAULT '',
+                added_at TEXT,
+                last_seen_at TEXT,
+                refreshed_at TEXT,
+                collected_at TEXT,
+                found_in_last_run INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS shops_last_seen ON shops (last_seen_at)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS shops_found ON shops (found_in_last_run)")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        self.conn.commit()
+
+        self.columns = list(self.FIELDS.values())
+        self.keys = list(self.FIELDS)
+
+    def close(self):
+        """Закрываем базу"""
+        self.conn.close()
+
+    def _row_to_shop(self, row) -> Dict:
+        shop = dict(zip(self.keys, row))
+        shop["Обнаружен_в_последнем_парсинге"] = bool(shop["Обнаружен_в_последнем_парсинге"])
+        return shop
+
+    def _select(self, where: str = "", params: tuple = ()) -> List[Dict]:
+        rows = self.conn.execute(f"SELECT {', '.join(self.columns)} FROM shops {where}", params)
+        return [self._row_to_shop(row) for row in rows]
+
+    def save_db(self):
+        """Фиксируем накопленные изменения одной транзакцией"""
+        self.conn.commit()
+
+    def set_last_update(self, value: str = None):
+        """Время последнего обновления базы"""
+        value = value or datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('last_update', ?)", (value,))
+
+    def find_shop_by_id(self, shop_id: str) -> Dict:
+        """Находим магазин по ID (копия записи, изменения в базу не попадают)"""
+        shops = self._select("WHERE id = ?", (shop_id,))
+        return shops[0] if shops else None
+
+    def add_or_update_shop(self, shop_data: Dict, seen_at: str = None) -> tuple:
+        """
+        Добавляем новый магазин или обновляем существующий
+
+        seen_at - время обнаружения (по умолчанию текущее)
+
+        Возвращает: (shop, is_new)
+        """
+        current_time = seen_at or datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        shop_id = self.extract_id(shop_data.get("Ссылка", ""))
+        shop, status, _ = self._upsert(shop_data, current_time, self.find_shop_by_id(shop_id))
+        self._flush_upserts([(shop, status)])
+        return shop, status == "new"
+
+    def bulk_upsert(self, records, seen_at: str = None) -> Dict[str, int]:
+        """Добавляем или обновляем магазины пакетами
+
+        Существующие записи читаются одним запросом на пакет, изменения
+        пишутся через executemany. Возвращает: {"new": ..., "updated": ..., "unchanged": ...}
+        """
+        current_time = seen_at or datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        counts = {"new": 0, "updated": 0, "unchanged": 0}
+        for _, status, _ in self._upsert_batches(records, current_time):
+            counts[status] += 1
+        return counts
+
+    def _upsert_batches(self, records, current_time: str):
+        """Пакетный _upsert с записью в таблицу; выдает (shop, status, changes)"""
+        records = list(records)
+        for start in range(0, len(records), self.BATCH_SIZE):
+            batch = [(self.extract_id(shop_data.get("Ссылка", "")), shop_data)
+                     for shop_data in records[start:start + self.BATCH_SIZE]]
+            ids = list({shop_id for shop_id, _ in batch})
+            existing = {shop["id"]: shop for shop in self._select(
+                f"WHERE id IN ({', '.join('?' * len(ids))})", tuple(ids))}
+
+            upserts = []
+            for shop_id, shop_data in batch:
+                upsert = self._upsert(shop_data, current_time, existing.get(shop_id))
+                # Повтор того же магазина в пакете видит предыдущую версию
+                existing[shop_id] = upsert[0]
+                upserts.append(upsert[:2])
+                yield upsert
+            self._flush_upserts(upserts)
+
+    def merge_run(self, records, fresh_urls: List[str] = (), seen_at: str = None,
+                  cities: Optional[Iterable[str]] = None) -> RunDiff:
+        """Слияние результатов запуска с базой (см. PyroDatabase.merge_run)"""
+        current_time = seen_at or datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        diff = RunDiff()
+        cities = sorted(set(cities)) if cities is not None else None
+        self.mark_all_unfound(cities)
+
+        for upsert in self._upsert_batches(records, current_time):
+            diff.add(*upsert)
+
+        fresh = [url for url in fresh_urls if self.extract_id(url) not in diff.seen_ids]
+        for shop in self.mark_seen(fresh, current_time):
+            diff.add_fresh(shop)
+
+        where, params = self._city_filter(cities)
+        diff.missing = self._select(f"WHERE found_in_last_run = 0{where}", params)
+        return diff
+
+    @staticmethod
+    def _city_filter(cities: Optional[List[str]]) -> tuple:
+        """Условие AND по городам магазинов (пустой город - город по умолчанию)"""
+        if cities is None:
+            return "", ()
+        placeholders = ', '.join('?' * len(cities))
+        return f" AND COALESCE(NULLIF(city, ''), ?) IN ({placeholders})", (DEFAULT_CITY, *cities)
+
+    def _upsert(self, shop_data: Dict, current_time: str, existing: Dict = None) -> tuple:
+        """Изменение записи в памяти; в таблицу пишет _flush_upserts"""
+        if existing:
+            changes = card_changes(existing, shop_data)
+            existing.update({key: new for key, (_, new) in changes.items()})
+            existing["Дата последнего обнаружения"] = current_time
+            existing["Дата обновления карточки"] = current_time
+            existing["Дата сбора"] = current_time
+            existing["Обнаружен_в_последнем_парсинге"] = True
+            return existing, "updated" if changes else "unchanged", changes
+
+        url = shop_data.get("Ссылка", "")
+        shop_id = self.extract_id(url)
+        new_shop = {
+            "id": shop_id,
+            "Название магазина": shop_data.get("Название магазина", ""),
+            "Адрес": shop_data.get("Адрес", ""),
+            "Телефон": shop_data.get("Телефон", ""),
+            "Сайт": shop_data.get("Сайт", ""),
+            "Ссылка": url,
+            "Город": shop_data.get("Город", DEFAULT_CITY),
+            "Дата добавления": current_time,
+            "Дата последнего обнаружения": current_time,
+            "Дата обновления карточки": current_time,
+            "Дата сбора": current_time,  # Для Excel отчета
+            "Обнаружен_в_последнем_парсинге": True
+        }
+        return new_shop, "new", None
+
+    def _flush_upserts(self, upserts: List[tuple]):
+        """Записываем результат _upsert: новые - вставкой, остальные - обновлением"""
+        self._insert([shop for shop, status in upserts if status == "new"])
+        self.conn.executemany("""
+            UPDATE shops SET name = ?, address = ?, phone = ?, site = ?,
+                             last_seen_at = ?, refreshed_at = ?, collected_at = ?, found_in_last_run = 1
+            WHERE id = ?
+        """, [(shop["Название магазина"], shop["Адрес"], shop["Телефон"], shop["Сайт"],
+               shop["Дата последнего обнаружения"], shop["Дата обновления карточки"],
+               shop["Дата сбора"], shop["id"])
+              for shop, status in upserts if status != "new"])
+
+    def _insert(self, shops: List[Dict]):
+        """Пакетная вставка; существующие ID перезаписываются"""
+        placeholders = ', '.join('?' * len(self.columns))
+        self.conn.executemany(
+            f"INSERT OR REPLACE INTO shops ({', '.join(self.columns)}) VALUES ({placeholders})",
+            ([shop.get(key) if key != "Обнаружен_в_последнем_парсинге" else int(bool(shop.get(key)))
+              for key in self.keys] for shop in shops)
+        )
+
+    def mark_seen(self, urls: List[str], seen_at: str = None) -> List[Dict]:
+        """Отмечаем магазины найденными без обновления данных карточки
+
+        Возвращает: список отмеченных магазинов
+        """
+        current_time = seen_at or datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        ids = [(current_time, self.extract_id(url)) for url in urls]
+        self.conn.executemany(
+            "UPDATE shops SET last_seen_at = ?, found_in_last_run = 1 WHERE id = ?", ids
+        )
+        seen = []
+        for _, shop_id in ids:
+            shop = self.find_shop_by_id(shop_id)
+            if shop:
+                seen.append(shop)
+        return seen
+
+    def mark_all_unfound(self, cities: Optional[Iterable[str]] = None):
+        """Помечаем магазины как не найденные в текущем парсинге (все или только городов cities)"""
+        where, params = self._city_filter(sorted(set(cities)) if cities is not None else None)
+        self.conn.execute(f"UPDATE shops SET found_in_last_run = 0 WHERE found_in_last_run = 1{where}", params)
+
+    def get_new_shops(self) -> List[Dict]:
+        """Получаем магазины, добавленные в последнем парсинге"""
+        new_shops = self._select("WHERE added_at = last_seen_at")
+        for shop in new_shops:
+            shop["Дата сбора"] = shop.get("Дата последнего обнаружения") or ""
+        return new_shops
+
+    def get_all_shops_for_excel(self) -> List[Dict]:
+        """Получаем все магазины в формате для Excel (новые сверху)"""
+        return list(SqliteShopsReader(self.db_file, conn=self.conn))
+
+    def get_city_shops_for_excel(self, city: str) -> 'SqliteShopsReader':
+        """Магазины одного города для отчета
+
+        Возвращается не список, а читатель: строки читаются курсором в процессе,
+        который строит отчет, и вся база в память не загружается. Изменения
+        должны быть зафиксированы (save_db) до чтения.
+        """
+        return SqliteShopsReader(self.db_file, city)
+
+    def get_stats(self) -> Dict:
+        """Статистика базы"""
+        total, found_in_last = self.conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(found_in_last_run), 0) FROM shops"
+        ).fetchone()
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'last_update'").fetchone()
+
+        return {
+            "total_shops": total,
+            "found_in_last_parse": found_in_last,
+            "missing_in_last_parse": total - found_in_last,
+            "last_update": row[0] if row else None
+        }
+
+    def import_json(self, json_file: str) -> int:
+        """Загружаем магазины из JSON базы PyroDatabase
+
+        Возвращает количество загруженных магазинов
+        """
+        # Через PyroDatabase, чтобы учесть журнал изменений поверх снимка
+        data = PyroDatabase(json_file).db
+
+        shops = []
+        for shop in data.get("shops", []):
+            shop = dict(shop)
+            # В старых базах флаг записан с маленькой буквы
+            if "Обнаружен_в_последнем_парсинге" not in shop:
+                shop["Обнаружен_в_последнем_парсинге"] = shop.get("обнаружен_в_последнем_парсинге", False)
+            shop["id"] = shop.get("id") or self.extract_id(shop.get("Ссылка", ""))
+            shops.append(shop)
+
+        self._insert(shops)
+        if data.get("last_update"):
+            self.set_last_update(data["last_update"])
+        self.save_db()
+        return len(shops)
+
+    def export_json(self, json_file: str):
+        """Сохраняем базу в формате JSON базы PyroDatabase"""
+        shops = self._select()
+        with open(json_file, 'w', encoding='utf-8') as f:
+            json.dump({
+                "last_update": self.get_stats()["last_update"],
+                "total_shops": len(shops),
+                "shops": shops
+            }, f, ensure_ascii=False, indent=2)
+
+
+class SqliteShopsReader:
+    """Магазины SQLite базы в формате для Excel, читаемые курсором (новые сверху)
+
+    Сериализуется как путь к базе и город, поэтому передается в процесс пула
+    отчетов вместо списка; каждый проход открывает свое соединение.
+    """
+
+    def __init__(self, db_file: str, city: str = None, conn: sqlite3.Connection = None):
+        self.db_file = db_file
+        self.city = city
+        self.conn = conn
+
+    def __getstate__(self):
+        return {"db_file": self.db_file, "city": self.city, "conn": None}
+
+    def __iter__(self) -> Iterator[Dict]:
+        conn = self.conn or sqlite3.connect(self.db_file, timeout=30)
+        where, params = SqlitePyroDatabase._city_filter(None if self.city is None else [self.city])
+        try:
+            rows = conn.execute(f"""
+                SELECT name, address, phone, site, url, city, added_at, last_seen_at, found_in_last_run
+                FROM shops WHERE 1 = 1{where} ORDER BY last_seen_at DESC
+            """, params)
+            for name, address, phone, site, url, city, added_at, last_seen_at, found in rows:
+                yield {
+                    "Название магазина": name,
+                    "Адрес": address,
+                    "Телефон": phone,
+                    "Сайт": site,
+                    "Ссылка": url,
+                    "Город": city,
+                    "Дата добавления": added_at or "",
+                    "Дата последнего обнаружения": last_seen_at or "",
+                    "Обнаружен_в_последнем_парсинге": bool(found)
+                }
+        finally:
+            if conn is not self.conn:
+                conn.close()
+
+
+def open_database(db_file: str = "data/database.json") -> PyroDatabase:
+    """Открываем базу нужного формата по расширению файла
+
+    .sqlite/.db - SQLite, иначе JSON. Новая SQLite база при первом запуске
+    заполняется из database.json в той же папке, если есть его снимок или
+    журнал изменений (база, которая еще ни разу не сворачивалась в снимок).
+    """
+    if not db_file.endswith(('.sqlite', '.sqlite3', '.db')):
+        return PyroDatabase(db_file)
+
+    is_new = not os.path.exists(db_file)
+    db = SqlitePyroDatabase(db_file)
+
+    json_file = os.path.join(os.path.dirname(db_file), "database.json")
+    journal_file = os.path.splitext(json_file)[0] + ".journal.jsonl"
+    if is_new and (os.path.exists(json_file) or os.path.exists(journal_file)):
+        imported = db.import_json(json_file)
+        print(f"📥 Перенесено магазинов из {json_file}: {imported}")
+    return db
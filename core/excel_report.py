@@ -1,46 +1,62 @@
 import xlsxwriter
 import os
-from typing import List, Dict
+from typing import Dict, Iterable, List, Tuple
 
+from xlsxwriter.utility import xl_col_to_name
 
-def create_excel_report(new_shops: List[Dict],
-                                 parsed_shops: List[Dict],
-                                 all_shops: List[Dict],
-                                 filename: str = "результаты.xlsx") -> str:
-    """
-    Создает Excel файл с четырьмя вкладками:
-    1. Новые магазины
-    2. Спарсенные магазины (текущий парсинг)
-    3. Все магазины (из базы данных)
-    4. Статистика
+from .report_model import ReportSections
 
-    Args:
-        new_shops: Список новых магазинов
-        parsed_shops: Список магазинов из текущего парсинга
-        all_shops: Список всех магазинов из базы данных
-        filename: Имя файла для сохранения
+__all__ = ['EXCEL_MAX_URLS', 'SheetSchema', 'ReportBuilder', 'DEFAULT_BUILDER', 'create_excel_report']
 
-    Returns:
-        str: Путь к созданному файлу
-    """
-    if not parsed_shops:
-        return ""
+# Ограничение Excel на количество гиперссылок на листе
+EXCEL_MAX_URLS = 65530
 
-    # Создаем папку results если ее нет
-    results_dir = "results"
-    if not os.path.exists(results_dir):
-        os.makedirs(results_dir)
 
-    # Полный путь к файлу
-    full_path = os.path.join(results_dir, filename)
+def _write_link(worksheet, row: int, col: int, url: str, url_fmt):
+    """Гиперссылка, а после лимита Excel - просто текст ссылки
 
-    try:
-        # Создаем книгу Excel
-        workbook = xlsxwriter.Workbook(full_path)
+    xlsxwriter сверх лимита оставляет ячейку пустой и выводит предупреждение
+    """
+    if worksheet.hlink_count < EXCEL_MAX_URLS:
+        worksheet.write_url(row, col, url, url_fmt, url)
+    else:
+        worksheet.write_string(row, col, url, url_fmt)
+
+
+class SheetSchema:
+    """Раскладка листа: заголовки, ширина колонок, закрепление шапки"""
+
+    def __init__(self, title: str, columns: List[Tuple[str, int]], freeze_header: bool = True):
+        self.title = title
+        self.headers = [header for header, _ in columns]
+        # Ширины колонок в формате set_column: ('A:A', 5)
+        self.widths = [(f"{xl_col_to_name(col)}:{xl_col_to_name(col)}", width)
+                       for col, (_, width) in enumerate(columns)]
+        self.freeze_header = freeze_header
+
+    def add_to(self, workbook):
+        """Добавляем лист с настроенными колонками"""
+        worksheet = workbook.add_worksheet(self.title)
+        for columns, width in self.widths:
+            worksheet.set_column(columns, width)
+        if self.freeze_header:
+            worksheet.freeze_panes(1, 0)
+        return worksheet
+
+
+class ReportBuilder:
+    """Построитель Excel-отчета с четырьмя вкладками
+
+    Таблица форматов и раскладки листов собираются один раз в конструкторе,
+    одну схему разделяют все книги построителя. Формат строки вкладки
+    «Все магазины» выбирается по статусу через таблицу STATUS_FORMATS.
+    Объекты Format в xlsxwriter привязаны к книге, поэтому на каждую книгу
+    заводятся только они - по готовой таблице свойств.
+    """
 
-        # ========== СОЗДАНИЕ ФОРМАТОВ ==========
-        # Настраиваем форматы
-        header_format = workbook.add_format({
+    # Свойства форматов: имя -> параметры add_format
+    FORMATS = {
+        'header': {
             'bold': True,
             'bg_color': '#4F81BD',
             'font_color': 'white',
@@ -48,36 +64,32 @@ def create_excel_report(new_shops: List[Dict],
             'valign': 'vcenter',
             'border': 1,
             'text_wrap': True
-        })
-
-        cell_format = workbook.add_format({
+        },
+        'cell': {
             'align': 'left',
             'valign': 'vcenter',
             'border': 1,
             'text_wrap': True
-        })
-
-        url_format = workbook.add_format({
+        },
+        'url': {
             'font_color': 'blue',
             'underline': 1,
             'align': 'left',
             'valign': 'vcenter',
             'border': 1,
             'text_wrap': True
-        })
-
-        # Формат для выделения новых магазинов (зеленый)
-        new_shop_format = workbook.add_format({
+        },
+        # Выделение новых магазинов (зеленый)
+        'new': {
             'bold': True,
             'bg_color': '#C6EFCE',  # Светло-зеленый
             'align': 'left',
             'valign': 'vcenter',
             'border': 1,
             'text_wrap': True
-        })
-
-        # Формат для ссылок в новых магазинах
-        new_shop_url_format = workbook.add_format({
+        },
+        # Ссылки в новых магазинах
+        'new_url': {
             'font_color': 'blue',
             'underline': 1,
             'bg_color': '#C6EFCE',  # Светло-зеленый фон
@@ -85,301 +97,257 @@ def create_excel_report(new_shops: List[Dict],
             'valign': 'vcenter',
             'border': 1,
             'text_wrap': True
-        })
-
-        # Формат для отсутствующих магазинов
-        missing_format = workbook.add_format({
+        },
+        # Отсутствующие магазины
+        'missing': {
             'bg_color': '#FFC7CE',  # Светло-красный
             'align': 'left',
             'valign': 'vcenter',
             'border': 1,
             'text_wrap': True
-        })
-
-        # Формат для неактивных магазинов
-        inactive_format = workbook.add_format({
+        },
+        # Неактивные магазины
+        'inactive': {
             'font_color': '#999999',
             'align': 'left',
             'valign': 'vcenter',
             'border': 1,
             'text_wrap': True
-        })
-
-        # ========== ВКЛАДКА 1: НОВЫЕ МАГАЗИНЫ ==========
-        headers_basic = ['№', 'Название магазина', 'Адрес', 'Телефон', 'Сайт', 'Ссылка', 'Дата сбора']
-
-        if new_shops:
-            worksheet1 = workbook.add_worksheet('Новые магазины')
-
-            # Записываем заголовки
-            for col, header in enumerate(headers_basic):
-                worksheet1.write(0, col, header, header_format)
-
-            # Записываем данные
-            for row, shop in enumerate(new_shops, 1):
-                # Номер
-                worksheet1.write(row, 0, row, new_shop_format)
-
-                # Название магазина
-                worksheet1.write(row, 1, shop.get('Название магазина', ''), new_shop_format)
-
-                # Адрес
-                worksheet1.write(row, 2, shop.get('Адрес', ''), new_shop_format)
-
-                # Телефон
-                worksheet1.write(row, 3, shop.get('Телефон', ''), new_shop_format)
-
-                # Сайт
-                website = shop.get('Сайт', '')
-                if website:
-                    worksheet1.write_url(row, 4, website, new_shop_url_format, website)
-                else:
-                    worksheet1.write(row, 4, '', new_shop_format)
-
-                # Ссылка
-                url = shop.get('Ссылка', '')
-                if url:
-                    worksheet1.write_url(row, 5, url, new_shop_url_format, url)
-                else:
-                    worksheet1.write(row, 5, '', new_shop_format)
-
-                # Дата сбора
-                worksheet1.write(row, 6, shop.get('Дата сбора', ''), new_shop_format)
-
-            # Настраиваем ширину колонок
-            worksheet1.set_column('A:A', 5)  # №
-            worksheet1.set_column('B:B', 30)  # Название
-            worksheet1.set_column('C:C', 40)  # Адрес
-            worksheet1.set_column('D:D', 25)  # Телефон
-            worksheet1.set_column('E:E', 30)  # Сайт
-            worksheet1.set_column('F:F', 60)  # Ссылка
-            worksheet1.set_column('G:G', 20)  # Дата сбора
+        },
+        # Заголовок статистики
+        'stats_header': {
+            'bold': True,
+            'font_size': 14,
+            'align': 'center',
+            'valign': 'vcenter'
+        },
+    }
+
+    # Статус строки вкладки «Все магазины» -> (формат строки, формат ссылки на сайт)
+    STATUS_FORMATS = {
+        ReportSections.STATUS_MISSING: ('missing', 'missing'),
+        ReportSections.STATUS_NEW: ('new', 'new_url'),
+        ReportSections.STATUS_IN_DB: ('cell', 'url'),
+    }
+
+    # Ширина колонок полей (колонка № - 5)
+    FIELD_WIDTHS = {
+        'Название магазина': 30,
+        'Адрес': 40,
+        'Телефон': 25,
+        'Сайт': 30,
+        'Ссылка': 60,
+        'Дата сбора': 20,
+        'Дата добавления': 20,
+        'Дата последнего обнаружения': 25,
+        'В последнем парсинге': 20,
+        'Статус': 15,
+    }
+
+    def __init__(self):
+        basic_columns = [('№', 5)] + [(field, self.FIELD_WIDTHS[field]) for field in ReportSections.BASIC_FIELDS]
+        all_columns = [('№', 5)] + [(field, self.FIELD_WIDTHS[field]) for field in ReportSections.ALL_FIELDS]
+
+        # Шапка «Новых магазинов» закрепляется, только если они есть
+        self.new_sheet = SheetSchema(ReportSections.NEW, basic_columns, freeze_header=False)
+        self.parsed_sheet = SheetSchema(ReportSections.PARSED, basic_columns)
+        self.all_sheet = SheetSchema(ReportSections.ALL, all_columns)
+        self.stats_sheet = SheetSchema(ReportSections.STATS, [('Показатель', 40), ('Значение', 25)],
+                                       freeze_header=False)
+
+    def add_formats(self, workbook) -> Dict:
+        """Форматы книги по таблице FORMATS: имя -> Format"""
+        return {name: workbook.add_format(props) for name, props in self.FORMATS.items()}
+
+    def build(self, new_shops: Iterable[Dict], parsed_shops: Iterable[Dict], all_shops: Iterable[Dict],
+              path: str, constant_memory: bool = False, city: str = None) -> str:
+        """Записываем книгу в path; "" - нет спарсенных магазинов"""
+        sections = ReportSections(new_shops, parsed_shops, all_shops, city)
+        if sections.empty:
+            return ""
+
+        workbook = xlsxwriter.Workbook(path, {'constant_memory': constant_memory})
+        formats = self.add_formats(workbook)
+
+        self._write_new(workbook, sections, formats)
+        self._write_parsed(workbook, sections, formats)
+        self._write_all(workbook, sections, formats)
+        self._write_stats(workbook, sections, formats)
 
-            # Добавляем фильтр
-            worksheet1.autofilter(0, 0, len(new_shops), len(headers_basic) - 1)
-            worksheet1.freeze_panes(1, 0)
+        workbook.close()
+        return path
 
-            # Добавляем информацию о количестве
-            worksheet1.write(len(new_shops) + 2, 0, f"Всего новых магазинов: {len(new_shops)}")
+    def _write_new(self, workbook, sections: ReportSections, formats: Dict):
+        """Вкладка 1: новые магазины"""
+        schema = self.new_sheet
+        worksheet = schema.add_to(workbook)
+        worksheet.write_row(0, 0, schema.headers, formats['header'])
 
-        else:
-            # Если новых магазинов нет, создаем вкладку с сообщением
-            worksheet1 = workbook.add_worksheet('Новые магазины')
+        for row, shop in enumerate(sections.new(), 1):
+            self._write_shop_row(worksheet, row, shop, formats['new'], formats['new_url'])
+        new_count = sections.new_count
 
-            # Записываем заголовки
-            for col, header in enumerate(headers_basic):
-                worksheet1.write(0, col, header, header_format)
+        if new_count:
+            # Добавляем фильтр
+            worksheet.autofilter(0, 0, new_count, len(schema.headers) - 1)
+            worksheet.freeze_panes(1, 0)
 
+            # Добавляем информацию о количестве
+            worksheet.write(new_count + 2, 0, f"Всего новых магазинов: {new_count}")
+        else:
             # Сообщение об отсутствии новых магазинов
-            worksheet1.write(1, 0, 1, cell_format)
-            worksheet1.write(1, 1, 'Новых магазинов не обнаружено', cell_format)
-
-            # Настраиваем ширину колонок
-            worksheet1.set_column('A:A', 5)
-            worksheet1.set_column('B:B', 30)
-            worksheet1.set_column('C:C', 40)
-            worksheet1.set_column('D:D', 25)
-            worksheet1.set_column('E:E', 30)
-            worksheet1.set_column('F:F', 60)
-            worksheet1.set_column('G:G', 20)
-
-        # ========== ВКЛАДКА 2: СПАРСЕННЫЕ МАГАЗИНЫ ==========
-        worksheet2 = workbook.add_worksheet('Спарсенные магазины')
-
-        # Записываем заголовки
-        for col, header in enumerate(headers_basic):
-            worksheet2.write(0, col, header, header_format)
-
-        # Записываем данные всех спарсенных магазинов
-        for row, shop in enumerate(parsed_shops, 1):
-            # Номер
-            worksheet2.write(row, 0, row, cell_format)
-
-            # Название магазина
-            worksheet2.write(row, 1, shop.get('Название магазина', ''), cell_format)
-
-            # Адрес
-            worksheet2.write(row, 2, shop.get('Адрес', ''), cell_format)
-
-            # Телефон
-            worksheet2.write(row, 3, shop.get('Телефон', ''), cell_format)
+            worksheet.write_row(1, 0, [1, 'Новых магазинов не обнаружено'], formats['cell'])
+
+    def _write_parsed(self, workbook, sections: ReportSections, formats: Dict):
+        """Вкладка 2: магазины текущего парсинга"""
+        schema = self.parsed_sheet
+        worksheet = schema.add_to(workbook)
+        worksheet.write_row(0, 0, schema.headers, formats['header'])
+
+        for row, shop in enumerate(sections.parsed(), 1):
+            self._write_shop_row(worksheet, row, shop, formats['cell'], formats['url'])
+        parsed_count = sections.parsed_count
+
+        worksheet.autofilter(0, 0, parsed_count, len(schema.headers) - 1)
+        worksheet.write(parsed_count + 2, 0, f"Всего спарсено магазинов: {parsed_count}")
+
+    def _write_all(self, workbook, sections: ReportSections, formats: Dict):
+        """Вкладка 3: все магазины базы с подсветкой по статусу"""
+        schema = self.all_sheet
+        worksheet = schema.add_to(workbook)
+        worksheet.write_row(0, 0, schema.headers, formats['header'])
+
+        # Статус -> готовые объекты Format
+        status_formats = {status: (formats[row_name], formats[url_name])
+                          for status, (row_name, url_name) in self.STATUS_FORMATS.items()}
+        link_fmt = formats['url']
+
+        for row, (shop, found, status) in enumerate(sections.all(), 1):
+            row_fmt, url_fmt = status_formats[status]
+
+            # Номер, название, адрес, телефон
+            worksheet.write_row(row, 0, [
+                row,
+                shop.get('Название магазина', ''),
+                shop.get('Адрес', ''),
+                shop.get('Телефон', ''),
+            ], row_fmt)
 
             # Сайт
             website = shop.get('Сайт', '')
             if website:
-                worksheet2.write_url(row, 4, website, url_format, website)
+                _write_link(worksheet, row, 4, website, url_fmt)
             else:
-                worksheet2.write(row, 4, '', cell_format)
+                worksheet.write(row, 4, '', row_fmt)
 
             # Ссылка
-            url = shop.get('Ссылка', '')
-            if url:
-                worksheet2.write_url(row, 5, url, url_format, url)
-            else:
-                worksheet2.write(row, 5, '', cell_format)
-
-            # Дата сбора
-            worksheet2.write(row, 6, shop.get('Дата сбора', ''), cell_format)
-
-        # Настраиваем ширину колонок
-        worksheet2.set_column('A:A', 5)  # №
-        worksheet2.set_column('B:B', 30)  # Название
-        worksheet2.set_column('C:C', 40)  # Адрес
-        worksheet2.set_column('D:D', 25)  # Телефон
-        worksheet2.set_column('E:E', 30)  # Сайт
-        worksheet2.set_column('F:F', 60)  # Ссылка
-        worksheet2.set_column('G:G', 20)  # Дата сбора
-
-        # Добавляем фильтр
-        worksheet2.autofilter(0, 0, len(parsed_shops), len(headers_basic) - 1)
-        worksheet2.freeze_panes(1, 0)
-
-        # Добавляем информацию о количестве
-        worksheet2.write(len(parsed_shops) + 2, 0, f"Всего спарсено магазинов: {len(parsed_shops)}")
-
-        # ========== ВКЛАДКА 3: ВСЕ МАГАЗИНЫ ==========
-        # Дополнительные заголовки для всех магазинов
-        headers_all = ['№', 'Название магазина', 'Адрес', 'Телефон', 'Сайт', 'Ссылка',
-                       'Дата добавления', 'Дата последнего обнаружения', 'В последнем парсинге', 'Статус']
-
-        worksheet3 = workbook.add_worksheet('Все магазины')
-
-        # Записываем заголовки
-        for col, header in enumerate(headers_all):
-            worksheet3.write(0, col, header, header_format)
-
-        # Создаем множество ссылок новых магазинов для выделения
-        new_shops_links = {shop.get('Ссылка', '') for shop in new_shops}
-        parsed_shops_links = {shop.get('Ссылка', '') for shop in parsed_shops}
-
-        # Записываем данные всех магазинов
-        for row, shop in enumerate(all_shops, 1):
-            # Определяем статус магазина
             shop_link = shop.get('Ссылка', '')
-            in_parsed = shop_link in parsed_shops_links
-            is_new = shop_link in new_shops_links
-
-            # Выбираем формат в зависимости от статуса
-            if not in_parsed:
-                row_format = missing_format
-                status = "Отсутствует"
-            elif is_new:
-                row_format = new_shop_format
-                status = "Новый"
+            if shop_link:
+                _write_link(worksheet, row, 5, shop_link, link_fmt)
             else:
-                row_format = cell_format
-                status = "В базе"
-
-            # Номер
-            worksheet3.write(row, 0, row, row_format)
-
-            # Название магазина
-            worksheet3.write(row, 1, shop.get('Название магазина', ''), row_format)
-
-            # Адрес
-            worksheet3.write(row, 2, shop.get('Адрес', ''), row_format)
-
-            # Телефон
-            worksheet3.write(row, 3, shop.get('Телефон', ''), row_format)
-
-            # Сайт
-            website = shop.get('Сайт', '')
-            if website:
-                # Используем соответствующий формат для ссылок
-                if not in_parsed:
-                    url_fmt = missing_format
-                elif is_new:
-                    url_fmt = new_shop_url_format
-                else:
-                    url_fmt = url_format
-                worksheet3.write_url(row, 4, website, url_fmt, website)
-            else:
-                worksheet3.write(row, 4, '', row_format)
-
-            # Ссылка
-            url = shop.get('Ссылка', '')
-            if url:
-                worksheet3.write_url(row, 5, url, url_format, url)
-            else:
-                worksheet3.write(row, 5, '', row_format)
+                worksheet.write(row, 5, '', row_fmt)
+
+            # Даты, в последнем парсинге, статус
+            worksheet.write_row(row, 6, [
+                shop.get('Дата добавления', ''),
+                shop.get('Дата последнего обнаружения', ''),
+                "Да" if found else "Нет",
+                status,
+            ], row_fmt)
+
+        all_count = sections.all_count
+        worksheet.autofilter(0, 0, all_count, len(schema.headers) - 1)
+        worksheet.write(all_count + 2, 0, f"Всего магазинов в базе: {all_count}")
+
+    def _write_stats(self, workbook, sections: ReportSections, formats: Dict):
+        """Вкладка 4: статистика (счетчики собраны при записи остальных вкладок)"""
+        schema = self.stats_sheet
+        worksheet = schema.add_to(workbook)
+        worksheet.merge_range('A1:C1', 'СТАТИСТИКА ПАРСИНГА', formats['stats_header'])
+
+        stats_data = [tuple(schema.headers)] + sections.stats()
+        for row, values in enumerate(stats_data, 2):
+            worksheet.write_row(row, 0, values)
+
+    @staticmethod
+    def _write_shop_row(worksheet, row: int, shop: Dict, cell_fmt, url_fmt):
+        """Строка вкладок «Новые магазины» и «Спарсенные магазины»"""
+        worksheet.write_row(row, 0, [
+            row,
+            shop.get('Название магазина', ''),
+            shop.get('Адрес', ''),
+            shop.get('Телефон', ''),
+        ], cell_fmt)
+
+        # Сайт
+        website = shop.get('Сайт', '')
+        if website:
+            _write_link(worksheet, row, 4, website, url_fmt)
+        else:
+            worksheet.write(row, 4, '', cell_fmt)
 
-            # Дата добавления
-            worksheet3.write(row, 6, shop.get('Дата добавления', ''), row_format)
+        # Ссылка
+        url = shop.get('Ссылка', '')
+        if url:
+            _write_link(worksheet, row, 5, url, url_fmt)
+        else:
+            worksheet.write(row, 5, '', cell_fmt)
 
-            # Дата последнего обнаружения
-            worksheet3.write(row, 7, shop.get('Дата последнего обнаружения', ''), row_format)
+        # Дата сбора
+        worksheet.write(row, 6, shop.get('Дата сбора', ''), cell_fmt)
 
-            # В последнем парсинге
-            in_last = "Да" if shop.get('обнаружен_в_последнем_парсинге') else "Нет"
-            worksheet3.write(row, 8, in_last, row_format)
 
-            # Статус
-            worksheet3.write(row, 9, status, row_format)
+# Общий построитель: схема собирается один раз на процесс
+DEFAULT_BUILDER = ReportBuilder()
 
-        # Настраиваем ширину колонок
-        worksheet3.set_column('A:A', 5)  # №
-        worksheet3.set_column('B:B', 30)  # Название
-        worksheet3.set_column('C:C', 40)  # Адрес
-        worksheet3.set_column('D:D', 25)  # Телефон
-        worksheet3.set_column('E:E', 30)  # Сайт
-        worksheet3.set_column('F:F', 60)  # Ссылка
-        worksheet3.set_column('G:G', 20)  # Дата добавления
-        worksheet3.set_column('H:H', 25)  # Дата последнего обнаружения
-        worksheet3.set_column('I:I', 20)  # В последнем парсинге
-        worksheet3.set_column('J:J', 15)  # Статус
 
-        # Добавляем фильтр
-        worksheet3.autofilter(0, 0, len(all_shops), len(headers_all) - 1)
-        worksheet3.freeze_panes(1, 0)
+def create_excel_report(new_shops: Iterable[Dict],
+                                 parsed_shops: Iterable[Dict],
+                                 all_shops: Iterable[Dict],
+                                 filename: str = "результаты.xlsx",
+                                 constant_memory: bool = False,
+                                 results_dir: str = "results",
+                                 raise_errors: bool = False,
+                                 builder: ReportBuilder = None,
+                                 city: str = None) -> str:
+    """
+    Создает Excel файл с четырьмя вкладками:
+    1. Новые магазины
+    2. Спарсенные магазины (текущий парсинг)
+    3. Все магазины (из базы данных)
+    4. Статистика
 
-        # Добавляем информацию о количестве
-        worksheet3.write(len(all_shops) + 2, 0, f"Всего магазинов в базе: {len(all_shops)}")
+    Каждый источник читается один раз, поэтому вместо списков можно передавать
+    генераторы. Со constant_memory=True строки сразу сбрасываются на диск
+    (режим xlsxwriter constant_memory) и в памяти не держится вся книга.
 
-        # ========== ВКЛАДКА 4: СТАТИСТИКА ==========
-        worksheet4 = workbook.add_worksheet('Статистика')
+    Args:
+        new_shops: Новые магазины
+        parsed_shops: Магазины из текущего парсинга
+        all_shops: Все магазины из базы данных
+        filename: Имя файла для сохранения
+        constant_memory: Потоковая запись строк для больших баз
+        results_dir: Папка для отчетов
+        raise_errors: Пробрасывать ошибку вызывающему вместо пустого результата
+        builder: Построитель отчета (по умолчанию общий DEFAULT_BUILDER)
+        city: Город для вкладки «Статистика» (по умолчанию Ростов-на-Дону)
 
-        # Заголовок статистики
-        stats_header_format = workbook.add_format({
-            'bold': True,
-            'font_size': 14,
-            'align': 'center',
-            'valign': 'vcenter'
-        })
-
-        worksheet4.merge_range('A1:C1', 'СТАТИСТИКА ПАРСИНГА', stats_header_format)
-
-        # Данные статистики
-        stats_data = [
-            ['Показатель', 'Значение'],
-            ['Всего в базе данных', len(all_shops)],
-            ['Спарсено в текущем запуске', len(parsed_shops)],
-            ['Новых магазинов', len(new_shops)],
-            ['Магазинов с телефоном', sum(1 for s in parsed_shops if s.get('Телефон'))],
-            ['Магазинов с сайтом', sum(1 for s in parsed_shops if s.get('Сайт'))],
-            ['', ''],
-            ['Магазинов не найдено в этом парсинге',
-             sum(1 for s in all_shops if not s.get('обнаружен_в_последнем_парсинге', False))],
-            ['Процент покрытия',
-             f"{(len(parsed_shops) / len(all_shops) * 100):.1f}%" if all_shops else "0%"],
-            ['', ''],
-            ['Дата парсинга', parsed_shops[0].get('Дата сбора', '') if parsed_shops else ''],
-            ['Город', 'Ростов-на-Дону']
-        ]
-
-        for row, (label, value) in enumerate(stats_data, 2):
-            worksheet4.write(row, 0, label)
-            worksheet4.write(row, 1, value)
-
-        # Настраиваем ширину колонок
-        worksheet4.set_column('A:A', 40)
-        worksheet4.set_column('B:B', 25)
-
-        # Закрываем книгу
-        workbook.close()
+    Returns:
+        str: Путь к созданному файлу
+    """
+    # Создаем папку results если ее нет
+    if not os.path.exists(results_dir):
+        os.makedirs(results_dir)
 
-        return full_path
+    # Полный путь к файлу
+    full_path = os.path.join(results_dir, filename)
 
+    try:
+        return (builder or DEFAULT_BUILDER).build(new_shops, parsed_shops, all_shops, full_path,
+                                                  constant_memory=constant_memory, city=city)
     except Exception as e:
+        if raise_errors:
+            raise
         print(f"❌ Ошибка создания Excel файла: {e}")
         import traceback
         traceback.print_exc()
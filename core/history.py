@@ -0,0 +1,213 @@
+import json
+import os
+import shutil
+from array import array
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+__all__ = ['ObservationHistory']
+
+
+class ObservationHistory:
+    """История наблюдений магазинов по запускам (колоночное хранение)
+
+    Каждый запуск - папка runs/<run_id> с отдельным файлом на колонку: коды
+    магазинов и коды значений полей (uint32). Строки хранятся один раз в
+    словарях dict_<колонка>.jsonl, код - номер строки. Запросы читают только
+    нужные колонки нужных запусков и сравнивают коды, не разбирая строки.
+    """
+
+    # Колонка -> поле магазина
+    COLUMNS = {
+        "name": "Название магазина",
+        "address": "Адрес",
+        "phone": "Телефон",
+        "site": "Сайт",
+    }
+    SHOP_COLUMN = "shop"
+    TYPECODE = 'I'
+
+    def __init__(self, root: str = "data/history"):
+        self.root = root
+        self.runs_dir = os.path.join(root, 'runs')
+        os.makedirs(self.runs_dir, exist_ok=True)
+        self.runs_file = os.path.join(root, 'runs.jsonl')
+        # Словари загружаются по требованию: колонка -> (список значений, значение -> код)
+        self.dictionaries: Dict[str, tuple] = {}
+
+    # --- словари значений ---
+
+    def _dictionary_path(self, column: str) -> str:
+        return os.path.join(self.root, f"dict_{column}.jsonl")
+
+    def _dictionary(self, column: str) -> tuple:
+        if column not in self.dictionaries:
+            values = list(self._read_jsonl(self._dictionary_path(column)))
+            self.dictionaries[column] = (values, {value: code for code, value in enumerate(values)})
+        return self.dictionaries[column]
+
+    def _encode(self, column: str, values: List[str]) -> array:
+        """Коды значений; новые значения дописываются в словарь"""
+        known, codes = self._dictionary(column)
+        added = []
+        encoded = array(self.TYPECODE)
+        for value in values:
+            code = codes.get(value)
+            if code is None:
+                code = codes[value] = len(known)
+                known.append(value)
+                added.append(value)
+            encoded.append(code)
+
+        if added:
+            with open(self._dictionary_path(column), 'a', encoding='utf-8') as f:
+                for value in added:
+                    f.write(json.dumps(value, ensure_ascii=False) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+        return encoded
+
+    def _decode(self, column: str, code: int) -> str:
+        return self._dictionary(column)[0][code]
+
+    @staticmethod
+    def _read_jsonl(path: str) -> Iterable:
+        """Строки JSONL; оборванная последняя строка отрезается"""
+        if not os.path.exists(path):
+            return
+
+        valid_size = 0
+        with open(path, 'rb') as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    value = json.loads(line)
+                except ValueError:
+                    break
+                valid_size += len(line)
+                yield value
+
+        if valid_size < os.path.getsize(path):
+            with open(path, 'r+b') as f:
+                f.truncate(valid_size)
+
+    # --- запись ---
+
+    def record_run(self, shops: Iterable[Dict], run_id: Optional[str] = None,
+                   started_at: Optional[str] = None) -> str:
+        """Сохраняем наблюдения одного запуска (магазины с полем id)
+
+        Без run_id ID запуска - время с микросекундами, к занятому ID
+        добавляется номер. Переданный run_id заменяет запуск с тем же ID.
+
+        Возвращает: ID запуска
+        """
+        now = datetime.now()
+        run_id = run_id or self._new_run_id(now)
+        rows = {shop["id"]: shop for shop in shops if shop.get("id")}
+
+        columns = {self.SHOP_COLUMN: self._encode(self.SHOP_COLUMN, list(rows))}
+        for column, field in self.COLUMNS.items():
+            columns[column] = self._encode(column, [shop.get(field) or "" for shop in rows.values()])
+
+        # Папка запуска пишется целиком и появляется атомарно
+        run_dir = os.path.join(self.runs_dir, run_id)
+        tmp_dir = f"{run_dir}.{os.getpid()}.tmp"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+        for column, values in columns.items():
+            with open(os.path.join(tmp_dir, f"{column}.u32"), 'wb') as f:
+                values.tofile(f)
+        if os.path.exists(run_dir):
+            shutil.rmtree(run_dir)
+        os.replace(tmp_dir, run_dir)
+
+        with open(self.runs_file, 'a', encoding='utf-8') as f:
+            f.write(json.dumps({
+                "run_id": run_id,
+                "started_at": started_at or now.strftime('%Y-%m-%d %H:%M:%S'),
+                "rows": len(rows)
+            }, ensure_ascii=False) + "\n")
+        return run_id
+
+    def _new_run_id(self, now: datetime) -> str:
+        """Свободный ID запуска: запуски в одну секунду не затирают друг друга"""
+        base = now.strftime('%Y%m%d_%H%M%S_%f')
+        run_id, number = base, 1
+        while os.path.exists(os.path.join(self.runs_dir, run_id)):
+            number += 1
+            run_id = f"{base}_{number}"
+        return run_id
+
+    # --- чтение ---
+
+    def runs(self) -> List[Dict]:
+        """Запуски в порядке записи (повторная запись того же ID заменяет старую)"""
+        runs = {}
+        for run in self._read_jsonl(self.runs_file):
+            runs.pop(run["run_id"], None)
+            runs[run["run_id"]] = run
+        return list(runs.values())
+
+    def read_column(self, run_id: str, column: str) -> array:
+        """Коды одной колонки запуска"""
+        path = os.path.join(self.runs_dir, run_id, f"{column}.u32")
+        values = array(self.TYPECODE)
+        with open(path, 'rb') as f:
+            values.frombytes(f.read())
+        return values
+
+    def _rows(self, run_id: str, columns: List[str]) -> Dict[int, tuple]:
+        """Код магазина -> коды запрошенных колонок"""
+        shops = self.read_column(run_id, self.SHOP_COLUMN)
+        data = [self.read_column(run_id, column) for column in columns]
+        return {shop: tuple(values[i] for values in data) for i, shop in enumerate(shops)}
+
+    def changes_between(self, run_a: str, run_b: str, columns: List[str] = None) -> Dict:
+        """Что изменилось между запусками A и B
+
+        Возвращает: {"added": [id], "removed": [id], "changed": {id: {поле: (было, стало)}}}
+        """
+        columns = columns or list(self.COLUMNS)
+        rows_a = self._rows(run_a, columns)
+        rows_b = self._rows(run_b, columns)
+
+        shop_id = lambda code: self._decode(self.SHOP_COLUMN, code)
+        changed = {}
+        for code, values_b in rows_b.items():
+            values_a = rows_a.get(code)
+            if values_a is None or values_a == values_b:
+                continue
+            changed[shop_id(code)] = {
+                self.COLUMNS[column]: (self._decode(column, old), self._decode(column, new))
+                for column, old, new in zip(columns, values_a, values_b) if old != new
+            }
+
+        return {
+            "added": [shop_id(code) for code in rows_b if code not in rows_a],
+            "removed": [shop_id(code) for code in rows_a if code not in rows_b],
+            "changed": changed,
+        }
+
+    def first_last_seen(self, shop_ids: Iterable[str] = None) -> Dict[str, tuple]:
+        """Первый и последний запуск, в котором встречался магазин
+
+        Читается только колонка кодов магазинов. Возвращает: {id: (first_run_id, last_run_id)}
+        """
+        wanted = None
+        if shop_ids is not None:
+            codes = self._dictionary(self.SHOP_COLUMN)[1]
+            wanted = {codes[shop_id] for shop_id in shop_ids if shop_id in codes}
+
+        seen: Dict[int, list] = {}
+        for run in self.runs():
+            for code in set(self.read_column(run["run_id"], self.SHOP_COLUMN)):
+                if wanted is not None and code not in wanted:
+                    continue
+                if code in seen:
+                    seen[code][1] = run["run_id"]
+                else:
+                    seen[code] = [run["run_id"], run["run_id"]]
+
+        return {self._decode(self.SHOP_COLUMN, code): tuple(runs) for code, runs in seen.items()}
@@ -0,0 +1,116 @@
+from itertools import chain
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+__all__ = ['ReportSections']
+
+
+class ReportSections:
+    """Четыре раздела отчета: новые, спарсенные, все магазины со статусом, статистика
+
+    Общая модель для всех форматов отчета. Источники читаются по одному разу
+    и по порядку new -> parsed -> all -> stats: ссылки для статусов и счетчики
+    статистики собираются по ходу чтения, поэтому на вход подходят генераторы.
+    """
+
+    NEW = 'Новые магазины'
+    PARSED = 'Спарсенные магазины'
+    ALL = 'Все магазины'
+    STATS = 'Статистика'
+
+    # Поля разделов "Новые" и "Спарсенные"
+    BASIC_FIELDS = ['Название магазина', 'Адрес', 'Телефон', 'Сайт', 'Ссылка', 'Дата сбора']
+    # Поля раздела "Все магазины" (два последних вычисляются)
+    ALL_FIELDS = ['Название магазина', 'Адрес', 'Телефон', 'Сайт', 'Ссылка',
+                  'Дата добавления', 'Дата последнего обнаружения', 'В последнем парсинге', 'Статус']
+
+    STATUS_NEW = "Новый"
+    STATUS_IN_DB = "В базе"
+    STATUS_MISSING = "Отсутствует"
+
+    DEFAULT_CITY = 'Ростов-на-Дону'
+
+    def __init__(self, new_shops: Iterable[Dict], parsed_shops: Iterable[Dict],
+                 all_shops: Iterable[Dict], city: str = None):
+        self.new_shops = new_shops
+        self.all_shops = all_shops
+        self.city = city or self.DEFAULT_CITY
+
+        # Первый спарсенный магазин нужен заранее: без него отчет не строится
+        parsed_iter = iter(parsed_shops)
+        self.first_parsed = next(parsed_iter, None)
+        self.parsed_shops = chain([self.first_parsed], parsed_iter) if self.first_parsed else iter(())
+
+        self.new_links = set()
+        self.parsed_links = set()
+        self.new_count = 0
+        self.parsed_count = 0
+        self.with_phone = 0
+        self.with_site = 0
+        self.all_count = 0
+        self.missing_count = 0
+
+    @property
+    def empty(self) -> bool:
+        """Нет ни одного спарсенного магазина"""
+        return self.first_parsed is None
+
+    def new(self) -> Iterator[Dict]:
+        """Новые магазины"""
+        for shop in self.new_shops:
+            self.new_count += 1
+            self.new_links.add(shop.get('Ссылка', ''))
+            yield shop
+
+    def parsed(self) -> Iterator[Dict]:
+        """Магазины текущего парсинга"""
+        for shop in self.parsed_shops:
+            self.parsed_count += 1
+            self.parsed_links.add(shop.get('Ссылка', ''))
+            self.with_phone += bool(shop.get('Телефон'))
+            self.with_site += bool(shop.get('Сайт'))
+            yield shop
+
+    def all(self) -> Iterator[Tuple[Dict, bool, str]]:
+        """Все магазины базы: (shop, найден в последнем парсинге, статус)"""
+        for shop in self.all_shops:
+            self.all_count += 1
+
+            link = shop.get('Ссылка', '')
+            if link not in self.parsed_links:
+                status = self.STATUS_MISSING
+            elif link in self.new_links:
+                status = self.STATUS_NEW
+            else:
+                status = self.STATUS_IN_DB
+
+            # В старых базах флаг записан с маленькой буквы
+            found = bool(shop.get('Обнаружен_в_последнем_парсинге', shop.get('обнаружен_в_последнем_парсинге')))
+            self.missing_count += not found
+            yield shop, found, status
+
+    def stats(self) -> List[Tuple[str, object]]:
+        """Показатели раздела "Статистика" (после чтения остальных разделов)"""
+        return [
+            ('Всего в базе данных', self.all_count),
+            ('Спарсено в текущем запуске', self.parsed_count),
+            ('Новых магазинов', self.new_count),
+            ('Магазинов с телефоном', self.with_phone),
+            ('Магазинов с сайтом', self.with_site),
+            ('', ''),
+            ('Магазинов не найдено в этом парсинге', self.missing_count),
+            ('Процент покрытия',
+             f"{(self.parsed_count / self.all_count * 100):.1f}%" if self.all_count else "0%"),
+            ('', ''),
+            ('Дата парсинга', self.first_parsed.get('Дата сбора', '') if self.first_parsed else ''),
+            ('Город', self.city),
+        ]
+
+    @staticmethod
+    def basic_row(shop: Dict) -> List:
+        """Значения полей BASIC_FIELDS"""
+        return [shop.get(field, '') for field in ReportSections.BASIC_FIELDS]
+
+    @staticmethod
+    def all_row(shop: Dict, found, status: str) -> List:
+        """Значения полей ALL_FIELDS"""
+        return [shop.get(field, '') for field in ReportSections.ALL_FIELDS[:-2]] + [found, status]
@@ -0,0 +1,114 @@
+import asyncio
+import traceback
+from collections.abc import Iterator
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Dict, Iterable, List, Optional
+
+from .report_writers import get_report_writer
+
+__all__ = ['ReportResult', 'ReportStage']
+
+
+class ReportResult:
+    """Итог построения одного отчета: путь к файлу или текст ошибки"""
+
+    def __init__(self, key: str, report_format: str, path: str = "", error: str = "",
+                 details: str = ""):
+        self.key = key
+        self.report_format = report_format
+        self.path = path
+        self.error = error
+        # Полная трассировка ошибки (включая трассировку из процесса пула)
+        self.details = details
+
+    @property
+    def ok(self) -> bool:
+        return bool(self.path) and not self.error
+
+    def __repr__(self):
+        status = self.path if self.ok else f"ошибка: {self.error or 'нет данных'}"
+        return f"ReportResult({self.key!r}, {self.report_format!r}, {status})"
+
+
+def _build_report(report_format: str, results_dir: str, constant_memory: bool,
+                  new_shops: Iterable[Dict], parsed_shops: Iterable[Dict], all_shops: Iterable[Dict],
+                  name: str, city: str = None) -> str:
+    """Построение отчета в процессе пула (исключения уходят вызывающему)"""
+    writer = get_report_writer(report_format, results_dir, constant_memory=constant_memory)
+    return writer.write(new_shops, parsed_shops, all_shops, name, city)
+
+
+class ReportStage:
+    """Асинхронное построение отчетов в пуле процессов
+
+    Сборка книги - синхронная работа на CPU, поэтому она уходит из цикла событий
+    в отдельные процессы: отчеты по разным городам или запросам строятся
+    параллельно, пока браузер занят следующим заданием. submit() возвращает
+    управление сразу, results() дожидается всех отчетов и возвращает
+    ReportResult, в том числе с ошибками.
+
+    executor - общий пул процессов (например, демона): close() его не
+    останавливает, иначе создается собственный пул на workers процессов.
+    """
+
+    def __init__(self, formats: Iterable[str] = ('excel',), results_dir: str = "results",
+                 constant_memory: bool = False, workers: Optional[int] = None,
+                 executor: Optional[Executor] = None):
+        self.formats = list(formats)
+        self.results_dir = results_dir
+        self.constant_memory = constant_memory
+        self.own_executor = executor is None
+        self.executor = executor or ProcessPoolExecutor(max_workers=workers)
+        self.pending: List[asyncio.Task] = []
+
+    def submit(self, key: str, new_shops: Iterable[Dict], parsed_shops: Iterable[Dict],
+               all_shops: Iterable[Dict], name: str, city: str = None) -> List[asyncio.Task]:
+        """Ставим в очередь отчеты (по одному на формат) для города или запроса key
+
+        city - город во вкладке статистики. Разделы передаются в процесс пула
+        как есть (списки или сериализуемые читатели вроде SqliteShopsReader),
+        в список собираются только итераторы: генераторы не сериализуются.
+        """
+        new_shops, parsed_shops, all_shops = (
+            list(shops) if isinstance(shops, Iterator) else shops
+            for shops in (new_shops, parsed_shops, all_shops)
+        )
+
+        tasks = [
+            asyncio.create_task(self._run(key, report_format, new_shops, parsed_shops, all_shops, name, city))
+            for report_format in self.formats
+        ]
+        self.pending.extend(tasks)
+        return tasks
+
+    async def _run(self, key: str, report_format: str, new_shops: Iterable[Dict],
+                   parsed_shops: Iterable[Dict], all_shops: Iterable[Dict], name: str,
+                   city: str = None) -> ReportResult:
+        loop = asyncio.get_running_loop()
+        try:
+            path = await loop.run_in_executor(
+                self.executor, _build_report, report_format, self.results_dir, self.constant_memory,
+                new_shops, parsed_shops, all_shops, name, city
+            )
+        except Exception as e:
+            details = "".join(traceback.format_exception(type(e), e, e.__traceback__))
+            return ReportResult(key, report_format, error=f"{type(e).__name__}: {e}", details=details)
+        return ReportResult(key, report_format, path=path)
+
+    async def results(self) -> List[ReportResult]:
+        """Дожидаемся всех поставленных отчетов (в порядке постановки)"""
+        tasks, self.pending = self.pending, []
+        return list(await asyncio.gather(*tasks))
+
+    def close(self):
+        if self.own_executor:
+            self.executor.shutdown(wait=True)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        try:
+            await self.results()
+        finally:
+            self.close()
@@ -0,0 +1,172 @@
+import csv
+import json
+import os
+from typing import Dict, Iterable, Iterator, List
+
+from .excel_report import create_excel_report
+from .report_model import ReportSections
+
+__all__ = ['ReportWriter', 'ExcelReportWriter', 'CsvReportWriter', 'JsonlReportWriter',
+           'ParquetReportWriter', 'REPORT_WRITERS', 'get_report_writer']
+
+
+class ReportWriter:
+    """Базовый интерфейс формата отчета
+
+    Отчет состоит из четырех разделов ReportSections. Форматы без листов пишут
+    каждый раздел в отдельный файл в папке отчета.
+    """
+
+    name = ''
+    # Имена файлов разделов для форматов без листов
+    SECTION_FILES = {
+        ReportSections.NEW: 'new',
+        ReportSections.PARSED: 'parsed',
+        ReportSections.ALL: 'all',
+        ReportSections.STATS: 'stats',
+    }
+
+    def __init__(self, results_dir: str = "results"):
+        self.results_dir = results_dir
+
+    def write(self, new_shops: Iterable[Dict], parsed_shops: Iterable[Dict],
+              all_shops: Iterable[Dict], name: str, city: str = None) -> str:
+        """Создаем отчет, возвращаем путь к файлу или папке ("" - отчет не создан)"""
+        sections = ReportSections(new_shops, parsed_shops, all_shops, city)
+        if sections.empty:
+            return ""
+
+        report_dir = os.path.join(self.results_dir, name)
+        os.makedirs(report_dir, exist_ok=True)
+
+        basic_fields = ReportSections.BASIC_FIELDS
+        self.write_section(report_dir, ReportSections.NEW, basic_fields,
+                           (ReportSections.basic_row(shop) for shop in sections.new()))
+        self.write_section(report_dir, ReportSections.PARSED, basic_fields,
+                           (ReportSections.basic_row(shop) for shop in sections.parsed()))
+        self.write_section(report_dir, ReportSections.ALL, ReportSections.ALL_FIELDS,
+                           (ReportSections.all_row(shop, self.format_flag(found), status)
+                            for shop, found, status in sections.all()))
+        self.write_section(report_dir, ReportSections.STATS, ['Показатель', 'Значение'],
+                           ([label, value] for label, value in sections.stats() if label))
+        return report_dir
+
+    def section_path(self, report_dir: str, section: str) -> str:
+        return os.path.join(report_dir, f"{self.SECTION_FILES[section]}.{self.name}")
+
+    def format_flag(self, found: bool):
+        """Значение поля "В последнем парсинге\""""
+        return found
+
+    def write_section(self, report_dir: str, section: str, fields: List[str], rows: Iterator[List]):
+        """Запись одного раздела построчно"""
+        raise NotImplementedError
+
+
+class ExcelReportWriter(ReportWriter):
+    """Excel: четыре вкладки одной книги (create_excel_report)"""
+
+    name = 'xlsx'
+
+    def __init__(self, results_dir: str = "results", constant_memory: bool = False):
+        super().__init__(results_dir)
+        self.constant_memory = constant_memory
+
+    def write(self, new_shops: Iterable[Dict], parsed_shops: Iterable[Dict],
+              all_shops: Iterable[Dict], name: str, city: str = None) -> str:
+        return create_excel_report(new_shops, parsed_shops, all_shops, f"{name}.xlsx",
+                                   constant_memory=self.constant_memory, results_dir=self.results_dir,
+                                   raise_errors=True, city=city)
+
+
+class CsvReportWriter(ReportWriter):
+    """CSV: файл на раздел (UTF-8 с BOM, чтобы Excel открывал кириллицу)"""
+
+    name = 'csv'
+
+    def format_flag(self, found: bool):
+        return "Да" if found else "Нет"
+
+    def write_section(self, report_dir: str, section: str, fields: List[str], rows: Iterator[List]):
+        with open(self.section_path(report_dir, section), 'w', encoding='utf-8-sig', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(fields)
+            writer.writerows(rows)
+
+
+class JsonlReportWriter(ReportWriter):
+    """JSON Lines: файл на раздел, объект на строку"""
+
+    name = 'jsonl'
+
+    def write_section(self, report_dir: str, section: str, fields: List[str], rows: Iterator[List]):
+        with open(self.section_path(report_dir, section), 'w', encoding='utf-8') as f:
+            for row in rows:
+                f.write(json.dumps(dict(zip(fields, row)), ensure_ascii=False) + "\n")
+
+
+class ParquetReportWriter(ReportWriter):
+    """Parquet (pyarrow): файл на раздел, строки пишутся пакетами"""
+
+    name = 'parquet'
+    BATCH_SIZE = 10000
+
+    def __init__(self, results_dir: str = "results"):
+        super().__init__(results_dir)
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError as e:
+            raise ImportError("Для отчетов parquet нужен pyarrow: pip install \"pyarrow>=14.0.0\"") from e
+
+        self.pa = pyarrow
+        self.pq = pyarrow.parquet
+
+    def write_section(self, report_dir: str, section: str, fields: List[str], rows: Iterator[List]):
+        # Все поля строковые, кроме флага "В последнем парсинге"
+        schema = self.pa.schema([
+            (field, self.pa.bool_() if field == 'В последнем парсинге' else self.pa.string())
+            for field in fields
+        ])
+
+        with self.pq.ParquetWriter(self.section_path(report_dir, section), schema) as writer:
+            batch = []
+            for row in rows:
+                batch.append(row)
+                if len(batch) >= self.BATCH_SIZE:
+                    self._write_batch(writer, schema, batch)
+                    batch = []
+            self._write_batch(writer, schema, batch)
+
+    def _write_batch(self, writer, schema, batch: List[List]):
+        columns = [
+            [self._value(row[i], field.type) for row in batch]
+            for i, field in enumerate(schema)
+        ]
+        writer.write_table(self.pa.table(columns, schema=schema))
+
+    def _value(self, value, field_type):
+        if field_type == self.pa.bool_():
+            return bool(value)
+        return "" if value is None else str(value)
+
+
+REPORT_WRITERS = {
+    'excel': ExcelReportWriter,
+    'csv': CsvReportWriter,
+    'jsonl': JsonlReportWriter,
+    'parquet': ParquetReportWriter,
+}
+
+
+def get_report_writer(name: str, results_dir: str = "results", constant_memory: bool = False) -> ReportWriter:
+    """Формат отчета по имени: excel, csv, jsonl или parquet
+
+    constant_memory - потоковая запись Excel. Parquet требует pyarrow
+    (ImportError, если не установлен)
+    """
+    if name not in REPORT_WRITERS:
+        raise ValueError(f"Неизвестный формат отчета: {name}. Доступны: {', '.join(REPORT_WRITERS)}")
+    if name == 'excel':
+        return ExcelReportWriter(results_dir, constant_memory=constant_memory)
+    return REPORT_WRITERS[name](results_dir)
@@ -0,0 +1,78 @@
+from typing import Dict, List
+
+__all__ = ['CARD_FIELDS', 'RunDiff', 'card_changes']
+
+# Поля карточки, которые обновляются при повторном обнаружении магазина
+CARD_FIELDS = ("Название магазина", "Адрес", "Телефон", "Сайт")
+
+NEW = "new"
+UPDATED = "updated"
+UNCHANGED = "unchanged"
+
+
+def card_changes(existing: Dict, shop_data: Dict) -> Dict[str, tuple]:
+    """Изменившиеся поля карточки: {поле: (было, стало)}"""
+    changes = {}
+    for key in CARD_FIELDS:
+        if key in shop_data:
+            old = existing.get(key, "")
+            if shop_data[key] != old:
+                changes[key] = (old, shop_data[key])
+    return changes
+
+
+class RunDiff:
+    """Разница между базой и результатами запуска
+
+    Заполняется базой за один проход по результатам (PyroDatabase.merge_run) и
+    содержит сами записи магазинов, поэтому списки сразу идут в базу и отчет
+    без повторных переборов и копирования.
+    """
+
+    def __init__(self):
+        self.new: List[Dict] = []
+        self.updated: List[Dict] = []
+        self.unchanged: List[Dict] = []
+        # Найдены в поиске, страницы не открывались (инкрементальный режим)
+        self.fresh: List[Dict] = []
+        self.missing: List[Dict] = []
+        # ID -> {поле: (было, стало)} для обновленных магазинов
+        self.changes: Dict[str, Dict[str, tuple]] = {}
+        self.seen_ids = set()
+
+    def add(self, shop: Dict, status: str, changes: Dict[str, tuple] = None) -> bool:
+        """Учитываем магазин из результатов; повтор того же ID пропускается"""
+        if shop["id"] in self.seen_ids:
+            return False
+        self.seen_ids.add(shop["id"])
+
+        if status == NEW:
+            self.new.append(shop)
+        elif status == UPDATED:
+            self.updated.append(shop)
+            self.changes[shop["id"]] = changes
+        else:
+            self.unchanged.append(shop)
+        return True
+
+    def add_fresh(self, shop: Dict) -> bool:
+        """Учитываем магазин, найденный без загрузки страницы"""
+        if shop["id"] in self.seen_ids:
+            return False
+        self.seen_ids.add(shop["id"])
+        self.fresh.append(shop)
+        return True
+
+    @property
+    def parsed(self) -> List[Dict]:
+        """Все магазины, найденные в запуске"""
+        return self.new + self.updated + self.unchanged + self.fresh
+
+    def counts(self) -> Dict[str, int]:
+        return {
+            "new": len(self.new),
+            "updated": len(self.updated),
+            "unchanged": len(self.unchanged),
+            "fresh": len(self.fresh),
+            "missing": len(self.missing),
+        }
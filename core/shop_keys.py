@@ -0,0 +1,105 @@
+import hashlib
+import re
+from functools import lru_cache
+from typing import Dict
+
+__all__ = ['normalize_shop_url', 'extract_org_id', 'shop_key', 'dedup_key']
+
+# Шаблоны ID организации в ссылке (в порядке приоритета)
+ORG_ID_PATTERNS = (
+    re.compile(r'/org/(?:[^/]+/)?(\d+)'),
+    re.compile(r'businessId=(\d+)'),
+    re.compile(r'/(\d+)/details'),
+    re.compile(r'/firm/(\d+)'),
+)
+
+# Вкладки карточки, которые обрезаются до базовой ссылки на магазин
+CARD_TABS = ('/reviews', '/photos', '/gallery', '/menu')
+
+# ID организации в параметрах - единственный параметр, который сохраняется
+BUSINESS_ID_RE = re.compile(r'[?&]businessId=(\d+)')
+# Конечные слеши и пробелы (пробел перед слешем не должен давать второй проход)
+TRAILING_RE = re.compile(r'[\s/]+$')
+
+CACHE_SIZE = 1 << 16
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def normalize_shop_url(url: str) -> str:
+    """Нормализация URL - оставляем только базовую ссылку на магазин"""
+    if not url:
+        return ""
+
+    url = url.strip()
+
+    # Добавляем домен если нужно
+    if url.startswith('//'):
+        url = f"https:{url}"
+    elif url.startswith('/'):
+        url = f"https://yandex.ru{url}"
+    elif not url.lower().startswith('http'):
+        return ""
+
+    # Удаляем параметры запроса и якоря (кроме businessId: без него ссылки
+    # разных организаций вида /maps/?businessId=... совпали бы)
+    business_id = BUSINESS_ID_RE.search(url.split('#')[0])
+    url = url.split('?')[0].split('#')[0].strip()
+
+    # Обрезаем вкладки (reviews, photos, gallery, menu)
+    for tab in CARD_TABS:
+        tab_index = url.find(tab)
+        if tab_index != -1:
+            url = url[:tab_index]
+
+    # Удаляем конечные слеши
+    url = TRAILING_RE.sub('', url)
+    if business_id:
+        url = f"{url}?businessId={business_id.group(1)}"
+    return url
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def extract_org_id(url: str) -> str:
+    """Числовой ID организации на Яндекс Картах или пустая строка"""
+    if not url:
+        return ""
+
+    for pattern in ORG_ID_PATTERNS:
+        match = pattern.search(url)
+        if match:
+            return match.group(1)
+    return ""
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def shop_key(url: str) -> str:
+    """Канонический ключ магазина по ссылке
+
+    yandex_<ID>, если ID есть в ссылке, иначе hash_<blake2b нормализованной ссылки>.
+    В отличие от встроенного hash() ключ одинаков во всех процессах и запусках.
+    """
+    if not url:
+        return ""
+
+    org_id = extract_org_id(url)
+    if org_id:
+        return f"yandex_{org_id}"
+
+    normalized = (normalize_shop_url(url) or url.strip()).lower()
+    return f"hash_{hashlib.blake2b(normalized.encode('utf-8'), digest_size=8).hexdigest()}"
+
+
+def dedup_key(shop: Dict) -> str:
+    """Ключ для удаления дубликатов в результатах парсинга
+
+    По ссылке, а без ссылки - по названию и адресу. Пустая строка - ключа нет.
+    """
+    url = shop.get('Ссылка', '')
+    if url:
+        return shop_key(url)
+
+    name = shop.get('Название магазина', '').lower().strip()
+    address = shop.get('Адрес', '').lower().strip()
+    if name and address:
+        return f"{name}|{address}"
+    return name or address
@@ -0,0 +1,227 @@
+# daemon.py
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import socket
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List
+
+from core.report_stage import ReportStage
+from main import main as run_crawl, parse_args as parse_crawl_args, print_report_results
+from parser.browser_pool import BrowserPool
+from parser.jobs import CrawlConfig
+from parser.rate_limiter import HostRateLimiter
+
+DEFAULT_SOCKET = "data/daemon.sock"
+DEFAULT_PORT = 8765
+# Unix-сокет есть не везде (Windows) - там демон слушает TCP на localhost
+USE_UNIX_SOCKET = hasattr(socket, "AF_UNIX")
+
+
+class CrawlDaemon:
+    """Долгоживущий парсер с пулом прогретых браузеров
+
+    Задания - аргументы main.py - принимаются через локальный сокет, по одной
+    JSON-строке на команду: crawl, status, stop. Каждое задание получает
+    свободный браузер пула, поэтому Chrome не запускается заново, а cookies и
+    HTTP-кэш профиля (скрипты, стили и тайлы карт) переживают задания.
+    Заданий одновременно выполняется не больше, чем браузеров в пуле.
+
+    Журнал контрольных точек задания зависит только от его аргументов (без
+    --resume), поэтому то же задание с --resume продолжает прерванный запуск.
+    Лимит запросов один на все задания (rate_limiter): одновременные задания
+    делят его, а не умножают. Задание отмечает пропавшими только магазины своих
+    городов, поэтому задания разных городов не сбрасывают флаги друг друга.
+    Отчеты заданий строятся в общем пуле процессов: браузер возвращается в
+    пул сразу после парсинга, а задание дожидается своих отчетов уже без него.
+    """
+
+    def __init__(self, pool: BrowserPool, state_dir: str = "data/daemon",
+                 rate_limiter: HostRateLimiter = None):
+        self.pool = pool
+        self.state_dir = state_dir
+        self.rate_limiter = rate_limiter or HostRateLimiter()
+        self.jobs: List[Dict] = []
+        self.tasks: Dict[int, asyncio.Task] = {}
+        self.stopping = asyncio.Event()
+        self.report_executor = ProcessPoolExecutor()
+
+    async def run_job(self, job: Dict, args: argparse.Namespace):
+        """Задание: ждем свободный браузер, запускаем обычный парсинг и дожидаемся отчетов"""
+        report_stage = ReportStage(args.report_format, constant_memory=args.constant_memory,
+                                   executor=self.report_executor)
+        try:
+            async with self.pool.acquire() as browser:
+                job["state"] = "running"
+                job["started"] = time.time()
+                job["waited"] = round(job["started"] - job["submitted"], 2)
+                print(f"▶ Задание {job['id']}: {' '.join(job['args']) or 'настройки по умолчанию'}")
+                try:
+                    if await run_crawl(args, browser=browser, rate_limiter=self.rate_limiter,
+                                       report_stage=report_stage):
+                        job["state"] = "done"
+                    else:
+                        job["state"] = "failed"
+                        job["error"] = "парсинг не завершен или данных нет, база не обновлена"
+                except Exception as e:
+                    job["state"] = "failed"
+                    job["error"] = str(e)
+                    traceback.print_exc()
+
+            # Браузер уже свободен, отчеты городов достраиваются в пуле
+            report_results = await report_stage.results()
+            job["reports"] = [{"key": result.key, "format": result.report_format,
+                               "path": result.path, "error": result.error} for result in report_results]
+            print_report_results(report_results)
+        finally:
+            job["seconds"] = round(time.time() - job.get("started", job["submitted"]), 2)
+            self.tasks.pop(job["id"], None)
+            print(f"⏹ Задание {job['id']}: {job['state']} за {job['seconds']} сек")
+
+    def checkpoint_path(self, argv: List[str]) -> str:
+        """Журнал задания: один и тот же для одинаковых аргументов"""
+        key = "\0".join(arg for arg in argv if arg != "--resume")
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=6).hexdigest()
+        return os.path.join(self.state_dir, f"checkpoint-{digest}.jsonl")
+
+    def submit(self, argv: List[str]) -> Dict:
+        """Ставим задание в очередь (argv - аргументы main.py)"""
+        args = parse_crawl_args(argv)
+        if not any(arg.startswith("--checkpoint") for arg in argv):
+            args.checkpoint = self.checkpoint_path(argv)
+        # Одновременные задания не должны писать в один журнал
+        for other in self.jobs:
+            if other["state"] in ("queued", "running") and other["checkpoint"] == args.checkpoint:
+                raise ValueError(f"Задание с тем же журналом уже в работе: {other['id']}")
+
+        job = {"id": len(self.jobs) + 1, "args": argv, "state": "queued", "submitted": time.time(),
+               "checkpoint": args.checkpoint}
+        self.jobs.append(job)
+        self.tasks[job["id"]] = asyncio.create_task(self.run_job(job, args))
+        return job
+
+    def status(self) -> Dict:
+        return {"browsers": self.pool.size, "busy": self.pool.busy, "jobs": self.jobs}
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Одна команда клиента - один ответ"""
+        try:
+            request = json.loads(await reader.readline())
+            command = request.get("command")
+            if command == "crawl":
+                response = {"ok": True, "job": self.submit(request.get("args", []))}
+            elif command == "status":
+                response = {"ok": True, **self.status()}
+            elif command == "stop":
+                self.stopping.set()
+                response = {"ok": True}
+            else:
+                response = {"ok": False, "error": f"Неизвестная команда: {command}"}
+        except SystemExit:
+            # argparse завершает процесс при ошибке в аргументах задания
+            response = {"ok": False, "error": "Неверные аргументы задания"}
+        except Exception as e:
+            response = {"ok": False, "error": str(e)}
+
+        writer.write(json.dumps(response, ensure_ascii=False).encode() + b"\n")
+        await writer.drain()
+        writer.close()
+
+    async def serve(self, socket_path: str = DEFAULT_SOCKET, port: int = DEFAULT_PORT):
+        os.makedirs(self.state_dir, exist_ok=True)
+        await self.pool.start()
+
+        if USE_UNIX_SOCKET:
+            if os.path.exists(socket_path):
+                os.remove(socket_path)
+            server = await asyncio.start_unix_server(self.handle, path=socket_path)
+            address = socket_path
+        else:
+            server = await asyncio.start_server(self.handle, "127.0.0.1", port)
+            address = f"127.0.0.1:{port}"
+        print(f"🛰 Демон парсера слушает {address}")
+
+        try:
+            async with server:
+                await self.stopping.wait()
+        finally:
+            if self.tasks:
+                print(f"⏳ Дожидаемся заданий: {len(self.tasks)}")
+                await asyncio.gather(*self.tasks.values(), return_exceptions=True)
+            await self.pool.close()
+            self.report_executor.shutdown(wait=True)
+            if USE_UNIX_SOCKET and os.path.exists(socket_path):
+                os.remove(socket_path)
+            print("👋 Демон остановлен")
+
+
+async def send_command(request: Dict, socket_path: str = DEFAULT_SOCKET, port: int = DEFAULT_PORT) -> Dict:
+    """Команда запущенному демону"""
+    if USE_UNIX_SOCKET:
+        reader, writer = await asyncio.open_unix_connection(socket_path)
+    else:
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(json.dumps(request, ensure_ascii=False).encode() + b"\n")
+    await writer.drain()
+    response = json.loads(await reader.readline())
+    writer.close()
+    return response
+
+
+def print_status(status: Dict):
+    print(f"🔥 Браузеров: {status['browsers']}, занято: {status['busy']}")
+    for job in status["jobs"]:
+        line = f"   {job['id']}. {job['state']}: {' '.join(job['args']) or 'настройки по умолчанию'}"
+        if "seconds" in job:
+            line += f" ({job['seconds']} сек, ожидание браузера {job['waited']} сек)"
+        if job.get("error"):
+            line += f" - {job['error']}"
+        print(line)
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Демон парсера: прогретые браузеры и очередь заданий")
+    arg_parser.add_argument("--socket", default=DEFAULT_SOCKET, help="Unix-сокет демона")
+    arg_parser.add_argument("--port", type=int, default=DEFAULT_PORT,
+                            help="TCP-порт на 127.0.0.1, где нет Unix-сокетов (Windows)")
+    commands = arg_parser.add_subparsers(dest="command", required=True)
+
+    serve_parser = commands.add_parser("serve", help="Запустить демон")
+    serve_parser.add_argument("--browsers", type=int, default=1,
+                              help="Прогретых браузеров (одновременных заданий)")
+    serve_parser.add_argument("--profiles", default="data/profiles", help="Папка постоянных профилей Chrome")
+    serve_parser.add_argument("--show-browser", action="store_true", help="Запуск браузеров с окном")
+    serve_parser.add_argument("--config", default="crawl.json",
+                              help="Настройки с общим для всех заданий лимитом запросов "
+                                   "(requests_per_second, burst)")
+
+    crawl_parser = commands.add_parser("crawl", help="Поставить задание парсинга")
+    crawl_parser.add_argument("crawl_args", nargs=argparse.REMAINDER,
+                              help="Аргументы main.py, например --config crawl.json --max-age 7")
+
+    commands.add_parser("status", help="Браузеры и задания демона")
+    commands.add_parser("stop", help="Остановить демон после текущих заданий")
+    args = arg_parser.parse_args()
+
+    if args.command == "serve":
+        pool = BrowserPool(args.browsers, args.profiles, headless=not args.show_browser)
+        config = CrawlConfig.load(args.config)
+        rate_limiter = HostRateLimiter(rate=config.requests_per_second, burst=config.burst)
+        asyncio.run(CrawlDaemon(pool, rate_limiter=rate_limiter).serve(args.socket, args.port))
+    else:
+        request = {"command": args.command}
+        if args.command == "crawl":
+            request["args"] = [arg for arg in args.crawl_args if arg != "--"]
+        response = asyncio.run(send_command(request, args.socket, args.port))
+        if not response["ok"]:
+            print(f"❌ {response['error']}")
+        elif args.command == "crawl":
+            print(f"✅ Задание {response['job']['id']} поставлено в очередь")
+        elif args.command == "status":
+            print_status(response)
+        else:
+            print("✅ Демон останавливается")
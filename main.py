@@ -1,301 +1,283 @@
 # main.py
+import argparse
 import asyncio
-import json
 import os
-import re
+import sys
 from datetime import datetime
-from typing import List, Dict
+from typing import Dict, List
 from parser import YandexPyroParser
+from parser.checkpoint import CrawlCheckpoint
+from parser.freshness import FreshnessPolicy
+from parser.jobs import CrawlConfig
+from parser.html_cache import HtmlCache
+from parser.workers import run_coordinator
+
+from core.database import SqlitePyroDatabase, open_database, shop_city
+from core.report_stage import ReportResult, ReportStage
+from core.report_writers import REPORT_WRITERS
+from core.history import ObservationHistory
+
+
+def shops_in_city(shops, city: str):
+    """Магазины города для отчета (в старых записях города нет - город по умолчанию)"""
+    return (shop for shop in shops if shop_city(shop) == city)
+
+
+def print_report_results(report_results: List[ReportResult]):
+    """Пути к готовым отчетам и ошибки построения"""
+    print()
+    for result in report_results:
+        if result.ok:
+            print(f"✅ Отчет {result.report_format} ({result.key}) успешно создан:")
+            print(f"   📄 {result.path}")
+            print(f"   📊 Разделы: 1) Новые магазины, 2) Спарсенные магазины, 3) Все магазины, 4) Статистика")
+
+            # Выводим абсолютный путь
+            abs_path = os.path.abspath(result.path)
+            print(f"   📍 Полный путь: {abs_path}")
+        else:
+            print(f"❌ Не удалось создать отчет {result.report_format} ({result.key}): "
+                  f"{result.error or 'нет данных'}")
 
-from core.excel_report import create_excel_report
-
-
-class PyroDatabase:
-    """Простая JSON база данных для магазинов"""
-
-    def __init__(self, db_file="data/database.json"):
-        self.db_file = db_file
-        os.makedirs(os.path.dirname(db_file), exist_ok=True)
-        self.db = self._load_db()
-
-    def _load_db(self) -> Dict:
-        """Загружаем базу или создаем новую"""
-        if os.path.exists(self.db_file):
-            try:
-                with open(self.db_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except:
-                pass
-
-        # Создаем новую базу
-        return {
-            "last_update": None,
-            "total_shops": 0,
-            "shops": []
-        }
-
-    def save_db(self):
-        """Сохраняем базу"""
-        with open(self.db_file, 'w', encoding='utf-8') as f:
-            json.dump(self.db, f, ensure_ascii=False, indent=2)
-
-    def extract_id(self, url: str) -> str:
-        """Извлекаем уникальный ID магазина"""
-        if not url:
-            return ""
-
-        patterns = [
-            r'/org/[^/]+/(\d+)',
-            r'businessId=(\d+)',
-            r'/(\d+)/details',
-            r'/firm/(\d+)/',
-        ]
-
-        for pattern in patterns:
-            match = re.search(pattern, url)
-            if match:
-                return f"yandex_{match.group(1)}"
-
-        return f"hash_{hash(url) & 0xFFFFFFFF:08x}"
-
-    def find_shop_by_id(self, shop_id: str) -> Dict:
-        """Находим магазин по ID"""
-        for shop in self.db.get("shops", []):
-            if shop.get("id") == shop_id:
-                return shop
-        return None
-
-    def add_or_update_shop(self, shop_data: Dict) -> tuple:
-        """
-        Добавляем новый магазин или обновляем существующий
-
-        Возвращает: (shop, is_new)
-        """
-        url = shop_data.get("Ссылка", "")
-        shop_id = self.extract_id(url)
-
-        existing = self.find_shop_by_id(shop_id)
-        current_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-
-        if existing:
-            # Обновляем существующий магазин
-            existing.update({
-                "Название магазина": shop_data.get("Название магазина", existing.get("Название магазина", "")),
-                "Адрес": shop_data.get("Адрес", existing.get("Адрес", "")),
-                "Телефон": shop_data.get("Телефон", existing.get("Телефон", "")),
-                "Сайт": shop_data.get("Сайт", existing.get("Сайт", "")),
-                "Дата последнего обнаружения": current_time,
-                "Обнаружен_в_последнем_парсинге": True
-            })
-            return existing, False
 
-        else:
-            # Добавляем новый магазин
-            new_shop = {
-                "id": shop_id,
-                "Название магазина": shop_data.get("Название магазина", ""),
-                "Адрес": shop_data.get("Адрес", ""),
-                "Телефон": shop_data.get("Телефон", ""),
-                "Сайт": shop_data.get("Сайт", ""),
-                "Ссылка": url,
-                "Город": shop_data.get("Город", "Ростов-на-Дону"),
-                "Дата добавления": current_time,
-                "Дата последнего обнаружения": current_time,
-                "Дата сбора": current_time,  # Для Excel отчета
-                "Обнаружен_в_последнем_парсинге": True
-            }
-
-            self.db["shops"].append(new_shop)
-            self.db["total_shops"] += 1
-            return new_shop, True
-
-    def mark_all_unfound(self):
-        """Помечаем все магазины как не найденные в текущем парсинге"""
-        for shop in self.db.get("shops", []):
-            shop["Обнаружен_в_последнем_парсинге"] = False
-
-    def get_new_shops(self) -> List[Dict]:
-        """Получаем магазины, добавленные в последнем парсинге"""
-        new_shops = []
-        for shop in self.db.get("shops", []):
-            # Магазин считается новым, если дата добавления = дате последнего обновления
-            if shop.get("Дата добавления") == shop.get("Дата последнего обнаружения"):
-                # Добавляем дату сбора для отчета
-                shop_with_date = shop.copy()
-                shop_with_date["Дата сбора"] = shop.get("Дата последнего обнаружения", "")
-                new_shops.append(shop_with_date)
-        return new_shops
-
-    def get_all_shops_for_excel(self) -> List[Dict]:
-        """Получаем все магазины в формате для Excel"""
-        all_shops = []
-        for shop in self.db.get("shops", []):
-            # Форматируем для Excel
-            excel_shop = {
-                "Название магазина": shop.get("Название магазина", ""),
-                "Адрес": shop.get("Адрес", ""),
-                "Телефон": shop.get("Телефон", ""),
-                "Сайт": shop.get("Сайт", ""),
-                "Ссылка": shop.get("Ссылка", ""),
-                "Дата добавления": shop.get("Дата добавления", ""),
-                "Дата последнего обнаружения": shop.get("Дата последнего обнаружения", ""),
-                "Обнаружен_в_последнем_парсинге": shop.get("Обнаружен_в_последнем_парсинге", False)
-            }
-            all_shops.append(excel_shop)
-
-        # Сортируем по дате последнего обнаружения (новые сверху)
-        all_shops.sort(key=lambda x: x.get("Дата последнего обнаружения", ""), reverse=True)
-        return all_shops
-
-    def get_stats(self) -> Dict:
-        """Статистика базы"""
-        total = self.db.get("total_shops", 0)
-        found_in_last = sum(1 for s in self.db.get("shops", [])
-                            if s.get("Обнаружен_в_последнем_парсинге", False))
-
-        return {
-            "total_shops": total,
-            "found_in_last_parse": found_in_last,
-            "missing_in_last_parse": total - found_in_last,
-            "last_update": self.db.get("last_update")
-        }
-
-
-async def main():
-    """Основная функция парсинга с базой данных"""
+async def main(args: argparse.Namespace, browser=None, rate_limiter=None,
+               report_stage: ReportStage = None) -> bool:
+    """Основная функция парсинга с базой данных
+
+    browser - прогретый браузер демона (daemon.py): парсер использует его и не
+    закрывает, иначе запускается собственный Chrome на профиле --profile.
+    rate_limiter - общий лимит запросов заданий демона (иначе - из настроек)
+    report_stage - очередь отчетов демона: отчеты ставятся в нее, а дожидается
+    их вызывающий (иначе main создает свою очередь и дожидается отчетов сам)
+
+    Каждый город попадает в базу и в отчет сразу после своего парсинга, пока
+    парсится следующий город.
+
+    Возвращает True, если парсинг завершен и база обновлена
+    """
     print("=" * 80)
     print("🎆 ПАРСЕР МАГАЗИНОВ ПИРОТЕХНИКИ - YANDEX MAPS")
     print("=" * 80)
 
     # 1. Инициализируем базу
     print("\n📂 Загружаем базу данных...")
-    db = PyroDatabase()
+    db = open_database(args.db)
     stats = db.get_stats()
     print(f"   Всего магазинов в базе: {stats['total_shops']}")
     print(f"   Последнее обновление: {stats['last_update']}")
 
     # 2. Парсим текущие данные
     print("\n🔍 Начинаем парсинг Яндекс Карт...")
-    parser = YandexPyroParser(headless=False)  # False для отладки
-    current_shops_data = await parser.parse()
-
-    if not current_shops_data:
-        print("❌ Не удалось получить данные")
-        return
-
-    print(f"✅ Найдено магазинов в текущем парсинге: {len(current_shops_data)}")
-
-    # 3. Обновляем базу данных
-    print("\n💾 Обновляем базу данных...")
-
-    # Помечаем все магазины как не найденные
-    db.mark_all_unfound()
-
-    # Добавляем/обновляем магазины
-    new_shops_count = 0
-    updated_shops_count = 0
-
-    for shop_data in current_shops_data:
-        shop, is_new = db.add_or_update_shop(shop_data)
-        if is_new:
-            new_shops_count += 1
-        else:
-            updated_shops_count += 1
-
-    # Обновляем метаданные базы
-    db.db["last_update"] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-    db.save_db()
-
-    print(f"   Новых магазинов: {new_shops_count}")
-    print(f"   Обновленных магазинов: {updated_shops_count}")
-
-    # 4. Получаем данные для отчета
-    print("\n📊 Подготавливаем данные для отчета...")
-
-    # Новые магазины
-    new_shops = db.get_new_shops()
-
-    # Все магазины (уже в формате для Excel)
-    all_shops_excel = db.get_all_shops_for_excel()
-
-    # Также можем получить текущие магазины для отчета
-    current_shops_for_excel = []
-    for shop_data in current_shops_data:
-        current_shops_for_excel.append({
-            "Название магазина": shop_data.get("Название магазина", ""),
-            "Адрес": shop_data.get("Адрес", ""),
-            "Телефон": shop_data.get("Телефон", ""),
-            "Сайт": shop_data.get("Сайт", ""),
-            "Ссылка": shop_data.get("Ссылка", ""),
-            "Дата сбора": shop_data.get("Дата сбора", ""),
-            "Город": shop_data.get("Город", "")
-        })
-
-    # 5. Создаем отчет с 4 вкладками
-    print("\n📄 Создаем отчет с 4 вкладками...")
+    html_cache = HtmlCache(args.html_cache) if args.html_cache else None
+    freshness = FreshnessPolicy(db, args.max_age) if args.max_age else None
+    checkpoint = None
+    # Города × запросы из настроек, общий бюджет вкладок и запросов
+    config = CrawlConfig.load(args.config)
+    if args.no_block_resources:
+        config.resource_policy = None
+    parser = YandexPyroParser(headless=False, html_cache=html_cache, freshness=freshness,  # False для отладки
+                              jobs=config.jobs(), browser=browser, user_data_dir=args.profile,
+                              rate_limiter=rate_limiter, **config.parser_options())
+
+    # Отчеты строятся в пуле процессов, цикл событий не блокируется
+    own_report_stage = report_stage is None
+    if own_report_stage:
+        report_stage = ReportStage(args.report_format, constant_memory=args.constant_memory)
     timestamp = datetime.now().strftime("%Y%m%d_%H%M")
-    filename = f"магазины_пиротехники_{timestamp}.xlsx"
-
-    # Получаем все магазины из базы для вкладки "Все магазины"
-    all_shops_from_db = db.get_all_shops_for_excel()
-
-    # Подготавливаем новые магазины для отчета
-    new_shops_for_excel = []
-    for shop in new_shops:
-        excel_shop = {
-            "Название магазина": shop.get("Название магазина", ""),
-            "Адрес": shop.get("Адрес", ""),
-            "Телефон": shop.get("Телефон", ""),
-            "Сайт": shop.get("Сайт", ""),
-            "Ссылка": shop.get("Ссылка", ""),
-            "Дата сбора": shop.get("Дата сбора", "")
-        }
-        new_shops_for_excel.append(excel_shop)
-
-    excel_file = create_excel_report(
-        new_shops=new_shops_for_excel,
-        parsed_shops=current_shops_for_excel,  # текущие спарсенные магазины
-        all_shops=all_shops_from_db,  # все магазины из базы
-        filename=filename
-    )
-
-    if excel_file:
-        print(f"✅ Отчет успешно создан:")
-        print(f"   📄 {excel_file}")
-        print(f"   📊 Вкладки: 1) Новые магазины, 2) Все магазины, 3) Статистика")
-
-        # Выводим абсолютный путь
-        abs_path = os.path.abspath(excel_file)
-        print(f"   📍 Полный путь: {abs_path}")
-    else:
-        print("❌ Не удалось создать отчет")
-
-    # 6. Выводим статистику
-    print("\n" + "=" * 80)
-    print("📊 СТАТИСТИКА ПАРСИНГА")
-    print("=" * 80)
-
-    final_stats = db.get_stats()
-
-    print(f"🏪 Всего магазинов в базе: {final_stats['total_shops']}")
-    print(f"🔍 Найдено в этом парсинге: {len(current_shops_data)}")
-    print(f"🆕 Новых магазинов: {new_shops_count}")
-    print(f"🔄 Обновленных магазинов: {updated_shops_count}")
-    print(f"📅 Дата парсинга: {datetime.now().strftime('%Y-%m-%d %H:%M')}")
-
-    if new_shops_count > 0:
-        print("\n🎉 Обнаружены новые магазины:")
-        for i, shop in enumerate(new_shops[:5], 1):
-            name = shop.get('Название магазина', 'Без названия')[:40]
-            address = shop.get('Адрес', '')[:30]
-            print(f"   {i}. {name}")
-            print(f"      📍 {address}")
-
-        if len(new_shops) > 5:
-            print(f"      ... и еще {len(new_shops) - 5}")
-    else:
-        print("\nℹ️  Новых магазинов пиротехники не обнаружено.")
+    report_name = f"магазины_пиротехники_{timestamp}"
+    # Изменения базы по городам в порядке их обработки
+    diffs = {}
+
+    def update_city(city: str, shops: List[Dict], fresh_urls: List[str]):
+        """Готовый город: обновляем базу и ставим отчет города в очередь"""
+        nonlocal db
+        if not shops and not fresh_urls:
+            # Без магазинов все магазины города отметились бы как пропавшие
+            print(f"\n❌ {city}: не удалось получить данные, база не обновляется")
+            return
+
+        print(f"\n💾 {city}: обновляем базу данных ({len(shops) + len(fresh_urls)} магазинов)...")
+        if browser is not None and not isinstance(db, SqlitePyroDatabase):
+            # Демон выполняет задания одновременно: перечитываем JSON-базу, чтобы не
+            # затереть результаты соседнего задания (от чтения до сохранения нет await)
+            db = open_database(args.db)
+
+        # Сравниваем город с базой и сразу применяем изменения; пропавшими могут
+        # оказаться только магазины этого города
+        diff = db.merge_run(shops, fresh_urls, cities=[city])
+        db.set_last_update()
+        db.save_db()
+        diffs[city] = diff
+        submit_report(city, diff)
+
+    def submit_report(city: str, diff):
+        """Отчет города: новые и спарсенные из изменений, все магазины - из базы"""
+        name = report_name
+        if len(parser.cities) > 1:
+            # Отдельный отчет на каждый город, отчеты строятся параллельно
+            name = f"{report_name}_{parser.cities[city].region.rsplit('/', 1)[-1]}"
+        print(f"📄 {city}: ставим в очередь отчеты ({', '.join(report_stage.formats)}) с 4 разделами")
+        report_stage.submit(
+            city,
+            new_shops=shops_in_city(diff.new, city),
+            parsed_shops=shops_in_city(diff.parsed, city),  # текущие спарсенные магазины
+            all_shops=db.get_city_shops_for_excel(city),  # все магазины города из базы
+            name=name,
+            city=city
+        )
+
+    try:
+        if args.workers or args.coordinator:
+            # Распределенный режим: области и магазины раздаются воркерам через очередь
+            current_shops_data, fresh_urls, complete = await run_coordinator(
+                parser.search_areas,
+                queue_path=args.queue,
+                workers=args.workers,
+                html_cache_dir=args.html_cache,
+                config_path=args.config,
+                db_path=args.db,
+                max_age=args.max_age
+            )
+            if not complete:
+                # Неполный запуск отметил бы остальные магазины базы как пропавшие
+                print(f"❌ Очередь обработана не полностью (готово магазинов: {len(current_shops_data)}), "
+                      f"база не обновляется")
+                return False
+            if current_shops_data or fresh_urls:
+                # Результаты воркеров приходят все сразу: одно обновление базы на все города
+                print(f"\n💾 Обновляем базу данных ({len(current_shops_data) + len(fresh_urls)} магазинов)...")
+                diff = db.merge_run(current_shops_data, fresh_urls, cities=parser.cities)
+                db.set_last_update()
+                db.save_db()
+                for city in parser.cities:
+                    diffs[city] = diff
+                    submit_report(city, diff)
+        else:
+            # Очередь воркеров сама переживает перезапуск, журнал нужен только здесь
+            checkpoint = CrawlCheckpoint(args.checkpoint, resume=args.resume)
+            parser.checkpoint = checkpoint
+            parser.on_city_done = update_city
+            await parser.parse()
+            checkpoint.close()
+            if not parser.completed:
+                # Без части магазинов остальные отметились бы как пропавшие, а журнал
+                # с прогрессом нужен для --resume
+                print(f"❌ Парсинг не завершен (готово магазинов: {len(parser.results)}), "
+                      f"база обновлена только по городам: {', '.join(diffs) or 'нет'}")
+                print(f"   ⏯ Прогресс сохранен в {args.checkpoint}, продолжить: python main.py --resume")
+                return False
+
+        if not diffs:
+            print("❌ Не удалось получить данные")
+            if checkpoint and checkpoint.restored:
+                print(f"   ⏯ Прогресс сохранен в {args.checkpoint}, продолжить: python main.py --resume")
+            return False
+
+        # Результаты в базе - контрольная точка больше не нужна
+        if checkpoint:
+            checkpoint.clear()
+
+        # Изменения всех городов запуска (в распределенном режиме изменение одно на все города)
+        run_diffs = list({id(diff): diff for diff in diffs.values()}.values())
+        new_shops = [shop for diff in run_diffs for shop in diff.new]
+        parsed_shops = [shop for diff in run_diffs for shop in diff.parsed]
+        updated = [shop for diff in run_diffs for shop in diff.updated]
+        changes = {shop_id: fields for diff in run_diffs for shop_id, fields in diff.changes.items()}
+        new_shops_count = len(new_shops)
+        updated_shops_count = len(updated) + sum(len(diff.unchanged) for diff in run_diffs)
+
+        print(f"\n✅ Найдено магазинов в текущем парсинге: {len(parsed_shops)}")
+        # Свежие магазины найдены в поиске, но их страницы не открывались
+        fresh_count = sum(len(diff.fresh) for diff in run_diffs)
+        if fresh_count:
+            print(f"   Свежих магазинов (без загрузки страниц): {fresh_count}")
+
+        # История наблюдений: значения полей каждого найденного магазина в этом запуске
+        if args.history:
+            run_id = ObservationHistory(args.history).record_run(parsed_shops)
+            print(f"   История запуска сохранена: {run_id}")
+
+        print(f"   Новых магазинов: {new_shops_count}")
+        print(f"   Обновленных магазинов: {updated_shops_count} (изменились данные: {len(updated)})")
+        print(f"   Не найдено в этом запуске: {sum(len(diff.missing) for diff in run_diffs)}")
+        for shop in updated[:5]:
+            changed = ", ".join(changes[shop["id"]])
+            print(f"      ✏ {shop.get('Название магазина', 'Без названия')[:40]}: {changed}")
+
+        # 3. Выводим статистику
+        print("\n" + "=" * 80)
+        print("📊 СТАТИСТИКА ПАРСИНГА")
+        print("=" * 80)
+
+        final_stats = db.get_stats()
+
+        print(f"🏪 Всего магазинов в базе: {final_stats['total_shops']}")
+        print(f"🔍 Найдено в этом парсинге: {len(parsed_shops)}")
+        print(f"🆕 Новых магазинов: {new_shops_count}")
+        print(f"🔄 Обновленных магазинов: {updated_shops_count}")
+        print(f"📅 Дата парсинга: {datetime.now().strftime('%Y-%m-%d %H:%M')}")
+
+        if new_shops_count > 0:
+            print("\n🎉 Обнаружены новые магазины:")
+            for i, shop in enumerate(new_shops[:5], 1):
+                name = shop.get('Название магазина', 'Без названия')[:40]
+                address = shop.get('Адрес', '')[:30]
+                print(f"   {i}. {name}")
+                print(f"      📍 {address}")
+
+            if len(new_shops) > 5:
+                print(f"      ... и еще {len(new_shops) - 5}")
+        else:
+            print("\nℹ️  Новых магазинов пиротехники не обнаружено.")
+
+        return True
+    finally:
+        # 4. Дожидаемся отчетов городов, попавших в базу (в демоне - вызывающий)
+        if own_report_stage:
+            report_results = await report_stage.results()
+            report_stage.close()
+            print_report_results(report_results)
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    """Аргументы командной строки"""
+    arg_parser = argparse.ArgumentParser(description="Парсер магазинов пиротехники Яндекс.Карт")
+    arg_parser.add_argument("--config", default="crawl.json",
+                            help="Настройки парсинга: города, запросы, вкладки и лимит запросов "
+                                 "(без файла - Ростов-на-Дону, «пиротехника»)")
+    arg_parser.add_argument("--db", default="data/database.json",
+                            help="Файл базы магазинов: .json или .sqlite (SQLite для больших баз)")
+    arg_parser.add_argument("--history", default="data/history", metavar="DIR",
+                            help="Папка истории наблюдений по запускам (пустая строка - не сохранять)")
+    arg_parser.add_argument("--constant-memory", action="store_true",
+                            help="Писать Excel-отчет потоково, не держа книгу в памяти (для больших баз)")
+    arg_parser.add_argument("--report-format", nargs="+", choices=list(REPORT_WRITERS), default=["excel"],
+                            metavar="FORMAT",
+                            help="Форматы отчета: excel, csv, jsonl, parquet (parquet требует pyarrow)")
+    arg_parser.add_argument("--workers", type=int, default=0,
+                            help="Количество процессов-воркеров (0 - парсинг в текущем процессе)")
+    arg_parser.add_argument("--queue", default="data/queue.sqlite",
+                            help="Файл очереди заданий для воркеров")
+    arg_parser.add_argument("--coordinator", action="store_true",
+                            help="Режим координатора без локальных воркеров (воркеры запускаются через worker.py)")
+    arg_parser.add_argument("--max-age", type=float, default=0, metavar="DAYS",
+                            help="Не открывать страницы магазинов, обновленных за последние DAYS дней "
+                                 "(0 - открывать все)")
+    arg_parser.add_argument("--resume", action="store_true",
+                            help="Продолжить прерванный парсинг с последней контрольной точки")
+    arg_parser.add_argument("--checkpoint", default="data/checkpoint.jsonl",
+                            help="Журнал контрольных точек парсинга")
+    arg_parser.add_argument("--html-cache", metavar="DIR",
+                            help="Сохранять сырой HTML страниц в кэш (для reextract.py), например data/html_cache")
+    arg_parser.add_argument("--no-block-resources", action="store_true",
+                            help="Загружать картинки, шрифты, тайлы карты и метрику "
+                                 "(по умолчанию блокируются, см. block_resources в настройках)")
+    arg_parser.add_argument("--profile", metavar="DIR",
+                            help="Постоянный профиль Chrome (cookies и HTTP-кэш между запусками), "
+                                 "например data/profiles/main")
+    return arg_parser.parse_args(argv)
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    if not asyncio.run(main(parse_args())):
+        sys.exit(1)
@@ -0,0 +1,88 @@
+import asyncio
+import os
+from contextlib import asynccontextmanager
+from typing import List, Optional
+
+import nodriver
+
+__all__ = ['start_browser', 'BrowserPool']
+
+# Размер дискового кэша профиля: статика карт (скрипты, стили, тайлы) переживает перезапуски
+DISK_CACHE_BYTES = 512 * 1024 * 1024
+
+
+async def start_browser(headless: bool = False, user_data_dir: Optional[str] = None):
+    """Запуск Chrome
+
+    С user_data_dir профиль постоянный: cookies, localStorage и HTTP-кэш
+    сохраняются между запусками, поэтому статика карт берется из кэша, а
+    «знакомый» профиль реже получает капчу. Без него nodriver создает
+    временный профиль и удаляет его при остановке.
+    """
+    browser_args = []
+    if user_data_dir:
+        os.makedirs(user_data_dir, exist_ok=True)
+        browser_args.append(f"--disk-cache-size={DISK_CACHE_BYTES}")
+
+    return await nodriver.start(
+        headless=headless,
+        user_data_dir=user_data_dir,
+        browser_args=browser_args,
+        window_size=(1300, 900),
+        disable_webgl=True,
+        disable_extensions=True
+    )
+
+
+class BrowserPool:
+    """Пул прогретых браузеров на постоянных профилях
+
+    Браузеры запускаются один раз и переиспользуются заданиями, поэтому задание
+    начинается без холодного старта Chrome. У каждого браузера свой профиль
+    (profiles_dir/browser-N): один профиль Chrome нельзя открыть дважды.
+    Упавший браузер перезапускается на том же профиле при следующей выдаче.
+    """
+
+    def __init__(self, size: int = 1, profiles_dir: str = "data/profiles", headless: bool = True):
+        self.size = size
+        self.profiles_dir = profiles_dir
+        self.headless = headless
+        self.browsers: List = []
+        self.idle: asyncio.Queue = asyncio.Queue()
+
+    def profile_dir(self, index: int) -> str:
+        return os.path.join(self.profiles_dir, f"browser-{index + 1}")
+
+    async def start(self):
+        """Запускаем все браузеры пула"""
+        for index in range(self.size):
+            browser = await start_browser(self.headless, self.profile_dir(index))
+            self.browsers.append(browser)
+            self.idle.put_nowait(index)
+        print(f"🔥 Прогрето браузеров: {self.size} (профили в {self.profiles_dir})")
+
+    @asynccontextmanager
+    async def acquire(self):
+        """Свободный браузер пула на время задания"""
+        index = await self.idle.get()
+        try:
+            if self.browsers[index].stopped:
+                print(f"♻ Браузер {index + 1} остановлен - перезапускаем на том же профиле")
+                self.browsers[index] = await start_browser(self.headless, self.profile_dir(index))
+            yield self.browsers[index]
+        finally:
+            self.idle.put_nowait(index)
+
+    @property
+    def busy(self) -> int:
+        """Сколько браузеров занято заданиями"""
+        return self.size - self.idle.qsize()
+
+    async def close(self):
+        """Останавливаем браузеры (профили и кэш остаются на диске)"""
+        for browser in self.browsers:
+            try:
+                browser.stop()
+            except Exception as e:
+                print(f"⚠ Предупреждение при закрытии браузера: {e}")
+        self.browsers = []
@@ -0,0 +1,108 @@
+import json
+import os
+import time
+from typing import Dict, List, Set, Tuple
+
+
+class CrawlCheckpoint:
+    """Журнал контрольных точек парсинга (JSONL)
+
+    После каждой области записываются собранные ссылки и данные из ответов
+    поиска, после каждой страницы магазина - ее данные. Запись дописывается в
+    конец файла и сразу сбрасывается на диск, поэтому при падении браузера
+    теряется не больше одной страницы. Оборванная последняя строка пропускается.
+    """
+
+    def __init__(self, path: str = "data/checkpoint.jsonl", resume: bool = False):
+        self.path = path
+        self.done_areas: Set[str] = set()
+        # URL области -> (результатов в списке, дошел ли скроллинг до конца)
+        self.area_hits: Dict[str, Tuple[int, bool]] = {}
+        self.urls: Set[str] = set()
+        # Ссылка -> город области, где она найдена
+        self.url_cities: Dict[str, str] = {}
+        self.api_items: Dict[str, Dict] = {}
+        self.results: Dict[str, Dict] = {}
+
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        if resume:
+            self._load()
+        elif os.path.exists(path):
+            os.remove(path)
+
+        self.file = open(path, 'a', encoding='utf-8')
+        if not resume or not os.path.getsize(path):
+            self._write({"type": "start", "time": time.time()})
+
+    @property
+    def restored(self) -> bool:
+        """Есть ли что продолжать"""
+        return bool(self.done_areas or self.results)
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+
+        valid_size = 0
+        with open(self.path, 'rb') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break
+                if not line.endswith(b"\n"):
+                    break
+                valid_size += len(line)
+
+                if record["type"] == "area":
+                    self.done_areas.add(record["url"])
+                    if "hits" in record:
+                        self.area_hits[record["url"]] = (record["hits"], record.get("list_ended", True))
+                    self.urls.update(record["links"])
+                    if record.get("city"):
+                        self.url_cities.update(dict.fromkeys(record["links"], record["city"]))
+                    self.api_items.update(record["api_items"])
+                elif record["type"] == "store":
+                    self.results[record["url"]] = record["data"]
+
+        # Запись оборвалась при падении процесса - отрезаем ее перед дописыванием
+        if valid_size < os.path.getsize(self.path):
+            with open(self.path, 'r+b') as f:
+                f.truncate(valid_size)
+
+    def _write(self, record: Dict):
+        self.file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def area_done(self, area: Dict, links: List[str], api_items: Dict[str, Dict],
+                  hits: int = 0, list_ended: bool = True, city: str = None):
+        """Область полностью прокручена
+
+        hits и list_ended нужны, чтобы после перезапуска заново разделить
+        насыщенную область на те же четверти
+        """
+        self.done_areas.add(area['url'])
+        self.area_hits[area['url']] = (hits, list_ended)
+        self.urls.update(links)
+        if city:
+            self.url_cities.update(dict.fromkeys(links, city))
+        self.api_items.update(api_items)
+        self._write({"type": "area", "url": area['url'], "links": list(links), "api_items": api_items,
+                     "hits": hits, "list_ended": list_ended, "city": city})
+
+    def store_done(self, url: str, data: Dict):
+        """Данные страницы магазина получены"""
+        self.results[url] = data
+        self._write({"type": "store", "url": url, "data": data})
+
+    def close(self):
+        """Закрываем журнал, не удаляя его"""
+        if not self.file.closed:
+            self.file.close()
+
+    def clear(self):
+        """Парсинг завершен и сохранен в базу - журнал больше не нужен"""
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
@@ -0,0 +1,198 @@
+import re
+from typing import Dict, List
+
+# Регулярные выражения компилируются один раз при импорте
+CLEAN_PHONE_RE = re.compile(r'[^\d\+]')
+
+PHONE_PATTERNS = [
+    re.compile(r'8\s?[\(\-]?\d{3}[\)\-]?\s?\d{3}[\s\-]?\d{2}[\s\-]?\d{2}'),
+    re.compile(r'\+7\s?[\(\-]?\d{3}[\)\-]?\s?\d{3}[\s\-]?\d{2}[\s\-]?\d{2}'),
+    re.compile(r'\(\d{3,4}\)\s?\d{2,3}[\s\-]\d{2}[\s\-]\d{2}')
+]
+
+# Упоминания Ростова-на-Дону в адресе
+ROSTOV_PATTERNS = (
+    'ростов-на-дону',
+    'ростов на дону',
+    'ростов-на-дону,',
+    'г.ростов-на-дону',
+    'г. ростов-на-дону',
+    'г. ростов',
+    'г.ростов',
+    'ростов,'
+)
+
+# Селекторы в порядке приоритета
+TITLE_SELECTORS = [
+    'h1.orgpage-header-view__header',
+    'h1.business-title-view__title',
+    'h1.card-title-view__title',
+    'h1[itemprop="name"]',
+    '.orgpage-header-view__header',
+    '.business-title-view__title',
+    '.card-title-view__title'
+]
+
+ADDRESS_SELECTORS = [
+    '[itemprop="address"]',
+    '.business-contacts-view__address',
+    '.card-address-view__address',
+    '.orgpage-address-view__address-text',
+    '.business-address-view__address',
+    'address',
+    '.location__description'
+]
+
+SITE_SELECTORS = [
+    '.business-urls-view__link',
+    '.card-website-view__link',
+    '.orgpage-url-view__url',
+    '.website-link'
+]
+
+SIMPLE_SELECTOR_RE = re.compile(
+    r'^(?P<tag>[a-z][a-z0-9]*)?'
+    r'(?P<classes>(?:\.[\w-]+)*)'
+    r'(?:\[(?P<attr>[\w-]+)(?:(?P<op>\^?=)"(?P<value>[^"]*)")?\])?$'
+)
+
+
+class SimpleSelector:
+    """Скомпилированный простой CSS-селектор: tag.class[attr="value"] / [attr^="value"]"""
+
+    def __init__(self, selector: str):
+        match = SIMPLE_SELECTOR_RE.match(selector)
+        if not match or selector == '':
+            raise ValueError(f"Неподдерживаемый селектор: {selector}")
+
+        self.selector = selector
+        self.tag = match.group('tag')
+        self.classes = [c for c in match.group('classes').split('.') if c]
+        self.attr = match.group('attr')
+        self.op = match.group('op')
+        self.value = match.group('value')
+
+    @property
+    def dispatch_key(self) -> tuple:
+        """Ключ, по которому узел документа попадает к этому селектору"""
+        if self.classes:
+            return ('class', self.classes[0])
+        if self.tag:
+            return ('tag', self.tag)
+        return ('attr', self.attr)
+
+    def matches(self, tag: str, classes: set, attrs: Dict) -> bool:
+        """Проверка узла"""
+        if self.tag and tag != self.tag:
+            return False
+        for class_name in self.classes:
+            if class_name not in classes:
+                return False
+        if self.attr:
+            if self.attr not in attrs:
+                return False
+            value = attrs[self.attr] or ''
+            if self.op == '=' and value != self.value:
+                return False
+            if self.op == '^=' and not value.startswith(self.value):
+                return False
+        return True
+
+
+class ExtractionPlan:
+    """План извлечения: все селекторы проверяются за один обход документа
+
+    Узлы документа (в порядке следования) раздаются обработчикам полей по заранее
+    построенной таблице: ключ - тег, класс или имя атрибута. Если движок парсера
+    быстро выполняет групповой селектор (selectolax), обходит дерево он сам,
+    иначе обход идет по всем элементам документа.
+
+    first - поля, для которых нужен первый элемент по каждому селектору (порядок
+    селекторов = приоритет); collect - поля, для которых нужны все элементы.
+    """
+
+    def __init__(self, first: Dict[str, List[str]], collect: Dict[str, str]):
+        self.first_fields = {field: len(selectors) for field, selectors in first.items()}
+        self.collect_fields = list(collect)
+        self.dispatch: Dict[tuple, List[tuple]] = {}
+        selectors_in_order: List[str] = []
+
+        for field, selectors in first.items():
+            for index, selector in enumerate(selectors):
+                self._add(SimpleSelector(selector), field, index)
+
+        for field, selector in collect.items():
+            self._add(SimpleSelector(selector), field, None)
+
+        # Групповой селектор для одного прохода по документу
+        for rules in self.dispatch.values():
+            for selector, _, _ in rules:
+                if selector.selector not in selectors_in_order:
+                    selectors_in_order.append(selector.selector)
+        self.combined_selector = ', '.join(selectors_in_order)
+        self.attr_names = [key[1] for key in self.dispatch if key[0] == 'attr']
+
+    def _add(self, selector: SimpleSelector, field: str, index):
+        self.dispatch.setdefault(selector.dispatch_key, []).append((selector, field, index))
+
+    def walk(self, backend, doc) -> Dict[str, List]:
+        """Один обход документа с раздачей узлов по полям
+
+        Для полей first возвращается список по селекторам (None, если не найдено),
+        для полей collect - список всех подходящих элементов в порядке документа.
+        """
+        found = {field: [None] * size for field, size in self.first_fields.items()}
+        for field in self.collect_fields:
+            found[field] = []
+
+        dispatch = self.dispatch
+        attr_names = self.attr_names
+
+        if backend.native_group_select:
+            nodes = backend.select(doc, self.combined_selector)
+        else:
+            nodes = backend.iter_elements(doc)
+
+        for node in nodes:
+            tag = backend.tag(node)
+            attrs = backend.attrs(node)
+
+            # Ключи узла: тег, классы и имена атрибутов, для которых есть правила
+            keys = [('tag', tag)]
+            class_value = attrs.get('class')
+            if class_value:
+                keys.extend(('class', class_name) for class_name in class_value.split())
+            keys.extend(('attr', name) for name in attr_names if name in attrs)
+
+            classes = None
+            for key in keys:
+                rules = dispatch.get(key)
+                if not rules:
+                    continue
+                if classes is None:
+                    classes = set(class_value.split()) if class_value else set()
+                for selector, field, index in rules:
+                    if index is not None and found[field][index] is not None:
+                        continue
+                    if not selector.matches(tag, classes, attrs):
+                        continue
+                    if index is None:
+                        found[field].append(node)
+                    else:
+                        found[field][index] = node
+
+        return found
+
+
+STORE_PLAN = ExtractionPlan(
+    first={
+        'title': TITLE_SELECTORS,
+        'address': ADDRESS_SELECTORS,
+        'site': SITE_SELECTORS
+    },
+    collect={
+        'phones': '.orgpage-phones-view__phone-number',
+        'tel_links': 'a[href^="tel:"]',
+        'site_texts': '.business-urls-view__text'
+    }
+)
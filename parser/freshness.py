@@ -0,0 +1,44 @@
+from datetime import datetime, timedelta
+from typing import List
+
+
+class FreshnessPolicy:
+    """Политика инкрементального парсинга
+
+    Делит найденные в поиске ссылки на новые (нет в базе), устаревшие (карточка
+    обновлялась раньше max_age_days назад) и свежие. Страницы свежих магазинов
+    не открываются.
+    """
+
+    DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+    def __init__(self, db, max_age_days: float = 7):
+        self.db = db
+        self.max_age = timedelta(days=max_age_days)
+
+    def refreshed_at(self, shop) -> datetime:
+        """Когда данные магазина последний раз загружались со страницы"""
+        value = shop.get("Дата обновления карточки") or shop.get("Дата последнего обнаружения")
+        try:
+            return datetime.strptime(value, self.DATE_FORMAT)
+        except (TypeError, ValueError):
+            return None
+
+    def split(self, urls: List[str]) -> tuple:
+        """Возвращает: (new_urls, stale_urls, fresh_urls)"""
+        threshold = datetime.now() - self.max_age
+        new_urls, stale_urls, fresh_urls = [], [], []
+
+        for url in urls:
+            shop = self.db.find_shop_by_id(self.db.extract_id(url))
+            if shop is None:
+                new_urls.append(url)
+                continue
+
+            refreshed_at = self.refreshed_at(shop)
+            if refreshed_at is None or refreshed_at < threshold:
+                stale_urls.append(url)
+            else:
+                fresh_urls.append(url)
+
+        return new_urls, stale_urls, fresh_urls
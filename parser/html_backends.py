@@ -0,0 +1,225 @@
+from typing import Dict, Iterator, List, Optional
+
+from bs4 import BeautifulSoup
+
+# Теги, текст которых не относится к видимому содержимому страницы
+# (содержимое <template> не отображается, bs4 и lexbor его тоже пропускают)
+SKIP_TEXT_TAGS = ('script', 'style', 'template')
+
+
+def join_text(parts, separator: str = '', strip: bool = True) -> str:
+    """Склеиваем текстовые узлы так же, как BeautifulSoup.get_text"""
+    if not strip:
+        return separator.join(parts)
+    return separator.join(part.strip() for part in parts if part.strip())
+
+
+class HtmlBackend:
+    """Базовый интерфейс HTML-парсера для извлечения данных магазина"""
+
+    name = ''
+    # Движок быстро выполняет групповой селектор за один проход по дереву
+    native_group_select = False
+
+    def parse(self, html: str):
+        """Разбор HTML в документ"""
+        raise NotImplementedError
+
+    def select_one(self, node, selector: str):
+        """Первый элемент по CSS-селектору (в порядке документа) или None"""
+        raise NotImplementedError
+
+    def select(self, node, selector: str) -> List:
+        """Все элементы по CSS-селектору"""
+        raise NotImplementedError
+
+    def text(self, node, separator: str = '') -> str:
+        """Текст элемента (части очищены от пробелов и склеены через separator)"""
+        raise NotImplementedError
+
+    def full_text(self, doc) -> str:
+        """Весь видимый текст документа без очистки"""
+        raise NotImplementedError
+
+    def attr(self, node, name: str) -> Optional[str]:
+        """Значение атрибута элемента"""
+        raise NotImplementedError
+
+    def attrs(self, node) -> Dict[str, str]:
+        """Все атрибуты элемента"""
+        raise NotImplementedError
+
+    def iter_elements(self, doc) -> Iterator:
+        """Обход всех элементов документа в порядке следования"""
+        raise NotImplementedError
+
+    def tag(self, node) -> str:
+        """Имя тега элемента"""
+        raise NotImplementedError
+
+
+class SoupBackend(HtmlBackend):
+    """BeautifulSoup со встроенным html.parser (без дополнительных зависимостей)"""
+
+    name = 'bs4'
+
+    def parse(self, html: str):
+        return BeautifulSoup(html, 'html.parser')
+
+    def select_one(self, node, selector: str):
+        return node.select_one(selector)
+
+    def select(self, node, selector: str) -> List:
+        return node.select(selector)
+
+    def text(self, node, separator: str = '') -> str:
+        return node.get_text(separator, strip=True)
+
+    def full_text(self, doc) -> str:
+        return doc.get_text()
+
+    def attr(self, node, name: str) -> Optional[str]:
+        value = node.get(name)
+        return value if isinstance(value, str) else (' '.join(value) if value else None)
+
+    def tag(self, node) -> str:
+        return node.name
+
+    def attrs(self, node) -> Dict[str, str]:
+        attrs = node.attrs
+        # Многозначные атрибуты (class, rel) BeautifulSoup хранит списками
+        if any(isinstance(value, list) for value in attrs.values()):
+            attrs = {name: ' '.join(value) if isinstance(value, list) else value
+                     for name, value in attrs.items()}
+        return attrs
+
+    def iter_elements(self, doc) -> Iterator:
+        return doc.find_all(True)
+
+
+class LxmlBackend(HtmlBackend):
+    """lxml.html + cssselect"""
+
+    name = 'lxml'
+
+    def __init__(self):
+        import lxml.html
+        from cssselect import GenericTranslator
+        from lxml.etree import XPath
+
+        self.lxml_html = lxml.html
+        self.translator = GenericTranslator()
+        self.xpath_cache = {}
+        skip = ' and '.join(f'not(ancestor::{tag})' for tag in SKIP_TEXT_TAGS)
+        self.full_text_xpath = XPath(f'//text()[{skip}]')
+
+    def _xpath(self, selector: str):
+        xpath = self.xpath_cache.get(selector)
+        if xpath is None:
+            from lxml.etree import XPath
+            xpath = XPath(self.translator.css_to_xpath(selector, prefix='descendant::'))
+            self.xpath_cache[selector] = xpath
+        return xpath
+
+    def parse(self, html: str):
+        return self.lxml_html.document_fromstring(html)
+
+    def select_one(self, node, selector: str):
+        found = self._xpath(selector)(node)
+        return found[0] if found else None
+
+    def select(self, node, selector: str) -> List:
+        return self._xpath(selector)(node)
+
+    def text(self, node, separator: str = '') -> str:
+        return join_text(node.xpath('.//text()'), separator)
+
+    def full_text(self, doc) -> str:
+        return ''.join(self.full_text_xpath(doc))
+
+    def attr(self, node, name: str) -> Optional[str]:
+        return node.get(name)
+
+    def tag(self, node) -> str:
+        return node.tag
+
+    def attrs(self, node) -> Dict[str, str]:
+        return node.attrib
+
+    def iter_elements(self, doc) -> Iterator:
+        # Комментарии и инструкции обработки пропускаем
+        return (node for node in doc.iter() if isinstance(node.tag, str))
+
+
+class SelectolaxBackend(HtmlBackend):
+    """selectolax (движок lexbor)"""
+
+    name = 'selectolax'
+    native_group_select = True
+
+    def __init__(self):
+        from selectolax.lexbor import LexborHTMLParser
+
+        self.parser_class = LexborHTMLParser
+
+    def parse(self, html: str):
+        return self.parser_class(html)
+
+    def select_one(self, node, selector: str):
+        return node.css_first(selector)
+
+    def select(self, node, selector: str) -> List:
+        return node.css(selector)
+
+    def _text_parts(self, node, skip_hidden: bool = False):
+        for item in node.traverse(include_text=True):
+            if item.tag != '-text':
+                continue
+            if skip_hidden and item.parent is not None and item.parent.tag in SKIP_TEXT_TAGS:
+                continue
+            yield item.text_content or ''
+
+    def text(self, node, separator: str = '') -> str:
+        return join_text(self._text_parts(node), separator)
+
+    def full_text(self, doc) -> str:
+        return ''.join(self._text_parts(doc.root, skip_hidden=True))
+
+    def attr(self, node, name: str) -> Optional[str]:
+        return node.attributes.get(name)
+
+    def tag(self, node) -> str:
+        return node.tag
+
+    def attrs(self, node) -> Dict[str, str]:
+        return node.attributes
+
+    def iter_elements(self, doc) -> Iterator:
+        # Служебные узлы lexbor: -text, _comment, _document
+        return (node for node in doc.root.traverse() if node.tag[0] not in '-_')
+
+
+HTML_BACKENDS = {
+    SelectolaxBackend.name: SelectolaxBackend,
+    LxmlBackend.name: LxmlBackend,
+    SoupBackend.name: SoupBackend,
+}
+
+
+def get_html_backend(name: Optional[str] = None) -> HtmlBackend:
+    """Выбор HTML-парсера
+
+    Без имени берется самый быстрый из установленных: selectolax, lxml, затем bs4.
+    """
+    if name:
+        if name not in HTML_BACKENDS:
+            raise ValueError(f"Неизвестный HTML-парсер: {name}. Доступны: {', '.join(HTML_BACKENDS)}")
+        return HTML_BACKENDS[name]()
+
+    for backend_class in HTML_BACKENDS.values():
+        try:
+            return backend_class()
+        except ImportError:
+            continue
+
+    return SoupBackend()
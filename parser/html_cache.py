@@ -0,0 +1,123 @@
+import gzip
+import hashlib
+import os
+import sqlite3
+import time
+from typing import Dict, Iterator, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+
+def normalize_cache_url(url: str) -> str:
+    """Ключ кэша: схема и хост в нижнем регистре, без якоря, параметры отсортированы"""
+    parts = urlsplit(url.strip())
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    path = parts.path.rstrip('/') or '/'
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path, query, ''))
+
+
+class HtmlCache:
+    """Кэш сырых HTML-страниц на диске
+
+    Содержимое хранится сжатым по хэшу (одинаковые страницы - один файл),
+    индекс (URL, время загрузки, хэш, город) - в SQLite. Записи старше ttl_days удаляются.
+    """
+
+    STORE = 'store'
+    AREA = 'area'
+
+    def __init__(self, root: str = "data/html_cache", ttl_days: float = 30):
+        self.root = root
+        self.ttl_days = ttl_days
+        self.objects_dir = os.path.join(root, 'objects')
+        os.makedirs(self.objects_dir, exist_ok=True)
+
+        self.conn = sqlite3.connect(os.path.join(root, 'index.sqlite'), timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS pages (
+                url_key TEXT NOT NULL,
+                url TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                fetched_at REAL NOT NULL,
+                digest TEXT NOT NULL,
+                city TEXT,
+                PRIMARY KEY (url_key, fetched_at)
+            )
+        """)
+        # Кэш, созданный до многогородского парсинга, - без города
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(pages)")}
+        if 'city' not in columns:
+            self.conn.execute("ALTER TABLE pages ADD COLUMN city TEXT")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS pages_kind ON pages (kind, url_key)")
+        self.conn.commit()
+
+    def close(self):
+        """Закрываем индекс"""
+        self.conn.close()
+
+    def _object_path(self, digest: str) -> str:
+        return os.path.join(self.objects_dir, digest[:2], f"{digest}.html.gz")
+
+    def put(self, url: str, html: str, kind: str = STORE, fetched_at: Optional[float] = None,
+            city: Optional[str] = None) -> str:
+        """Сохраняем страницу (city - город задания, для повторного извлечения), возвращаем хэш"""
+        content = html.encode('utf-8')
+        digest = hashlib.blake2b(content, digest_size=20).hexdigest()
+        path = self._object_path(digest)
+
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with gzip.open(tmp_path, 'wb', compresslevel=6) as f:
+                f.write(content)
+            os.replace(tmp_path, path)
+
+        self.conn.execute(
+            "INSERT OR REPLACE INTO pages (url_key, url, kind, fetched_at, digest, city) VALUES (?, ?, ?, ?, ?, ?)",
+            (normalize_cache_url(url), url, kind, fetched_at or time.time(), digest, city)
+        )
+        self.conn.commit()
+        return digest
+
+    def load(self, digest: str) -> Optional[str]:
+        """Читаем содержимое по хэшу"""
+        try:
+            with gzip.open(self._object_path(digest), 'rb') as f:
+                return f.read().decode('utf-8')
+        except FileNotFoundError:
+            return None
+
+    def get(self, url: str) -> Optional[str]:
+        """Последняя сохраненная версия страницы"""
+        row = self.conn.execute(
+            "SELECT digest FROM pages WHERE url_key = ? ORDER BY fetched_at DESC LIMIT 1",
+            (normalize_cache_url(url),)
+        ).fetchone()
+        return self.load(row[0]) if row else None
+
+    def iter_latest(self, kind: str = STORE) -> Iterator[Dict]:
+        """Последняя версия каждой страницы заданного вида"""
+        rows = self.conn.execute(
+            "SELECT url, MAX(fetched_at), digest, city FROM pages WHERE kind = ? GROUP BY url_key",
+            (kind,)
+        )
+        for url, fetched_at, digest, city in rows:
+            yield {'url': url, 'fetched_at': fetched_at, 'digest': digest, 'city': city}
+
+    def evict(self, ttl_days: Optional[float] = None) -> int:
+        """Удаляем устаревшие записи и файлы, на которые больше никто не ссылается
+
+        Возвращает количество удаленных файлов
+        """
+        ttl_days = self.ttl_days if ttl_days is None else ttl_days
+        self.conn.execute("DELETE FROM pages WHERE fetched_at < ?", (time.time() - ttl_days * 86400,))
+        self.conn.commit()
+
+        alive = {digest for (digest,) in self.conn.execute("SELECT DISTINCT digest FROM pages")}
+        removed = 0
+        for directory, _, files in os.walk(self.objects_dir):
+            for name in files:
+                if name.endswith('.html.gz') and name[:-len('.html.gz')] not in alive:
+                    os.remove(os.path.join(directory, name))
+                    removed += 1
+        return removed
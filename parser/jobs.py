@@ -0,0 +1,137 @@
+import json
+import os
+from typing import Dict, List, Optional, Sequence
+from urllib.parse import quote
+
+from .extraction import ROSTOV_PATTERNS
+from .resource_policy import DEFAULT_POLICY, ResourcePolicy
+from .tiling import ROSTOV_BBOX, TilePlanner
+
+__all__ = ['CityConfig', 'CrawlJob', 'CrawlConfig', 'DEFAULT_CITY', 'DEFAULT_QUERIES']
+
+DEFAULT_QUERIES = ("пиротехника",)
+
+
+class CityConfig:
+    """Город парсинга: название, раздел Яндекс Карт, границы и признаки адреса"""
+
+    def __init__(self, name: str, region: str, bbox: Sequence[float],
+                 address_patterns: Sequence[str] = ()):
+        """
+        Args:
+            name: Название города (поле 'Город' и статистика отчета)
+            region: Раздел города в ссылках Яндекс Карт, например 39/rostov-na-donu
+            bbox: Границы города (запад, юг, восток, север)
+            address_patterns: Подстроки адреса в нижнем регистре, по которым магазин
+                относится к городу (по умолчанию - название города)
+        """
+        self.name = name
+        self.region = region.strip('/')
+        self.bbox = tuple(bbox)
+        self.address_patterns = tuple(p.lower() for p in address_patterns) or (name.lower(),)
+
+    def matches_address(self, address: str) -> bool:
+        """Адрес находится в этом городе"""
+        address_lower = address.lower()
+        return any(pattern in address_lower for pattern in self.address_patterns)
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'CityConfig':
+        return cls(data['name'], data['region'], data['bbox'], data.get('address_patterns', ()))
+
+    def __repr__(self):
+        return f"CityConfig({self.name!r})"
+
+
+DEFAULT_CITY = CityConfig("Ростов-на-Дону", "39/rostov-na-donu", ROSTOV_BBOX, ROSTOV_PATTERNS)
+
+
+class CrawlJob:
+    """Задание парсинга: один поисковый запрос в одном городе"""
+
+    def __init__(self, city: CityConfig, query: str, saturation: int = 50, max_depth: int = 3,
+                 probe: Optional[int] = None):
+        self.city = city
+        self.query = query
+        self.name = f"{city.name}: {query}"
+        self.planner = TilePlanner(city.bbox, self.search_url, name=self.name, city=city.name,
+                                   saturation=saturation, max_depth=max_depth, probe=probe)
+
+    @property
+    def search_url(self) -> str:
+        """Ссылка на поиск без параметров карты (запрос экранируется: /, ? и # ломают путь)"""
+        return f"https://yandex.ru/maps/{self.city.region}/search/{quote(self.query, safe='')}/"
+
+    def areas(self) -> List[Dict]:
+        """Начальные области поиска задания"""
+        return self.planner.root()
+
+    def __repr__(self):
+        return f"CrawlJob({self.name!r})"
+
+
+class CrawlConfig:
+    """Настройки многогородского парсинга из JSON-файла
+
+    Города × запросы разворачиваются в задания CrawlJob. Вкладки, лимит
+    запросов (max_tabs, requests_per_second, burst) и блокировка лишних
+    запросов страниц (block_resources) общие для всех заданий:
+    все они выполняются одним парсером с одним браузером. Формат файла - см.
+    crawl.json в корне проекта; у города может быть свой список queries.
+    """
+
+    def __init__(self, cities: Sequence[CityConfig] = (DEFAULT_CITY,),
+                 queries: Sequence[str] = DEFAULT_QUERIES,
+                 city_queries: Optional[Dict[str, Sequence[str]]] = None,
+                 max_tabs: int = 3, requests_per_second: float = 0.5, burst: int = 2,
+                 saturation: int = 50, max_depth: int = 3, probe: Optional[int] = None,
+                 resource_policy: Optional[ResourcePolicy] = DEFAULT_POLICY):
+        self.cities = list(cities)
+        self.queries = list(queries)
+        # Город -> собственный список запросов
+        self.city_queries = dict(city_queries or {})
+        self.max_tabs = max_tabs
+        self.requests_per_second = requests_per_second
+        self.burst = burst
+        self.saturation = saturation
+        self.max_depth = max_depth
+        self.probe = probe
+        self.resource_policy = resource_policy
+
+    @classmethod
+    def load(cls, path: Optional[str]) -> 'CrawlConfig':
+        """Читаем настройки; без файла - Ростов-на-Дону и запрос «пиротехника»"""
+        if not path or not os.path.exists(path):
+            return cls()
+
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+
+        cities = [CityConfig.from_dict(city) for city in data.get('cities', [])] or [DEFAULT_CITY]
+        city_queries = {city['name']: city['queries'] for city in data.get('cities', []) if city.get('queries')}
+        options = {key: data[key] for key in ('max_tabs', 'requests_per_second', 'burst',
+                                              'saturation', 'max_depth', 'probe') if key in data}
+        # block_resources: false - загружать все, объект - свои списки блокировки
+        block_resources = data.get('block_resources', True)
+        if isinstance(block_resources, dict):
+            options['resource_policy'] = ResourcePolicy.from_dict(block_resources)
+        elif not block_resources:
+            options['resource_policy'] = None
+        return cls(cities, data.get('queries') or DEFAULT_QUERIES, city_queries, **options)
+
+    def jobs(self) -> List[CrawlJob]:
+        """Задания: каждый город с каждым своим запросом"""
+        return [
+            CrawlJob(city, query, self.saturation, self.max_depth, self.probe)
+            for city in self.cities
+            for query in self.city_queries.get(city.name, self.queries)
+        ]
+
+    def parser_options(self) -> Dict:
+        """Общий бюджет параллельности и частоты запросов и политика блокировки для YandexPyroParser"""
+        return {
+            'max_tabs': self.max_tabs,
+            'requests_per_second': self.requests_per_second,
+            'burst': self.burst,
+            'resource_policy': self.resource_policy,
+        }
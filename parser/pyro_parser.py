@@ -1,145 +1,196 @@
 import asyncio
+import json
+from collections import deque
 import random
-import re
 import time
 from datetime import datetime
-from typing import List, Dict, Set
+from typing import Callable, Dict, List, Optional, Set
 from bs4 import BeautifulSoup
-import nodriver
 
+from core.shop_keys import dedup_key, extract_org_id, normalize_shop_url, shop_key
+
+from .rate_limiter import HostRateLimiter
+from .readiness import PageReadiness
+from .extraction import CLEAN_PHONE_RE, PHONE_PATTERNS, STORE_PLAN
+from .html_backends import get_html_backend
+from .browser_pool import start_browser
+from .checkpoint import CrawlCheckpoint
+from .freshness import FreshnessPolicy
+from .html_cache import HtmlCache
+from .jobs import CityConfig, CrawlJob, DEFAULT_CITY, DEFAULT_QUERIES
+from .resource_policy import DEFAULT_POLICY, ResourceBlocker, ResourcePolicy, TrafficStats
+from .scroller import ListScroller, ScrollResult
+from .search_api import SearchApiCollector
+from .tab_pool import TabPool
+from .tiling import TilePlanner, area_summary
 
-class YandexPyroParser:
-    """Парсер Яндекс Карт для магазинов пиротехники в Ростове-на-Дону"""
 
-    def __init__(self, headless: bool = False):
+class YandexPyroParser:
+    """Парсер Яндекс Карт для магазинов пиротехники
+
+    Выполняет задания CrawlJob (город × запрос) одним браузером: вкладки и лимит
+    запросов общие, страница магазина, найденная по нескольким запросам,
+    открывается один раз. По умолчанию - Ростов-на-Дону, запрос «пиротехника».
+    """
+
+    # Поля, которые должен содержать ответ поиска (пустое значение - тоже ответ),
+    # иначе данные неполные и нужна страница магазина
+    SEARCH_API_FIELDS = ('Название магазина', 'Адрес', 'Телефон', 'Сайт')
+
+    def __init__(self, headless: bool = False, max_tabs: int = 3,
+                 requests_per_second: float = 0.5, burst: int = 2,
+                 use_search_api: bool = True, html_backend: str = None,
+                 html_cache: HtmlCache = None, freshness: FreshnessPolicy = None,
+                 checkpoint: CrawlCheckpoint = None, tiling: TilePlanner = None,
+                 jobs: List[CrawlJob] = None, browser=None, user_data_dir: str = None,
+                 resource_policy: Optional[ResourcePolicy] = DEFAULT_POLICY,
+                 rate_limiter: HostRateLimiter = None):
         self.headless = headless
-        self.browser = None
+        # Готовый браузер (BrowserPool) не закрывается парсером
+        self.browser = browser
+        self.owns_browser = browser is None
+        # Постоянный профиль Chrome: cookies и HTTP-кэш между запусками
+        self.user_data_dir = user_data_dir
+        # Параллельная загрузка страниц магазинов: N вкладок и общий лимит запросов
+        # (готовый лимит, например общий для заданий демона, важнее requests_per_second)
+        self.max_tabs = max_tabs
+        self.rate_limiter = rate_limiter or HostRateLimiter(rate=requests_per_second, burst=burst)
+        # Ожидание готовности страниц по событиям вместо фиксированных пауз
+        self.readiness = PageReadiness()
+        # Прокрутка списков областей до конца по сигналам DOM
+        self.scroller = ListScroller(stats=self.readiness.stats)
+        # Блокировка картинок, шрифтов, тайлов и метрики (None - загружать все)
+        # и учет трафика по вкладкам (ID вкладки -> блокировщик)
+        self.resource_policy = resource_policy
+        self.blockers: Dict[str, ResourceBlocker] = {}
+        self.traffic = TrafficStats()
+        # Данные организаций из перехваченных ответов поиска (ID -> JSON)
+        self.use_search_api = use_search_api
+        self.api_items: Dict[str, Dict] = {}
+        # HTML-парсер для страниц магазинов: selectolax, lxml или bs4
+        self.html_backend = get_html_backend(html_backend)
+        # Кэш сырого HTML для повторного извлечения без сети (необязательно)
+        self.html_cache = html_cache
+        # Инкрементальный режим: свежие магазины из базы не открываются
+        self.freshness = freshness
+        self.fresh_urls: List[str] = []
+        # Журнал контрольных точек для продолжения после падения (необязательно)
+        self.checkpoint = checkpoint
         self.all_urls: Set[str] = set()
         self.results: List[Dict] = []
-
-        # Области для поиска (разные части города)
-        self.search_areas = [
-            {
-                "name": "Весь город (общий поиск)",
-                "url": "https://yandex.ru/maps/39/rostov-na-donu/search/пиротехника/?ll=39.720451%2C47.232724&sll=39.720451%2C47.232724&sspn=0.672226%2C0.318267&z=11"
-            },
-            {
-                "name": "Центр города детально",
-                "url": "https://yandex.ru/maps/39/rostov-na-donu/search/пиротехника/?ll=39.720451%2C47.232724&sll=39.720451%2C47.232724&sspn=0.336113%2C0.159133&z=12"
-            },
-            {
-                "name": "Северные районы",
-                "url": "https://yandex.ru/maps/39/rostov-na-donu/search/пиротехника/?ll=39.720451%2C47.282724&sll=39.720451%2C47.282724&sspn=0.336113%2C0.159133&z=12"
-            },
-            {
-                "name": "Южные районы",
-                "url": "https://yandex.ru/maps/39/rostov-na-donu/search/пиротехника/?ll=39.720451%2C47.182724&sll=39.720451%2C47.182724&sspn=0.336113%2C0.159133&z=12"
-            },
-            {
-                "name": "Западные районы",
-                "url": "https://yandex.ru/maps/39/rostov-na-donu/search/пиротехника/?ll=39.620451%2C47.232724&sll=39.620451%2C47.232724&sspn=0.336113%2C0.159133&z=12"
-            },
-            {
-                "name": "Восточные районы",
-                "url": "https://yandex.ru/maps/39/rostov-na-donu/search/пиротехника/?ll=39.820451%2C47.232724&sll=39.820451%2C47.232724&sspn=0.336113%2C0.159133&z=12"
-            }
-        ]
+        self.completed = False
+        # Вызывается для каждого готового города: (город, магазины, ссылки свежих магазинов)
+        self.on_city_done: Optional[Callable[[str, List[Dict], List[str]], None]] = None
+
+        # Ссылки текущей области и статистика по пройденным областям
+        self.area_urls: Set[str] = set()
+        self.area_stats: List[Dict] = []
+
+        # Задания город × запрос; без заданий - Ростов-на-Дону и «пиротехника»
+        self.jobs = jobs or [CrawlJob(DEFAULT_CITY, DEFAULT_QUERIES[0])]
+        self.cities: Dict[str, CityConfig] = {job.city.name: job.city for job in self.jobs}
+        # Город текущей области и города найденных ссылок (по первому обнаружению)
+        self.city = self.jobs[0].city
+        self.url_cities: Dict[str, str] = {}
+        # Ключ магазина -> ссылка: организация из разных запросов открывается один раз
+        self.link_keys: Dict[str, str] = {}
+
+        # Области поиска: квадродерево от окна на весь город для каждого задания,
+        # насыщенные области делятся на четверти по ходу парсинга
+        self.tiling = tiling or self.jobs[0].planner
+        self.search_areas = self.tiling.root() if tiling else [area for job in self.jobs for area in job.areas()]
 
     async def init_browser(self) -> bool:
-        """Инициализация браузера"""
+        """Инициализация браузера (прогретый браузер из пула используется как есть)"""
+        if self.browser and not self.owns_browser:
+            print("🔥 Используем прогретый браузер")
+            return True
+
         try:
             print("🚀 Запуск браузера...")
-            self.browser = await nodriver.start(
-                headless=self.headless,
-                window_size=(1300, 900),
-                disable_webgl=True,
-                disable_extensions=True
-            )
+            self.browser = await start_browser(self.headless, self.user_data_dir)
             return True
         except Exception as e:
             print(f"❌ Ошибка инициализации браузера: {e}")
             return False
 
     async def close(self):
-        """Закрытие браузера"""
+        """Закрытие браузера (чужой браузер из пула остается запущенным)"""
+        if not self.owns_browser:
+            # Следующее задание подключит к вкладкам свою политику
+            for blocker in self.blockers.values():
+                await blocker.stop()
+            self.blockers.clear()
+            return
+        self.blockers.clear()
         try:
             if self.browser:
-                await self.browser.stop()
+                self.browser.stop()
                 self.browser = None
         except Exception as e:
             print(f"⚠ Предупреждение при закрытии браузера: {e}")
 
     async def parse(self) -> List[Dict]:
-        """Основной метод парсинга"""
+        """Основной метод парсинга
+
+        Города обходятся по очереди: сначала области всех запросов города,
+        затем страницы его магазинов. Готовый город сразу передается в
+        on_city_done(город, магазины, ссылки свежих магазинов), поэтому база и
+        отчет города обновляются, пока парсится следующий город.
+        """
         print("=" * 80)
-        print("🔥 ПАРСЕР МАГАЗИНОВ ПИРОТЕХНИКИ - РОСТОВ-НА-ДОНУ")
+        print(f"🔥 ПАРСЕР МАГАЗИНОВ ПИРОТЕХНИКИ - {', '.join(self.cities).upper()}")
         print("=" * 80)
+        print(f"📋 Заданий: {len(self.jobs)} ({'; '.join(job.name for job in self.jobs)})")
 
         self.start_time = time.time()
         self.results = []
         self.all_urls.clear()
+        self.url_cities.clear()
+        self.link_keys.clear()
+        self.api_items.clear()
+        self.area_stats = []
+        self.fresh_urls = []
+        # Парсинг дошел до конца: только такой запуск можно сравнивать с базой
+        self.completed = False
+
+        # Продолжаем с последней контрольной точки
+        if self.checkpoint and self.checkpoint.restored:
+            self.url_cities.update(self.checkpoint.url_cities)
+            for url in self.checkpoint.urls:
+                self.add_store_link(url, self.url_cities.get(url))
+            self.api_items.update(self.checkpoint.api_items)
+            print(f"⏯ Продолжаем парсинг: готово областей {len(self.checkpoint.done_areas)}, "
+                  f"ссылок {len(self.all_urls)}, страниц магазинов {len(self.checkpoint.results)}")
+
+        if self.html_cache:
+            removed = self.html_cache.evict()
+            if removed:
+                print(f"🗑 Удалено устаревших страниц из кэша: {removed}")
 
         if not await self.init_browser():
             return []
 
         try:
-            # 1. Парсим все области города
-            print(f"\n🎯 НАЧИНАЕМ ПАРСИНГ {len(self.search_areas)} ОБЛАСТЕЙ...")
-
-            for i, area in enumerate(self.search_areas, 1):
-                print(f"\n{'=' * 60}")
-                print(f"Область {i}/{len(self.search_areas)}: {area['name']}")
-                print(f"{'=' * 60}")
-
-                urls_before = len(self.all_urls)
-
-                # Загружаем страницу поиска для этой области
-                print(f"🌐 Открываем: {area['name']}")
-                page = await self.browser.get(area['url'])
-                await asyncio.sleep(4)
-
-                # Скрапим эту область
-                await self.smart_area_scroll(page)
-
-                # Собираем ссылки
-                await self.collect_store_links(page)
-
-                new_urls = len(self.all_urls) - urls_before
-                print(f"✅ В области найдено магазинов: {new_urls}")
-
-                # Пауза между областями
-                if i < len(self.search_areas):
-                    await asyncio.sleep(random.uniform(5, 8))
-
-            if not self.all_urls:
-                print("❌ Не удалось собрать ссылки")
-                return []
-
-            print(f"\n✅ Всего собрано ссылок на магазины: {len(self.all_urls)}")
-
-            # 2. Парсим каждый магазин
-            print("\n🏪 ПАРСИМ ДАННЫЕ МАГАЗИНОВ...")
-            urls_list = list(self.all_urls)
-
-            for i, url in enumerate(urls_list, 1):
-                print(f"   {i}/{len(urls_list)}: {url}")
-                data = await self.parse_store_page(url)
-                if data:
-                    self.results.append(data)
-                    print(f"      ✅ Получены данные: {data.get('Название магазина', 'Без названия')}")
-                else:
-                    print(f"      ⚠ Не удалось получить данные")
-
-                # Задержка между запросами
-                if i < len(urls_list):
-                    await asyncio.sleep(random.uniform(3, 5))
+            failed_cities = []
+            for city in self.cities:
+                city_run = await self.parse_city(city)
+                if city_run is None:
+                    failed_cities.append(city)
+                    continue
 
-            # 3. Удаляем дубликаты
-            self.remove_duplicates()
+                results, fresh_urls = city_run
+                self.results.extend(results)
+                self.fresh_urls.extend(fresh_urls)
+                if self.on_city_done:
+                    self.on_city_done(city, results, fresh_urls)
 
-            # 4. Выводим статистику
+            # Выводим статистику
             self.print_statistics()
 
+            if failed_cities:
+                print(f"❌ Не удалось собрать ссылки: {', '.join(failed_cities)}")
+            self.completed = not failed_cities
             return self.results
 
         except Exception as e:
@@ -150,115 +201,245 @@ class YandexPyroParser:
         finally:
             await self.close()
 
-    async def smart_area_scroll(self, page):
-        """Скроллинг для конкретной области"""
-        max_scrolls = 30
-        no_new_count = 0
-        previous_count = 0
+    def area_city(self, area: Dict) -> CityConfig:
+        """Город области (у заданных вручную областей - город первого задания)"""
+        return self.cities.get(area.get('city'), self.jobs[0].city)
+
+    async def parse_city(self, city: str) -> Optional[tuple]:
+        """Области и страницы магазинов одного города
+
+        Возвращает: (магазины, ссылки свежих магазинов) или None, если ссылки
+        на магазины города не собраны
+        """
+        # 1. Парсим все области города (насыщенные области добавляют свои четверти)
+        areas = [area for area in self.search_areas if self.area_city(area).name == city]
+        print(f"\n🎯 {city.upper()}: ПАРСИНГ ОБЛАСТЕЙ (начальных: {len(areas)})...")
+        await self.crawl_areas(areas)
+
+        # Ссылка относится к городу, где она найдена впервые: организация,
+        # найденная и в соседнем городе, открывается один раз
+        urls_list = [url for url in self.all_urls if self.url_cities.get(url) == city]
+        if not urls_list:
+            print(f"❌ Не удалось собрать ссылки: {city}")
+            return None
 
-        for scroll_num in range(1, max_scrolls + 1):
-            print(f"   📍 Скролл {scroll_num}/{max_scrolls}")
+        print(f"\n✅ Собрано ссылок на магазины ({city}): {len(urls_list)}")
+
+        # 2. Парсим каждый магазин
+        print(f"\n🏪 ПАРСИМ ДАННЫЕ МАГАЗИНОВ (вкладок: {self.max_tabs})...")
+
+        # Свежие магазины только отмечаем как найденные, страницы не открываем
+        fresh_urls = []
+        if self.freshness:
+            new_urls, stale_urls, fresh_urls = self.freshness.split(urls_list)
+            urls_list = new_urls + stale_urls
+            print(f"   🆕 Новых: {len(new_urls)}, ♻ устаревших: {len(stale_urls)}, "
+                  f"✔ свежих (без загрузки): {len(fresh_urls)}")
+
+        # Магазины с полными данными из ответов поиска не открываем
+        api_results, urls_list = self.split_by_search_api(urls_list)
+        if api_results:
+            print(f"   🛰 Данные из ответов поиска: {len(api_results)}, открываем страниц: {len(urls_list)}")
+
+        # Страницы, загруженные до перезапуска, повторно не открываем
+        restored_results = []
+        if self.checkpoint and self.checkpoint.results:
+            restored_results = [self.checkpoint.results[url] for url in urls_list
+                                if url in self.checkpoint.results]
+            urls_list = [url for url in urls_list if url not in self.checkpoint.results]
+            print(f"   ⏯ Из контрольной точки: {len(restored_results)}, осталось открыть: {len(urls_list)}")
+
+        results = api_results + restored_results + await self.parse_store_pages(urls_list)
+
+        # 3. Удаляем дубликаты
+        return self.unique_results(results), fresh_urls
+
+    async def crawl_areas(self, areas: List[Dict]):
+        """Обход областей с делением насыщенных на четверти"""
+        pending = deque(areas)
+        i = 0
+        while pending:
+            area = pending.popleft()
+            i += 1
+            print(f"\n{'=' * 60}")
+            print(f"Область {i}/{i + len(pending)}: {area['name']}")
+            print(f"{'=' * 60}")
+
+            self.city = self.area_city(area)
+
+            if self.checkpoint and area['url'] in self.checkpoint.done_areas:
+                print("⏭ Область уже обработана до перезапуска")
+                hits, list_ended = self.checkpoint.area_hits.get(area['url'], (0, True))
+                pending.extend(self.tiling.split(area, hits, list_ended))
+                continue
+
+            urls_before = set(self.all_urls)
+            items_before = set(self.api_items)
+
+            new_urls = await self.crawl_area(area)
+            area_stat = self.area_stats[-1]
+            print(f"✅ В области найдено магазинов: {area_stat['hits']}, новых: {new_urls} "
+                  f"(скроллов {area_stat['scrolls']}, {area_stat['seconds']:.1f} сек)")
+
+            children = self.tiling.split(area, area_stat['hits'], area_stat['list_ended'])
+            if children:
+                print(f"   🔲 Список области насыщен - делим на {len(children)} части")
+                pending.extend(children)
+
+            if self.checkpoint:
+                self.checkpoint.area_done(
+                    area,
+                    list(self.all_urls - urls_before),
+                    {key: item for key, item in self.api_items.items() if key not in items_before},
+                    hits=area_stat['hits'],
+                    list_ended=area_stat['list_ended'],
+                    city=self.city.name
+                )
+
+            # Пауза между областями
+            if pending:
+                await asyncio.sleep(random.uniform(5, 8))
+
+    async def crawl_area(self, area: Dict) -> int:
+        """Сбор ссылок на магазины в одной области поиска
+
+        Возвращает количество новых ссылок
+        """
+        urls_before = len(self.all_urls)
+        self.area_urls = set()
+
+        # Загружаем страницу поиска для этой области
+        print(f"🌐 Открываем: {area['name']}")
+        blocker = await self.watch_tab(self.browser.main_tab)
+        blocker.take()
+
+        # Перехватываем ответы поиска с первой страницы списка: подписываемся на
+        # вкладку до перехода, дальше результаты подгружаются при скроллинге
+        collector = None
+        if self.use_search_api:
+            collector = SearchApiCollector(self.browser.main_tab)
+            await collector.start()
 
-            # Сохраняем текущее количество
-            current_count_before = len(self.all_urls)
+        try:
+            page = await self.browser.get(area['url'])
+            await self.readiness.wait_for_search_results(page)
 
-            # Выполняем скролл
-            await self.execute_scroll_strategies(page)
-            await asyncio.sleep(random.uniform(1.5, 2.5))
+            # Скрапим эту область
+            scroll = await self.smart_area_scroll(page, self.tiling.scroll_limit(area))
 
             # Собираем ссылки
             await self.collect_store_links(page)
 
-            # Проверяем, появились ли новые ссылки
-            new_urls = len(self.all_urls) - current_count_before
-
-            if new_urls > 0:
-                print(f"   📥 Новых магазинов: {new_urls}")
-                no_new_count = 0
-            else:
-                no_new_count += 1
-                print(f"   📭 Новых магазинов нет ({no_new_count}/3)")
-
-                if no_new_count >= 3:
-                    print("   🏁 Завершаем скроллинг этой области")
-                    break
-
-            # Если количество ссылок не меняется 3 раза подряд - выходим
-            if len(self.all_urls) == previous_count:
-                no_new_count += 1
+            # Сохраняем итоговый HTML списка области
+            if self.html_cache:
+                self.html_cache.put(area['url'], await page.get_content(), HtmlCache.AREA, city=self.city.name)
+        finally:
+            self.traffic.record('Список области', blocker.take())
+            if collector:
+                await collector.stop()
+                self.api_items.update(collector.items)
+                print(f"   🛰 Ответов поиска: {collector.responses}, организаций: {len(collector.items)}")
+
+        new_urls = len(self.all_urls) - urls_before
+        self.area_stats.append({
+            "name": area['name'],
+            "hits": len(self.area_urls),
+            "new": new_urls,
+            "scrolls": scroll.scrolls,
+            "seconds": round(scroll.seconds, 2),
+            "list_ended": scroll.list_ended,
+        })
+        return new_urls
+
+    async def parse_store_pages(self, urls: List[str], pool: TabPool = None) -> List[Dict]:
+        """Параллельный парсинг страниц магазинов в пуле вкладок
+
+        Если пул не передан, он открывается и закрывается внутри вызова
+        """
+        own_pool = pool is None
+        if own_pool:
+            pool = TabPool(self.browser, self.max_tabs)
+            await pool.open()
+
+        results: List[Dict] = [None] * len(urls)
+
+        async def worker(i: int, url: str):
+            async with pool.tab() as tab:
+                # Общий лимит частоты вместо фиксированных пауз между запросами
+                await self.rate_limiter.acquire(url)
+                print(f"   {i + 1}/{len(urls)}: {url}")
+                data = await self.parse_store_page(url, tab)
+
+            if data:
+                results[i] = data
+                if self.checkpoint:
+                    self.checkpoint.store_done(url, data)
+                print(f"      ✅ Получены данные: {data.get('Название магазина', 'Без названия')}")
             else:
-                no_new_count = 0
-
-            previous_count = len(self.all_urls)
-
-            # Короткая пауза
-            await asyncio.sleep(random.uniform(0.5, 1))
+                print(f"      ⚠ Не удалось получить данные: {url}")
 
-    async def execute_scroll_strategies(self, page):
-        """Выполнение скролла контейнера"""
         try:
-            # Скролл контейнера с результатами
-            await page.evaluate("""
-                (function() {
-                    // Ищем контейнер с результатами
-                    const containers = [
-                        '.scroll__container',
-                        '.scroll__container_width_narrow',
-                        '.search-list-view__list-container',
-                        '.sidebar-view__panel',
-                        '.scrollable-container'
-                    ];
-
-                    for (const selector of containers) {
-                        const container = document.querySelector(selector);
-                        if (container && container.scrollHeight > container.clientHeight) {
-                            container.scrollTop = container.scrollHeight;
-                            console.log('Скролл контейнера: ' + selector);
-                            return true;
-                        }
+            await asyncio.gather(*(worker(i, url) for i, url in enumerate(urls)))
+        finally:
+            if own_pool:
+                for tab in pool.own_tabs:
+                    self.blockers.pop(tab.target.target_id, None)
+                await pool.close()
+
+        # Сохраняем исходный порядок ссылок
+        return [data for data in results if data]
+
+    async def smart_area_scroll(self, page, limit: int = None) -> ScrollResult:
+        """Скроллинг для конкретной области до настоящего конца списка
+
+        Конец списка определяется по ссылкам самой области и сигналам DOM
+        (ListScroller), а не по общему множеству ссылок: иначе область, чьи
+        магазины уже встречались, бросалась бы на первых экранах и ее
+        насыщенность нельзя было бы оценить. limit - после стольких ссылок
+        область считается насыщенной и дальше не прокручивается.
+        """
+        return await self.scroller.scroll_area(
+            page,
+            collect=lambda: self.collect_store_links(page),
+            count=lambda: len(self.area_urls),
+            limit=limit
+        )
+
+    # Сбор новых ссылок внутри страницы: возвращает только ссылки карточек,
+    # которых еще не было в предыдущих вызовах (seen-set хранится в window)
+    COLLECT_LINKS_JS = """
+        (function() {
+            const seen = window.__pyroSeenLinks || (window.__pyroSeenLinks = new Set());
+            const patterns = ['/org/', '/firm/', 'businessId='];
+            const found = [];
+
+            for (const item of document.querySelectorAll('li.search-snippet-view')) {
+                // Ищем ссылки внутри data-nosnippet, иначе - во всем элементе
+                const scope = item.querySelector('span[data-nosnippet]') || item;
+                const candidates = [];
+                for (const link of scope.querySelectorAll('a[href]')) {
+                    const href = link.getAttribute('href');
+                    if (href && patterns.some(p => href.includes(p))) {
+                        candidates.push(href);
                     }
-                    return false;
-                })();
-            """)
-
-        except Exception as e:
-            print(f"   ⚠ Ошибка скролла: {e}")
+                }
+                if (candidates.length && !seen.has(candidates[0])) {
+                    seen.add(candidates[0]);
+                    found.push(candidates);
+                }
+            }
+            return JSON.stringify(found);
+        })();
+    """
 
     async def collect_store_links(self, page):
         """Сбор ссылок на магазины из списка результатов"""
         try:
-            # Получаем HTML страницы
-            html = await page.get_content()
-            soup = BeautifulSoup(html, 'html.parser')
-
-            # Ищем все элементы li с классом search-snippet-view
-            store_items = soup.find_all('li', class_='search-snippet-view')
-
             urls_before = len(self.all_urls)
 
-            for item in store_items:
-                # Ищем ссылку внутри data-nosnippet
-                nosnippet = item.find('span', attrs={'data-nosnippet': True})
-                if nosnippet:
-                    # Ищем все ссылки внутри nosnippet
-                    links = nosnippet.find_all('a', href=True)
-                    for link in links:
-                        href = link['href']
-                        if self.is_store_url(href):
-                            full_url = self.normalize_url(href)
-                            if full_url:
-                                self.all_urls.add(full_url)
-                                break  # Берем первую подходящую ссылку
-                else:
-                    # Если нет data-nosnippet, ищем ссылки непосредственно в элементе
-                    links = item.find_all('a', href=True)
-                    for link in links:
-                        href = link['href']
-                        if self.is_store_url(href):
-                            full_url = self.normalize_url(href)
-                            if full_url:
-                                self.all_urls.add(full_url)
-                                break
+            # Быстрый путь - новые ссылки прямо из страницы, иначе разбор всего HTML
+            if not await self.collect_store_links_js(page):
+                await self.collect_store_links_html(page)
 
             new_urls = len(self.all_urls) - urls_before
             if new_urls > 0:
@@ -267,6 +448,78 @@ class YandexPyroParser:
         except Exception as e:
             print(f"❌ Ошибка сбора ссылок: {e}")
 
+    async def collect_store_links_js(self, page) -> bool:
+        """Сбор новых ссылок скриптом в странице
+
+        Возвращает False, если скрипт не отработал и нужен запасной путь
+        """
+        try:
+            result = await page.evaluate(self.COLLECT_LINKS_JS)
+            if not isinstance(result, str):
+                return False
+            items = json.loads(result)
+        except Exception as e:
+            print(f"   ⚠ Сбор ссылок скриптом не удался: {e}")
+            return False
+
+        for candidates in items:
+            # Берем первую подходящую ссылку
+            for href in candidates:
+                full_url = self.normalize_url(href)
+                if full_url:
+                    self.add_store_link(full_url)
+                    break
+
+        return True
+
+    async def collect_store_links_html(self, page):
+        """Сбор ссылок разбором полного HTML страницы (запасной путь)"""
+        # Получаем HTML страницы
+        html = await page.get_content()
+        soup = BeautifulSoup(html, 'html.parser')
+
+        # Ищем все элементы li с классом search-snippet-view
+        store_items = soup.find_all('li', class_='search-snippet-view')
+
+        for item in store_items:
+            # Ищем ссылку внутри data-nosnippet
+            nosnippet = item.find('span', attrs={'data-nosnippet': True})
+            if nosnippet:
+                # Ищем все ссылки внутри nosnippet
+                links = nosnippet.find_all('a', href=True)
+                for link in links:
+                    href = link['href']
+                    if self.is_store_url(href):
+                        full_url = self.normalize_url(href)
+                        if full_url:
+                            self.add_store_link(full_url)
+                            break  # Берем первую подходящую ссылку
+            else:
+                # Если нет data-nosnippet, ищем ссылки непосредственно в элементе
+                links = item.find_all('a', href=True)
+                for link in links:
+                    href = link['href']
+                    if self.is_store_url(href):
+                        full_url = self.normalize_url(href)
+                        if full_url:
+                            self.add_store_link(full_url)
+                            break
+
+    def add_store_link(self, url: str, city: str = None):
+        """Ссылка на магазин из списка текущей области
+
+        Ссылка на уже найденную организацию (по другому запросу) заменяется
+        первой, город магазина - город области, где он найден впервые
+        """
+        url = self.link_keys.setdefault(shop_key(url), url)
+        self.all_urls.add(url)
+        self.area_urls.add(url)
+        self.url_cities.setdefault(url, city or self.city.name)
+
+    def city_for(self, url: str) -> CityConfig:
+        """Город магазина по ссылке"""
+        return self.cities.get(self.url_cities.get(url), self.city)
+
     def is_store_url(self, url: str) -> bool:
         """Проверка, является ли URL ссылкой на магазин"""
         if not url:
@@ -283,45 +536,34 @@ class YandexPyroParser:
 
     def normalize_url(self, url: str) -> str:
         """Нормализация URL - оставляем только базовую ссылку на магазин"""
-        if not url:
-            return ""
-
-        # Список вкладок, которые нужно обрезать
-        tabs_to_remove = ['/reviews', '/photos', '/gallery', '/menu']
-
-        # Добавляем домен если нужно
-        if url.startswith('//'):
-            url = f"https:{url}"
-        elif url.startswith('/'):
-            url = f"https://yandex.ru{url}"
-        elif not url.startswith('http'):
-            return ""
-
-        # Удаляем параметры запроса и якоря
-        url = url.split('?')[0].split('#')[0].strip()
-
-        # Обрезаем вкладки (reviews, photos, gallery, menu)
-        for tab in tabs_to_remove:
-            if tab in url:
-                # Находим позицию вкладки и обрезаем до неё
-                tab_index = url.find(tab)
-                if tab_index != -1:
-                    url = url[:tab_index]
-
-        # Удаляем конечные слеши
-        url = url.rstrip('/')
-
-        return url
-
-    async def parse_store_page(self, url: str) -> Dict:
-        """Парсинг страницы магазина"""
+        return normalize_shop_url(url)
+
+    async def watch_tab(self, tab) -> ResourceBlocker:
+        """Блокировка лишних запросов и учет трафика вкладки (подключается один раз)"""
+        target_id = tab.target.target_id
+        blocker = self.blockers.get(target_id)
+        if blocker is None:
+            blocker = ResourceBlocker(tab, self.resource_policy)
+            await blocker.start()
+            self.blockers[target_id] = blocker
+        return blocker
+
+    async def parse_store_page(self, url: str, tab=None) -> Dict:
+        """Парсинг страницы магазина (в переданной вкладке или в основной)"""
         try:
-            print(f"      📖 Открываем страницу магазина...")
-            page = await self.browser.get(url)
-            await asyncio.sleep(random.uniform(3, 4))
+            blocker = await self.watch_tab(tab if tab is not None else self.browser.main_tab)
+            blocker.take()
+            if tab is not None:
+                page = await tab.get(url)
+            else:
+                page = await self.browser.get(url)
+            await self.readiness.wait_for_org_card(page)
 
             # Получаем HTML
             html = await page.get_content()
+            self.traffic.record('Страница магазина', blocker.take())
+            if self.html_cache:
+                self.html_cache.put(url, html, HtmlCache.STORE, city=self.city_for(url).name)
 
             # Парсим данные
             data = self.parse_store_data(url, html)
@@ -334,81 +576,41 @@ class YandexPyroParser:
 
     def parse_store_data(self, url: str, html: str) -> Dict:
         """Извлечение данных о магазине из HTML"""
-        soup = BeautifulSoup(html, 'html.parser')
+        backend = self.html_backend
+        doc = backend.parse(html)
+
+        # Все селекторы проверяются за один обход документа
+        found = STORE_PLAN.walk(backend, doc)
 
+        city = self.city_for(url)
         data = {
             'Ссылка': url,
-            'Город': 'Ростов-на-Дону',
+            'Город': city.name,
             'Дата сбора': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         }
 
-        # 1. Название магазина
-        title_selectors = [
-            'h1.orgpage-header-view__header',
-            'h1.business-title-view__title',
-            'h1.card-title-view__title',
-            'h1[itemprop="name"]',
-            '.orgpage-header-view__header',
-            '.business-title-view__title',
-            '.card-title-view__title'
-        ]
-
-        for selector in title_selectors:
-            elem = soup.select_one(selector)
-            if elem:
-                text = elem.get_text(strip=True)
+        # 1. Название магазина (первый подходящий селектор по приоритету)
+        for elem in found['title']:
+            if elem is not None:
+                text = backend.text(elem)
                 if text and len(text) > 2:
                     data['Название магазина'] = text
                     break
 
         # 2. Адрес
-        address_selectors = [
-            '[itemprop="address"]',
-            '.business-contacts-view__address',
-            '.card-address-view__address',
-            '.orgpage-address-view__address-text',
-            '.business-address-view__address',
-            'address',
-            '.location__description'
-        ]
-
-        for selector in address_selectors:
-            elem = soup.select_one(selector)
-            if elem:
-                text = elem.get_text(' ', strip=True)
+        for elem in found['address']:
+            if elem is not None:
+                text = backend.text(elem, ' ')
                 if text and len(text) > 5:
                     data['Адрес'] = text
                     break
 
-        # ПРОВЕРКА: Является ли магазин из Ростова-на-Дону
+        # ПРОВЕРКА: Является ли магазин из города задания
         address = data.get('Адрес', '')
         if address:
-            # Приводим адрес к нижнему регистру для проверки
-            address_lower = address.lower()
-
-            # Проверяем наличие упоминаний Ростова-на-Дону
-            rostov_patterns = [
-                'ростов-на-дону',
-                'ростов на дону',
-                'ростов-на-дону,',
-                'г.ростов-на-дону',
-                'г. ростов-на-дону',
-                'г. ростов',
-                'г.ростов',
-                'ростов,'
-            ]
-
-            # Флаг, что магазин из Ростова
-            is_rostov = False
-
-            for pattern in rostov_patterns:
-                if pattern in address_lower:
-                    is_rostov = True
-                    break
-
-            # Если магазин не из Ростова - пропускаем его
-            if not is_rostov:
-                print(f"      🚫 Пропускаем магазин (не из Ростова-на-Дону): {address}")
+            # Если магазин не из этого города - пропускаем его
+            if not city.matches_address(address):
+                print(f"      🚫 Пропускаем магазин (не из города {city.name}): {address}")
                 return None
         else:
             # Если адрес не найден, но нам нужна фильтрация по городу - пропускаем
@@ -419,37 +621,29 @@ class YandexPyroParser:
         phones = []
 
         # Основной поиск по указанному классу
-        phone_elements = soup.find_all(class_='orgpage-phones-view__phone-number')
-        for elem in phone_elements:
-            phone_text = elem.get_text(strip=True)
+        for elem in found['phones']:
+            phone_text = backend.text(elem)
             if phone_text:
                 # Очищаем номер телефона
-                clean_phone = re.sub(r'[^\d\+]', '', phone_text)
+                clean_phone = CLEAN_PHONE_RE.sub('', phone_text)
                 if clean_phone and len(clean_phone) >= 10 and clean_phone not in phones:
                     phones.append(clean_phone)
 
         # Альтернативный поиск, если основной не сработал
         if not phones:
             # Ищем ссылки с tel:
-            for link in soup.find_all('a', href=lambda x: x and x.startswith('tel:')):
-                phone = link['href'].replace('tel:', '').strip()
+            for link in found['tel_links']:
+                phone = backend.attr(link, 'href').replace('tel:', '').strip()
                 if phone:
-                    clean_phone = re.sub(r'[^\d\+]', '', phone)
+                    clean_phone = CLEAN_PHONE_RE.sub('', phone)
                     if clean_phone and clean_phone not in phones:
                         phones.append(clean_phone)
 
             # Ищем в тексте с помощью регулярных выражений
-            text = soup.get_text()
-            phone_patterns = [
-                r'8\s?[\(\-]?\d{3}[\)\-]?\s?\d{3}[\s\-]?\d{2}[\s\-]?\d{2}',
-                r'\+7\s?[\(\-]?\d{3}[\)\-]?\s?\d{3}[\s\-]?\d{2}[\s\-]?\d{2}',
-                r'\(\d{3,4}\)\s?\d{2,3}[\s\-]\d{2}[\s\-]\d{2}'
-            ]
-
-            for pattern in phone_patterns:
-                matches = re.findall(pattern, text)
-                for match in matches:
-                    clean_phone = re.sub(r'[^\d\+]', '', match)
+            text = backend.full_text(doc)
+            for pattern in PHONE_PATTERNS:
+                for match in pattern.findall(text):
+                    clean_phone = CLEAN_PHONE_RE.sub('', match)
                     if clean_phone and len(clean_phone) >= 10 and clean_phone not in phones:
                         phones.append(clean_phone)
 
@@ -460,16 +654,15 @@ class YandexPyroParser:
         site_found = False
 
         # Основной поиск по указанному классу
-        site_elements = soup.find_all(class_='business-urls-view__text')
-        for elem in site_elements:
+        for elem in found['site_texts']:
             # Проверяем, есть ли href у элемента или у родительского <a>
-            if elem.name == 'a' and elem.get('href'):
-                href = elem['href']
+            if backend.tag(elem) == 'a' and backend.attr(elem, 'href'):
+                href = backend.attr(elem, 'href')
             else:
                 # Ищем ссылку внутри элемента
-                link = elem.find('a')
-                if link and link.get('href'):
-                    href = link['href']
+                link = backend.select_one(elem, 'a')
+                if link is not None and backend.attr(link, 'href'):
+                    href = backend.attr(link, 'href')
                 else:
                     continue
 
@@ -482,17 +675,9 @@ class YandexPyroParser:
 
         # Альтернативный поиск сайта
         if not site_found:
-            site_selectors = [
-                '.business-urls-view__link',
-                '.card-website-view__link',
-                '.orgpage-url-view__url',
-                '.website-link'
-            ]
-
-            for selector in site_selectors:
-                elem = soup.select_one(selector)
-                if elem and elem.get('href'):
-                    href = elem['href']
+            for elem in found['site']:
+                if elem is not None and backend.attr(elem, 'href'):
+                    href = backend.attr(elem, 'href')
                     clean_url = self.clean_website_url(href)
                     if clean_url and not self.is_yandex_url(clean_url):
                         data['Сайт'] = clean_url
@@ -511,6 +696,77 @@ class YandexPyroParser:
 
         return data
 
+    def extract_org_id(self, url: str) -> str:
+        """ID организации из ссылки на Яндекс Картах"""
+        return extract_org_id(url)
+
+    def parse_search_item(self, url: str, item: Dict) -> Dict:
+        """Данные магазина из JSON-ответа поиска (те же поля, что и parse_store_data)
+
+        Телефон и сайт заполняются, если ответ содержит ключ phones/urls, даже
+        пустой: пустой список значит, что в карточке их нет. Без ключа поля нет
+        в данных - значение неизвестно.
+
+        Возвращает None, если в ответе не хватает названия или адреса
+        """
+        title = (item.get('title') or '').strip()
+        address = (item.get('fullAddress') or item.get('address') or '').strip()
+        if len(title) <= 2 or len(address) <= 5:
+            return None
+
+        data = {
+            'Ссылка': url,
+            'Город': self.city_for(url).name,
+            'Дата сбора': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'Название магазина': title,
+            'Адрес': address
+        }
+
+        if 'phones' in item:
+            phones = []
+            for phone in item['phones'] or []:
+                number = phone.get('number', '') if isinstance(phone, dict) else str(phone)
+                clean_phone = CLEAN_PHONE_RE.sub('', number)
+                if clean_phone and len(clean_phone) >= 10 and clean_phone not in phones:
+                    phones.append(clean_phone)
+            data['Телефон'] = ', '.join(phones[:3])
+
+        if 'urls' in item:
+            data['Сайт'] = ''
+            for site in item['urls'] or []:
+                href = (site.get('value') or site.get('url', '')) if isinstance(site, dict) else str(site)
+                clean_url = self.clean_website_url(href)
+                if clean_url and not self.is_yandex_url(clean_url):
+                    data['Сайт'] = clean_url
+                    break
+
+        return data
+
+    def split_by_search_api(self, urls: List[str]) -> tuple:
+        """Делим ссылки на готовые данные из ответов поиска и ссылки для загрузки
+
+        Ответ поиска считается готовым, только если он содержит все поля карточки
+        (SEARCH_API_FIELDS), в том числе пустые; иначе открывается страница магазина.
+
+        Возвращает: (results, urls_to_fetch)
+        """
+        results = []
+        urls_to_fetch = []
+
+        for url in urls:
+            item = self.api_items.get(self.extract_org_id(url))
+            data = self.parse_search_item(url, item) if item else None
+
+            if data and not self.city_for(url).matches_address(data['Адрес']):
+                # Магазин не из города задания - страницу открывать не нужно
+                continue
+            if data and all(field in data for field in self.SEARCH_API_FIELDS):
+                results.append(data)
+            else:
+                urls_to_fetch.append(url)
+
+        return results, urls_to_fetch
+
     def is_yandex_url(self, url: str) -> bool:
         """Проверка, является ли URL ссылкой на Яндекс"""
         if not url:
@@ -543,54 +799,27 @@ class YandexPyroParser:
 
     def remove_duplicates(self):
         """Удаление дубликатов"""
-        if not self.results:
-            return
+        self.results = self.unique_results(self.results)
 
+    def unique_results(self, results: List[Dict]) -> List[Dict]:
+        """Магазины без дубликатов (первая запись каждого магазина)"""
         unique_results = []
         seen = set()
 
-        for item in self.results:
-            # Создаем ключ на основе нормализованной ссылки
-            url = item.get('Ссылка', '').lower().strip()
-
-            if url:
-                # Извлекаем уникальный ID из URL
-                # Паттерн для поиска ID: /org/название/ID/
-                match = re.search(r'/(\d+)(?:/|$)', url)
-                if match:
-                    unique_id = match.group(1)
-                    if unique_id not in seen:
-                        seen.add(unique_id)
-                        unique_results.append(item)
-                elif url not in seen:
-                    seen.add(url)
-                    unique_results.append(item)
-            else:
-                # Если нет URL, используем название и адрес
-                name = item.get('Название магазина', '').lower().strip()
-                address = item.get('Адрес', '').lower().strip()
-
-                if name and address:
-                    key = f"{name}|{address}"
-                    if key not in seen:
-                        seen.add(key)
-                        unique_results.append(item)
-                elif name:
-                    if name not in seen:
-                        seen.add(name)
-                        unique_results.append(item)
-                elif address:
-                    if address not in seen:
-                        seen.add(address)
-                        unique_results.append(item)
-                else:
-                    unique_results.append(item)
+        for item in results:
+            # Тот же ключ, что и ID магазина в базе
+            key = dedup_key(item)
+            if not key:
+                unique_results.append(item)
+            elif key not in seen:
+                seen.add(key)
+                unique_results.append(item)
 
-        removed = len(self.results) - len(unique_results)
+        removed = len(results) - len(unique_results)
         if removed > 0:
             print(f"🗑 Удалено дубликатов: {removed}")
 
-        self.results = unique_results
+        return unique_results
 
     def print_statistics(self):
         """Вывод статистики"""
@@ -611,3 +840,16 @@ class YandexPyroParser:
 
         print(f"📞 Магазинов с телефоном: {phones_count}")
         print(f"🌐 Магазинов с сайтом: {sites_count}")
+
+        # Области поиска: повторные попадания - ссылки, уже найденные в других областях
+        summary = area_summary(self.area_stats)
+        if summary:
+            print(f"🗺 Областей: {summary['areas']}, скроллов: {summary['scrolls']} "
+                  f"({summary['seconds']:.1f} сек), попаданий: {summary['hits']}, "
+                  f"повторных: {summary['redundant']}")
+            for area_stat in self.area_stats:
+                print(f"   {area_stat['name']}: скроллов {area_stat['scrolls']}, {area_stat['seconds']:.1f} сек, "
+                      f"ссылок {area_stat['hits']}")
+
+        self.readiness.stats.print_report()
+        self.traffic.print_report(self.resource_policy)
@@ -0,0 +1,151 @@
+import asyncio
+import json
+import time
+from typing import Dict, Optional
+
+from nodriver import cdp
+
+
+class WaitStats:
+    """Статистика ожиданий: сколько ждали и сколько сэкономили относительно фиксированных пауз"""
+
+    def __init__(self):
+        self.stats: Dict[str, Dict] = {}
+
+    def record(self, name: str, elapsed: float, baseline: float, timed_out: bool):
+        """Добавляем одно ожидание"""
+        item = self.stats.setdefault(name, {
+            'count': 0,
+            'elapsed': 0.0,
+            'baseline': 0.0,
+            'timeouts': 0
+        })
+        item['count'] += 1
+        item['elapsed'] += elapsed
+        item['baseline'] += baseline
+        if timed_out:
+            item['timeouts'] += 1
+
+    def print_report(self):
+        """Вывод статистики ожиданий"""
+        if not self.stats:
+            return
+
+        print("⏱ Ожидания загрузки страниц:")
+        total_saved = 0.0
+        for name, item in self.stats.items():
+            saved = item['baseline'] - item['elapsed']
+            total_saved += saved
+            print(f"   {name}: {item['count']} раз, среднее {item['elapsed'] / item['count']:.2f} сек "
+                  f"(было {item['baseline'] / item['count']:.2f} сек), "
+                  f"сэкономлено {saved:.1f} сек, таймаутов {item['timeouts']}")
+        print(f"   Всего сэкономлено: {total_saved:.1f} сек")
+
+
+class NetworkMonitor:
+    """Отслеживание сетевых запросов вкладки через события CDP Network
+
+    Долгоживущие соединения (WebSocket, EventSource) не учитываются, а запрос
+    без ответа дольше max_request_age секунд (long-poll, beacon) считается
+    завершенным - иначе страница никогда не затихала бы и каждое ожидание
+    шло бы до таймаута.
+    """
+
+    IGNORED_TYPES = (cdp.network.ResourceType.WEB_SOCKET, cdp.network.ResourceType.EVENT_SOURCE)
+
+    def __init__(self, tab, max_request_age: float = 3.0):
+        self.tab = tab
+        self.max_request_age = max_request_age
+        # ID запроса -> время начала
+        self.inflight: Dict[str, float] = {}
+        self.last_activity = time.monotonic()
+
+    async def start(self):
+        """Подписываемся на события сети"""
+        self.tab.add_handler(cdp.network.RequestWillBeSent, self._on_request)
+        self.tab.add_handler(cdp.network.LoadingFinished, self._on_done)
+        self.tab.add_handler(cdp.network.LoadingFailed, self._on_done)
+        await self.tab.send(cdp.network.enable())
+
+    def stop(self):
+        """Отписываемся от событий сети"""
+        self.tab.remove_handler(cdp.network.RequestWillBeSent, self._on_request)
+        self.tab.remove_handler(cdp.network.LoadingFinished, self._on_done)
+        self.tab.remove_handler(cdp.network.LoadingFailed, self._on_done)
+
+    def _on_request(self, event: cdp.network.RequestWillBeSent):
+        if event.type_ in self.IGNORED_TYPES:
+            return
+        now = time.monotonic()
+        self.inflight[event.request_id] = now
+        self.last_activity = now
+
+    def _on_done(self, event):
+        if self.inflight.pop(event.request_id, None) is not None:
+            self.last_activity = time.monotonic()
+
+    def idle_for(self) -> float:
+        """Сколько секунд нет активных запросов (0 - если запросы идут)"""
+        now = time.monotonic()
+        stale = [request_id for request_id, started in self.inflight.items()
+                 if now - started > self.max_request_age]
+        for request_id in stale:
+            # Тишина отсчитывается от момента, когда запрос перестал считаться активным
+            started = self.inflight.pop(request_id)
+            self.last_activity = max(self.last_activity, started + self.max_request_age)
+        if self.inflight:
+            return 0.0
+        return now - self.last_activity
+
+
+class PageReadiness:
+    """Ожидание готовности страницы по появлению элементов DOM вместо фиксированных пауз
+
+    Тишину в сети (NetworkMonitor) ждет только ListScroller: для открытия
+    страницы достаточно появления нужных элементов.
+    """
+
+    SNIPPET_SELECTOR = 'li.search-snippet-view'
+    ORG_HEADER_SELECTOR = ', '.join([
+        'h1.orgpage-header-view__header',
+        'h1.business-title-view__title',
+        'h1.card-title-view__title',
+        'h1[itemprop="name"]'
+    ])
+
+    def __init__(self, timeout: float = 15, poll_interval: float = 0.2):
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self.stats = WaitStats()
+
+    async def count(self, tab, selector: str) -> int:
+        """Количество элементов по селектору на странице"""
+        try:
+            value = await tab.evaluate(f"String(document.querySelectorAll({json.dumps(selector)}).length)")
+            return int(value)
+        except (TypeError, ValueError):
+            return 0
+
+    async def wait_for_selector(self, tab, selector: str, name: str, baseline: float,
+                                min_count: int = 1, timeout: Optional[float] = None) -> bool:
+        """Ждем, пока на странице появится min_count элементов по селектору"""
+        timeout = timeout or self.timeout
+        started = time.monotonic()
+        ready = False
+
+        while time.monotonic() - started < timeout:
+            if await self.count(tab, selector) >= min_count:
+                ready = True
+                break
+            await asyncio.sleep(self.poll_interval)
+
+        self.stats.record(name, time.monotonic() - started, baseline, not ready)
+        return ready
+
+    async def wait_for_search_results(self, tab, baseline: float = 4) -> bool:
+        """Ждем отрисовки списка результатов поиска"""
+        return await self.wait_for_selector(tab, self.SNIPPET_SELECTOR, 'Открытие области', baseline)
+
+    async def wait_for_org_card(self, tab, baseline: float = 3.5) -> bool:
+        """Ждем появления заголовка карточки организации"""
+        return await self.wait_for_selector(tab, self.ORG_HEADER_SELECTOR, 'Страница магазина', baseline)
@@ -0,0 +1,157 @@
+from fnmatch import fnmatchcase
+from typing import Dict, List, Optional, Sequence
+
+from nodriver import cdp
+
+__all__ = ['ResourcePolicy', 'ResourceBlocker', 'TrafficStats', 'DEFAULT_POLICY']
+
+# Типы ресурсов CDP (Network.ResourceType), которые не нужны для DOM списка и карточек
+DEFAULT_DENY_TYPES = ("Image", "Media", "Font")
+# Тайлы карты, метрика и реклама (шаблоны CDP: * - любая строка, ? - один символ)
+DEFAULT_DENY_URLS = (
+    "*core-renderer-tiles.maps.yandex.net*",
+    "*mc.yandex.ru*",
+    "*an.yandex.ru*",
+    "*yandex.ru/clck/*",
+    "*ads.adfox.ru*",
+)
+# Ответы поиска читает SearchApiCollector - их не блокируем никогда
+DEFAULT_ALLOW_URLS = (
+    "*/maps/api/search*",
+)
+
+
+class ResourcePolicy:
+    """Какие запросы страницы блокировать
+
+    Запрос блокируется, если его тип в deny_types или адрес подходит под шаблон
+    из deny_urls, и при этом адрес не подходит ни под один шаблон allow_urls.
+    Стили и скрипты по умолчанию не блокируются: без них список результатов не
+    строится и не прокручивается.
+    """
+
+    def __init__(self, deny_types: Sequence[str] = DEFAULT_DENY_TYPES,
+                 deny_urls: Sequence[str] = DEFAULT_DENY_URLS,
+                 allow_urls: Sequence[str] = DEFAULT_ALLOW_URLS):
+        self.deny_types = tuple(cdp.network.ResourceType(name) for name in deny_types)
+        self.deny_urls = tuple(deny_urls)
+        self.allow_urls = tuple(allow_urls)
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'ResourcePolicy':
+        """Политика из раздела block_resources файла настроек (пропущенные списки - по умолчанию)"""
+        return cls(data.get('deny_types', DEFAULT_DENY_TYPES),
+                   data.get('deny_urls', DEFAULT_DENY_URLS),
+                   data.get('allow_urls', DEFAULT_ALLOW_URLS))
+
+    def patterns(self) -> List[cdp.fetch.RequestPattern]:
+        """Шаблоны Fetch.enable: браузер приостанавливает только подходящие запросы,
+        остальные идут в сеть без обращения к парсеру"""
+        stage = cdp.fetch.RequestStage.REQUEST
+        return ([cdp.fetch.RequestPattern(resource_type=resource_type, request_stage=stage)
+                 for resource_type in self.deny_types]
+                + [cdp.fetch.RequestPattern(url_pattern=pattern, request_stage=stage)
+                   for pattern in self.deny_urls])
+
+    def allows(self, url: str) -> bool:
+        """Адрес в списке разрешенных"""
+        return any(fnmatchcase(url, pattern) for pattern in self.allow_urls)
+
+    def __repr__(self):
+        types = ', '.join(resource_type.value for resource_type in self.deny_types)
+        return f"ResourcePolicy(типы: {types or '-'}, шаблонов адресов: {len(self.deny_urls)})"
+
+
+DEFAULT_POLICY = ResourcePolicy()
+
+
+class ResourceBlocker:
+    """Блокировка запросов одной вкладки через CDP Fetch и учет трафика через CDP Network
+
+    Fetch действует на вкладку и после переходов, поэтому блокировщик
+    подключается один раз. Без политики запросы не блокируются, но трафик
+    считается - для сравнения. Счетчики копятся до вызова take().
+    """
+
+    def __init__(self, tab, policy: Optional[ResourcePolicy]):
+        self.tab = tab
+        self.policy = policy
+        self.requests = 0
+        self.bytes = 0
+        self.blocked: Dict[str, int] = {}
+
+    async def start(self):
+        """Подписываемся на события и включаем перехват"""
+        self.tab.add_handler(cdp.fetch.RequestPaused, self._on_paused)
+        self.tab.add_handler(cdp.network.LoadingFinished, self._on_finished)
+        await self.tab.send(cdp.network.enable())
+        if self.policy:
+            await self.tab.send(cdp.fetch.enable(patterns=self.policy.patterns()))
+
+    async def stop(self):
+        """Отключаем перехват (вкладка может остаться в браузере из пула)"""
+        self.tab.remove_handler(cdp.fetch.RequestPaused, self._on_paused)
+        self.tab.remove_handler(cdp.network.LoadingFinished, self._on_finished)
+        if not self.policy:
+            return
+        try:
+            await self.tab.send(cdp.fetch.disable())
+        except Exception as e:
+            print(f"⚠ Предупреждение при отключении блокировки запросов: {e}")
+
+    async def _on_paused(self, event: cdp.fetch.RequestPaused):
+        try:
+            if self.policy.allows(event.request.url):
+                await self.tab.send(cdp.fetch.continue_request(event.request_id))
+                return
+            await self.tab.send(cdp.fetch.fail_request(event.request_id,
+                                                       cdp.network.ErrorReason.BLOCKED_BY_CLIENT))
+            name = event.resource_type.value
+            self.blocked[name] = self.blocked.get(name, 0) + 1
+        except Exception:
+            # Вкладка закрыта или запрос уже отменен страницей
+            pass
+
+    def _on_finished(self, event: cdp.network.LoadingFinished):
+        self.requests += 1
+        self.bytes += int(event.encoded_data_length)
+
+    def take(self) -> Dict:
+        """Трафик с прошлого вызова: загружено запросов и байт, заблокировано по типам"""
+        traffic = {'requests': self.requests, 'bytes': self.bytes, 'blocked': dict(self.blocked)}
+        self.requests = 0
+        self.bytes = 0
+        self.blocked = {}
+        return traffic
+
+
+class TrafficStats:
+    """Трафик по видам страниц: загружено и заблокировано запросов, загружено байт"""
+
+    def __init__(self):
+        self.stats: Dict[str, Dict] = {}
+
+    def record(self, name: str, traffic: Dict):
+        """Добавляем трафик одной страницы"""
+        item = self.stats.setdefault(name, {'pages': 0, 'requests': 0, 'bytes': 0, 'blocked': {}})
+        item['pages'] += 1
+        item['requests'] += traffic['requests']
+        item['bytes'] += traffic['bytes']
+        for resource_type, count in traffic['blocked'].items():
+            item['blocked'][resource_type] = item['blocked'].get(resource_type, 0) + count
+
+    def print_report(self, policy: Optional[ResourcePolicy] = None):
+        """Вывод статистики трафика"""
+        if not self.stats:
+            return
+
+        print(f"📶 Трафик страниц ({policy or 'без блокировки запросов'}):")
+        for name, item in self.stats.items():
+            pages = item['pages']
+            blocked = sum(item['blocked'].values())
+            by_type = ', '.join(f"{resource_type} {count}"
+                                for resource_type, count in sorted(item['blocked'].items(), key=lambda x: -x[1]))
+            print(f"   {name}: {pages} стр., загружено {item['bytes'] / 1024 / 1024:.1f} МБ "
+                  f"({item['bytes'] / pages / 1024:.0f} КБ и {item['requests'] / pages:.0f} запросов на страницу), "
+                  f"заблокировано {blocked} запросов ({blocked / pages:.0f} на страницу)"
+                  + (f": {by_type}" if by_type else ""))
@@ -0,0 +1,185 @@
+import asyncio
+import json
+import time
+from typing import Awaitable, Callable, Dict, Optional
+
+from .readiness import NetworkMonitor, WaitStats
+
+__all__ = ['ListScroller', 'ScrollResult']
+
+
+class ScrollResult:
+    """Итог прокрутки списка одной области"""
+
+    # Причины остановки
+    END_MARKER = "признак конца списка"
+    STALLED = "список перестал расти"
+    LIMIT = "область насыщена"
+    MAX_SCROLLS = "лимит скроллов"
+
+    def __init__(self, scrolls: int, seconds: float, reason: str):
+        self.scrolls = scrolls
+        self.seconds = seconds
+        self.reason = reason
+
+    @property
+    def list_ended(self) -> bool:
+        """Дошли до настоящего конца списка"""
+        return self.reason in (self.END_MARKER, self.STALLED)
+
+    def __repr__(self):
+        return f"ScrollResult({self.scrolls} скроллов, {self.seconds:.1f} сек, {self.reason})"
+
+
+class ListScroller:
+    """Адаптивная прокрутка списка результатов поиска
+
+    Каждый скролл - один вызов скрипта в странице: он прокручивает контейнер
+    списка до конца и возвращает состояние (число карточек, scrollHeight,
+    позицию и признак конца списка). Подгрузка ожидается короткими опросами с
+    растущим интервалом, пока не вырастет список, не изменится высота или не
+    затихнет сеть. Конец списка - маркер в DOM или список, который не растет
+    при прокрутке до самого низа и затихшей сети stall_limit раз подряд.
+    """
+
+    # Контейнеры списка в порядке приоритета
+    CONTAINER_SELECTORS = (
+        '.scroll__container',
+        '.scroll__container_width_narrow',
+        '.search-list-view__list-container',
+        '.sidebar-view__panel',
+        '.scrollable-container',
+    )
+    SNIPPET_SELECTOR = 'li.search-snippet-view'
+    # Блоки, которые Яндекс показывает после последней карточки списка
+    # (учитываются, только когда список прокручен до самого низа)
+    END_MARKER_SELECTORS = (
+        '.add-business-view',
+        '.search-list-view__add-business',
+    )
+
+    # Аргументы: прокручивать ли список, контейнеры, маркеры конца, селектор карточек
+    STATE_JS = """
+        (function() {
+            const scroll = %s;
+            const containers = %s;
+            let container = null;
+            for (const selector of containers) {
+                const element = document.querySelector(selector);
+                if (element && element.scrollHeight > element.clientHeight) {
+                    container = element;
+                    break;
+                }
+            }
+            if (container && scroll) {
+                container.scrollTop = container.scrollHeight;
+            }
+            const endMarker = %s.some(selector => document.querySelector(selector));
+            return JSON.stringify({
+                snippets: document.querySelectorAll(%s).length,
+                height: container ? container.scrollHeight : 0,
+                atBottom: container ? container.scrollTop + container.clientHeight >= container.scrollHeight - 2 : true,
+                endMarker: endMarker
+            });
+        })();
+    """
+
+    def __init__(self, max_scrolls: int = 30, timeout: float = 10, poll_interval: float = 0.1,
+                 max_poll_interval: float = 0.8, backoff: float = 1.6, idle_time: float = 0.5,
+                 stall_limit: int = 2, stats: WaitStats = None):
+        """
+        Args:
+            max_scrolls: Предел скроллов на область
+            timeout: Предел ожидания подгрузки после одного скролла, сек
+            poll_interval: Первый интервал опроса DOM, сек
+            max_poll_interval: Предел интервала опроса, сек
+            backoff: Множитель интервала опроса
+            idle_time: Тишина в сети, после которой подгрузка считается законченной, сек
+            stall_limit: Сколько скроллов подряд без роста списка считать концом
+            stats: Общая статистика ожиданий (PageReadiness.stats)
+        """
+        self.max_scrolls = max_scrolls
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self.max_poll_interval = max_poll_interval
+        self.backoff = backoff
+        self.idle_time = idle_time
+        self.stall_limit = stall_limit
+        self.stats = stats or WaitStats()
+        selectors = (json.dumps(list(self.CONTAINER_SELECTORS)),
+                     json.dumps(list(self.END_MARKER_SELECTORS)),
+                     json.dumps(self.SNIPPET_SELECTOR))
+        self.scroll_script = self.STATE_JS % (('true',) + selectors)
+        self.probe_script = self.STATE_JS % (('false',) + selectors)
+
+    async def state(self, page, scroll: bool = True) -> Dict:
+        """Читаем состояние списка (scroll - сначала прокрутить его до конца)"""
+        script = self.scroll_script if scroll else self.probe_script
+        try:
+            return json.loads(await page.evaluate(script))
+        except Exception as e:
+            print(f"   ⚠ Ошибка скролла: {e}")
+            return {'snippets': 0, 'height': 0, 'atBottom': True, 'endMarker': False}
+
+    async def wait_for_growth(self, page, monitor: NetworkMonitor, before: Dict,
+                              baseline: float = 2.75) -> Dict:
+        """Ждем роста списка после скролла: опросы с растущим интервалом"""
+        started = time.monotonic()
+        interval = self.poll_interval
+        state = before
+
+        while time.monotonic() - started < self.timeout:
+            await asyncio.sleep(interval)
+            state = await self.state(page, scroll=False)
+            if (state['snippets'] > before['snippets'] or state['height'] != before['height']
+                    or (state['endMarker'] and not before['endMarker'])):
+                break
+            # Подгрузка не началась или уже закончилась, а список не вырос
+            if time.monotonic() - started >= self.idle_time and monitor.idle_for() >= self.idle_time:
+                break
+            interval = min(interval * self.backoff, self.max_poll_interval)
+
+        elapsed = time.monotonic() - started
+        self.stats.record('Скролл списка', elapsed, baseline, elapsed >= self.timeout)
+        return state
+
+    async def scroll_area(self, page, collect: Callable[[], Awaitable], count: Callable[[], int],
+                          limit: Optional[int] = None) -> ScrollResult:
+        """Прокручиваем список области до конца
+
+        collect - сбор ссылок после каждой подгрузки, count - сколько ссылок
+        области собрано, limit - после стольких ссылок область насыщена
+        """
+        started = time.monotonic()
+        stalls = 0
+        reason = ScrollResult.MAX_SCROLLS
+        scroll_num = 0
+
+        monitor = NetworkMonitor(page)
+        await monitor.start()
+
+        try:
+            for scroll_num in range(1, self.max_scrolls + 1):
+                before = await self.state(page)
+                after = await self.wait_for_growth(page, monitor, before)
+                await collect()
+                print(f"   📍 Скролл {scroll_num}: карточек {after['snippets']}, ссылок {count()}")
+
+                if after['endMarker'] and after['atBottom']:
+                    reason = ScrollResult.END_MARKER
+                    break
+                if limit and count() >= limit:
+                    reason = ScrollResult.LIMIT
+                    break
+
+                grew = after['snippets'] > before['snippets'] or after['height'] != before['height']
+                stalls = 0 if grew or not after['atBottom'] else stalls + 1
+                if stalls >= self.stall_limit:
+                    reason = ScrollResult.STALLED
+                    break
+        finally:
+            monitor.stop()
+
+        result = ScrollResult(scroll_num, time.monotonic() - started, reason)
+        print(f"   🏁 Скроллинг завершен: {reason}, скроллов {result.scrolls}, {result.seconds:.1f} сек")
+        return result
@@ -0,0 +1,74 @@
+import asyncio
+import base64
+import json
+from typing import Dict, List
+
+from nodriver import cdp
+
+
+class SearchApiCollector:
+    """Перехват JSON-ответов поиска Яндекс Карт через CDP Network
+
+    Пока идет скроллинг списка, страница подгружает результаты XHR-запросами
+    к /maps/api/search. Собираем организации из этих ответов по их ID.
+    """
+
+    URL_MARKERS = ('/maps/api/search',)
+
+    def __init__(self, tab):
+        self.tab = tab
+        self.pending: Dict[str, str] = {}
+        self.tasks: List[asyncio.Task] = []
+        self.items: Dict[str, Dict] = {}
+        self.responses = 0
+
+    async def start(self):
+        """Подписываемся на события сети"""
+        self.tab.add_handler(cdp.network.ResponseReceived, self._on_response)
+        self.tab.add_handler(cdp.network.LoadingFinished, self._on_finished)
+        await self.tab.send(cdp.network.enable())
+
+    async def stop(self):
+        """Отписываемся и дожидаемся чтения уже полученных ответов"""
+        self.tab.remove_handler(cdp.network.ResponseReceived, self._on_response)
+        self.tab.remove_handler(cdp.network.LoadingFinished, self._on_finished)
+        if self.tasks:
+            await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+        self.pending.clear()
+
+    def _on_response(self, event: cdp.network.ResponseReceived):
+        url = event.response.url
+        if any(marker in url for marker in self.URL_MARKERS):
+            self.pending[event.request_id] = url
+
+    def _on_finished(self, event: cdp.network.LoadingFinished):
+        if event.request_id in self.pending:
+            self.pending.pop(event.request_id)
+            self.tasks.append(asyncio.create_task(self._read_body(event.request_id)))
+
+    async def _read_body(self, request_id):
+        """Читаем тело ответа и достаем из него организации"""
+        try:
+            body, is_base64 = await self.tab.send(cdp.network.get_response_body(request_id))
+            if is_base64:
+                body = base64.b64decode(body).decode('utf-8', errors='replace')
+            payload = json.loads(body)
+        except Exception as e:
+            print(f"   ⚠ Не удалось прочитать ответ поиска: {e}")
+            return
+
+        self.responses += 1
+        for item in self.extract_items(payload):
+            org_id = str(item.get('id', ''))
+            if org_id.isdigit():
+                self.items[org_id] = item
+
+    @staticmethod
+    def extract_items(payload) -> List[Dict]:
+        """Список организаций из ответа поиска"""
+        if not isinstance(payload, dict):
+            return []
+        data = payload.get('data', payload)
+        items = data.get('items', []) if isinstance(data, dict) else []
+        return [item for item in items if isinstance(item, dict) and item.get('title')]
@@ -0,0 +1,42 @@
+import asyncio
+from contextlib import asynccontextmanager
+from typing import List
+
+
+class TabPool:
+    """Пул вкладок одного браузера с ограничением параллельности"""
+
+    def __init__(self, browser, size: int = 3):
+        self.browser = browser
+        self.size = max(1, size)
+        self.semaphore = asyncio.Semaphore(self.size)
+        self.free_tabs: List = []
+        self.own_tabs: List = []
+
+    async def open(self):
+        """Открываем вкладки пула (первая - основная вкладка браузера)"""
+        self.free_tabs = [self.browser.main_tab]
+        for _ in range(self.size - 1):
+            tab = await self.browser.get('about:blank', new_tab=True)
+            self.free_tabs.append(tab)
+            self.own_tabs.append(tab)
+
+    async def close(self):
+        """Закрываем дополнительные вкладки"""
+        for tab in self.own_tabs:
+            try:
+                await tab.close()
+            except Exception as e:
+                print(f"⚠ Предупреждение при закрытии вкладки: {e}")
+        self.own_tabs = []
+        self.free_tabs = []
+
+    @asynccontextmanager
+    async def tab(self):
+        """Берем свободную вкладку на время запроса"""
+        async with self.semaphore:
+            tab = self.free_tabs.pop()
+            try:
+                yield tab
+            finally:
+                self.free_tabs.append(tab)
@@ -0,0 +1,152 @@
+import math
+from typing import Dict, List, Optional, Tuple
+
+__all__ = ['ROSTOV_BBOX', 'TilePlanner', 'area_summary']
+
+# Ростов-на-Дону: (запад, юг, восток, север) - окно бывшей области «Весь город»
+ROSTOV_BBOX = (39.384338, 47.073591, 40.056564, 47.391858)
+
+ROSTOV_SEARCH_URL = "https://yandex.ru/maps/39/rostov-na-donu/search/пиротехника/"
+
+# Ширина карты в пикселях при окне браузера 1300 px (без боковой панели):
+# при ней окно sspn=0.672226 соответствует z=11, как в прежних областях
+MAP_WIDTH_PX = 980
+
+# Подписи четвертей при делении области
+QUADRANTS = (('СЗ', -1, 1), ('СВ', 1, 1), ('ЮЗ', -1, -1), ('ЮВ', 1, -1))
+
+
+class TilePlanner:
+    """Адаптивное квадродерево областей поиска
+
+    Поиск начинается с одной области на весь город. Если список результатов
+    области насыщен (упирается в лимит выдачи Яндекса или скроллинг не дошел до
+    конца), область делится на четыре четверти на уровень масштаба ближе.
+    Области с небольшим числом результатов не делятся, плотные районы дробятся
+    ровно настолько, насколько нужно.
+
+    Делящаяся область прокручивается до saturation результатов. С probe ее
+    список прокручивается только до probe результатов: если он не закончился
+    раньше, область сразу делится, а собранное в ней найдется повторно в
+    четвертях. Это меньше повторов в плотных городах, но больше загрузок
+    областей - в небольших городах дороже, поэтому по умолчанию probe выключен.
+    Окна четвертей не пересекаются, но Яндекс показывает в списке и
+    организации рядом с окном карты, поэтому магазин может попасть в несколько
+    соседних областей - повторы отсекаются по ключу магазина
+    (YandexPyroParser.add_store_link).
+
+    Область - обычный словарь с name и url (как в search_areas), плюс
+    координаты, размер, глубина, ссылка поиска и город, по которым строятся ее
+    четверти. Поэтому области можно класть в очередь заданий и журнал
+    контрольных точек, а делить их может любой планировщик с теми же
+    saturation и max_depth.
+    """
+
+    def __init__(self, bbox: Tuple[float, float, float, float] = ROSTOV_BBOX,
+                 search_url: str = ROSTOV_SEARCH_URL, name: str = "Весь город",
+                 saturation: int = 50, max_depth: int = 3, city: str = None, probe: Optional[int] = None):
+        """
+        Args:
+            bbox: Границы города (запад, юг, восток, север)
+            search_url: Ссылка на поиск без параметров карты
+            name: Название корневой области
+            saturation: Результатов в области, начиная с которых она делится
+            max_depth: Максимальная глубина деления (z корня + max_depth)
+            city: Город областей (для фильтра адресов и поля 'Город')
+            probe: Сколько результатов прокручивать в делящейся области, прежде
+                чем считать ее насыщенной (None - до saturation)
+        """
+        self.bbox = bbox
+        self.search_url = search_url
+        self.name = name
+        self.city = city
+        self.saturation = saturation
+        self.max_depth = max_depth
+        self.probe = min(probe, saturation) if probe else saturation
+
+    def root(self) -> List[Dict]:
+        """Начальные области поиска"""
+        west, south, east, north = self.bbox
+        return [self.tile(self.name, (west + east) / 2, (south + north) / 2, east - west, north - south, 0,
+                          self.search_url, self.city)]
+
+    def tile(self, name: str, lon: float, lat: float, span_lon: float, span_lat: float,
+             depth: int, search_url: str, city: str = None) -> Dict:
+        """Область с центром (lon, lat) и размером (span_lon, span_lat)"""
+        area = {
+            "name": name,
+            "url": self.build_url(search_url, lon, lat, span_lon, span_lat),
+            "ll": [round(lon, 6), round(lat, 6)],
+            "spn": [round(span_lon, 6), round(span_lat, 6)],
+            "depth": depth,
+            "search_url": search_url,
+        }
+        if city:
+            area["city"] = city
+        return area
+
+    @classmethod
+    def build_url(cls, search_url: str, lon: float, lat: float, span_lon: float, span_lat: float) -> str:
+        """Ссылка на поиск в окне карты: ll - центр, sspn - размер, z - масштаб"""
+        ll = f"{lon:.6f}%2C{lat:.6f}"
+        return (f"{search_url}?ll={ll}&sll={ll}"
+                f"&sspn={span_lon:.6f}%2C{span_lat:.6f}&z={cls.zoom(span_lon)}")
+
+    @staticmethod
+    def zoom(span_lon: float) -> int:
+        """Уровень масштаба, при котором окно шириной span_lon градусов занимает карту"""
+        return max(1, min(21, round(math.log2(360 * MAP_WIDTH_PX / (256 * span_lon)))))
+
+    def is_saturated(self, hits: int, list_ended: bool = True) -> bool:
+        """Список области насыщен: результатов много или он не закончился"""
+        return hits >= self.saturation or (not list_ended and hits > 0)
+
+    def can_split(self, area: Dict) -> bool:
+        """Область можно делить дальше (у заданных вручную областей нет координат)"""
+        depth = area.get("depth")
+        return depth is not None and depth < self.max_depth
+
+    def scroll_limit(self, area: Dict) -> Optional[int]:
+        """Сколько ссылок собирать в области: делящуюся область прокручиваем
+        до насыщения (или до probe), неделимую - до конца списка"""
+        return self.probe if self.can_split(area) else None
+
+    def split(self, area: Dict, hits: int, list_ended: bool = True) -> List[Dict]:
+        """Четверти области, если ее список насыщен, иначе пустой список"""
+        if not self.can_split(area) or not self.is_saturated(hits, list_ended):
+            return []
+
+        depth = area["depth"]
+        lon, lat = area["ll"]
+        span_lon, span_lat = area["spn"]
+        half_lon, half_lat = span_lon / 2, span_lat / 2
+
+        return [
+            self.tile(f"{area['name']} / {label}",
+                      lon + dx * half_lon / 2, lat + dy * half_lat / 2,
+                      half_lon, half_lat, depth + 1,
+                      area.get("search_url", self.search_url), area.get("city", self.city))
+            for label, dx, dy in QUADRANTS
+        ]
+
+    @staticmethod
+    def contains(area: Dict, lon: float, lat: float) -> bool:
+        """Точка внутри области (граница - полуоткрытый интервал, без двойного счета)"""
+        center_lon, center_lat = area["ll"]
+        span_lon, span_lat = area["spn"]
+        return (center_lon - span_lon / 2 <= lon < center_lon + span_lon / 2
+                and center_lat - span_lat / 2 <= lat < center_lat + span_lat / 2)
+
+
+def area_summary(stats: List[Dict]) -> Optional[Dict[str, int]]:
+    """Сводка по пройденным областям: области, скроллы, время скроллинга,
+    попадания, повторные попадания"""
+    if not stats:
+        return None
+    return {
+        "areas": len(stats),
+        "scrolls": sum(s["scrolls"] for s in stats),
+        "seconds": sum(s.get("seconds", 0) for s in stats),
+        "hits": sum(s["hits"] for s in stats),
+        "redundant": sum(s["hits"] - s["new"] for s in stats),
+    }
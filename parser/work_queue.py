@@ -0,0 +1,191 @@
+import json
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+
+class WorkQueue:
+    """Очередь заданий для воркеров на SQLite
+
+    Задания двух видов: 'area' (область поиска) и 'store' (страница магазина),
+    плюс сразу выполненные 'fresh' - свежие магазины, чьи страницы не открываются.
+    Ключ задания уникален, поэтому одна и та же ссылка попадает в очередь один раз.
+    Файл очереди должен лежать на локальном диске: журнал WAL SQLite не работает
+    на сетевых файловых системах, поэтому воркеры - процессы одной машины.
+    """
+
+    AREA = 'area'
+    STORE = 'store'
+    FRESH = 'fresh'
+
+    def __init__(self, path: str = "data/queue.sqlite", stale_timeout: float = 600):
+        self.path = path
+        self.stale_timeout = stale_timeout
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                kind TEXT NOT NULL,
+                key TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                worker TEXT,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                result TEXT,
+                updated_at REAL NOT NULL,
+                UNIQUE (kind, key)
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (kind, status)")
+
+    def close(self):
+        """Закрываем соединение"""
+        self.conn.close()
+
+    @contextmanager
+    def _transaction(self):
+        """Транзакция с блокировкой на запись"""
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+
+    def clear(self):
+        """Удаляем все задания"""
+        self.conn.execute("DELETE FROM jobs")
+
+    def add_jobs(self, kind: str, items: List[Dict], key_field: str = 'url') -> int:
+        """Добавляем задания, уже известные ключи пропускаются
+
+        Возвращает количество добавленных заданий
+        """
+        now = time.time()
+        rows = [(kind, item[key_field], json.dumps(item, ensure_ascii=False), now) for item in items]
+        with self._transaction():
+            before = self.conn.total_changes
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO jobs (kind, key, payload, updated_at) VALUES (?, ?, ?, ?)",
+                rows
+            )
+            return self.conn.total_changes - before
+
+    def add_results(self, kind: str, results: List[Dict], key_field: str = 'Ссылка') -> int:
+        """Добавляем сразу выполненные задания с готовым результатом"""
+        now = time.time()
+        rows = [
+            (kind, data[key_field], json.dumps({'url': data[key_field]}, ensure_ascii=False),
+             json.dumps(data, ensure_ascii=False), now)
+            for data in results
+        ]
+        with self._transaction():
+            before = self.conn.total_changes
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO jobs (kind, key, payload, status, result, updated_at) "
+                "VALUES (?, ?, ?, 'done', ?, ?)",
+                rows
+            )
+            return self.conn.total_changes - before
+
+    def claim(self, kind: str, worker: str, limit: int = 1) -> List[Dict]:
+        """Атомарно забираем до limit заданий в работу
+
+        Задания зависших воркеров (дольше stale_timeout) возвращаются в очередь.
+        """
+        now = time.time()
+        with self._transaction():
+            self._requeue_stale(kind, now)
+            rows = self.conn.execute(
+                "SELECT id, payload FROM jobs WHERE kind = ? AND status = 'pending' ORDER BY id LIMIT ?",
+                (kind, limit)
+            ).fetchall()
+            self.conn.executemany(
+                "UPDATE jobs SET status = 'running', worker = ?, attempts = attempts + 1, updated_at = ? "
+                "WHERE id = ?",
+                [(worker, now, job_id) for job_id, _ in rows]
+            )
+
+        return [{'id': job_id, **json.loads(payload)} for job_id, payload in rows]
+
+    def _requeue_stale(self, kind: Optional[str], now: float) -> int:
+        query = "UPDATE jobs SET status = 'pending', worker = NULL WHERE status = 'running' AND updated_at < ?"
+        params = [now - self.stale_timeout]
+        if kind:
+            query += " AND kind = ?"
+            params.append(kind)
+        return self.conn.execute(query, params).rowcount
+
+    def requeue_stale(self, kind: Optional[str] = None) -> int:
+        """Возвращаем в очередь задания зависших воркеров (дольше stale_timeout)"""
+        with self._transaction():
+            return self._requeue_stale(kind, time.time())
+
+    def release(self, workers: List[str]) -> int:
+        """Возвращаем в очередь задания завершившихся воркеров, не дожидаясь stale_timeout"""
+        if not workers:
+            return 0
+        placeholders = ', '.join('?' * len(workers))
+        with self._transaction():
+            return self.conn.execute(
+                f"UPDATE jobs SET status = 'pending', worker = NULL "
+                f"WHERE status = 'running' AND worker IN ({placeholders})",
+                list(workers)
+            ).rowcount
+
+    def complete(self, job_id: int, result: Any = None):
+        """Отмечаем задание выполненным и сохраняем результат"""
+        self.conn.execute(
+            "UPDATE jobs SET status = 'done', result = ?, updated_at = ? WHERE id = ?",
+            (json.dumps(result, ensure_ascii=False), time.time(), job_id)
+        )
+
+    def fail(self, job_id: int, error: str, max_attempts: int = 3):
+        """Возвращаем задание в очередь или отмечаем как проваленное"""
+        self.conn.execute(
+            "UPDATE jobs SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+            "worker = NULL, result = ?, updated_at = ? WHERE id = ?",
+            (max_attempts, json.dumps({'error': error}, ensure_ascii=False), time.time(), job_id)
+        )
+
+    def counts(self, kind: Optional[str] = None) -> Dict[str, int]:
+        """Количество заданий по статусам"""
+        query = "SELECT status, COUNT(*) FROM jobs"
+        params = ()
+        if kind:
+            query += " WHERE kind = ?"
+            params = (kind,)
+        query += " GROUP BY status"
+        return dict(self.conn.execute(query, params).fetchall())
+
+    def is_drained(self) -> bool:
+        """Все задания выполнены (или провалены)"""
+        counts = self.counts()
+        return not counts.get('pending') and not counts.get('running')
+
+    def failures(self, kind: Optional[str] = None) -> List[Dict]:
+        """Проваленные задания: id, вид, ключ и последняя ошибка"""
+        query = "SELECT id, kind, key, result FROM jobs WHERE status = 'failed'"
+        params = ()
+        if kind:
+            query += " AND kind = ?"
+            params = (kind,)
+        return [{'id': job_id, 'kind': job_kind, 'key': key, 'error': (json.loads(result or 'null') or {}).get('error', '')}
+                for job_id, job_kind, key, result in self.conn.execute(query + " ORDER BY id", params)]
+
+    def results(self, kind: str) -> List[Any]:
+        """Результаты выполненных заданий"""
+        rows = self.conn.execute(
+            "SELECT result FROM jobs WHERE kind = ? AND status = 'done' ORDER BY id",
+            (kind,)
+        ).fetchall()
+        results = (json.loads(result) for (result,) in rows if result)
+        return [result for result in results if result]
@@ -0,0 +1,243 @@
+import asyncio
+import multiprocessing
+import os
+import socket
+import time
+from typing import Dict, List, Tuple
+
+from core.database import SqlitePyroDatabase, open_database
+
+from .freshness import FreshnessPolicy
+from .html_cache import HtmlCache
+from .jobs import CrawlConfig
+from .pyro_parser import YandexPyroParser
+from .tab_pool import TabPool
+from .work_queue import WorkQueue
+
+
+def worker_parser_options(config: CrawlConfig, workers: int = 1) -> Dict:
+    """Настройки парсера воркера: лимит запросов из настроек делится между воркерами,
+    чтобы вместе они не превышали общий бюджет"""
+    options = config.parser_options()
+    del options['max_tabs']
+    workers = max(1, workers)
+    options['requests_per_second'] = config.requests_per_second / workers
+    options['burst'] = max(1, config.burst // workers)
+    return options
+
+
+async def run_worker(queue_path: str, worker_id: str, headless: bool = True,
+                     max_tabs: int = 3, poll_interval: float = 5, html_cache_dir: str = None,
+                     config_path: str = None, workers: int = 1, db_path: str = None,
+                     max_age: float = 0):
+    """Воркер: берет задания из очереди и выполняет их в своем браузере
+
+    Сначала обрабатываются области поиска (найденные ссылки добавляются в очередь
+    как задания 'store'), затем страницы магазинов. Воркер завершается, когда
+    в очереди не остается ни ожидающих, ни выполняемых заданий.
+    Города областей и магазинов, лимит запросов и блокировка ресурсов берутся
+    из того же файла настроек, что и у координатора (config_path); лимит
+    запросов делится на workers воркеров. С max_age свежие магазины базы
+    db_path не открываются, а попадают в очередь как выполненные 'fresh'.
+    """
+    queue = WorkQueue(queue_path)
+    html_cache = HtmlCache(html_cache_dir) if html_cache_dir else None
+    config = CrawlConfig.load(config_path)
+    db = open_database(db_path) if db_path and max_age else None
+    freshness = FreshnessPolicy(db, max_age) if db else None
+    parser = YandexPyroParser(headless=headless, max_tabs=max_tabs, html_cache=html_cache, jobs=config.jobs(),
+                              freshness=freshness, **worker_parser_options(config, workers))
+
+    if not await parser.init_browser():
+        queue.close()
+        return
+
+    pool = TabPool(parser.browser, parser.max_tabs)
+    await pool.open()
+
+    try:
+        while True:
+            # 1. Области поиска
+            areas = queue.claim(WorkQueue.AREA, worker_id)
+            if areas:
+                job = areas[0]
+                print(f"[{worker_id}] Область: {job['name']}")
+                try:
+                    parser.all_urls.clear()
+                    parser.api_items.clear()
+                    parser.city = parser.cities.get(job.get('city'), parser.city)
+                    await parser.crawl_area(job)
+
+                    # Насыщенная область делится на четверти - новые задания для всех воркеров
+                    area_stat = parser.area_stats[-1]
+                    children = parser.tiling.split(
+                        {key: value for key, value in job.items() if key != 'id'},
+                        area_stat['hits'], area_stat['list_ended']
+                    )
+                    if children:
+                        queue.add_jobs(WorkQueue.AREA, children)
+
+                    # Свежие магазины только отмечаются найденными, страницы не открываются
+                    urls = list(parser.all_urls)
+                    if freshness:
+                        new_urls, stale_urls, fresh_urls = freshness.split(urls)
+                        urls = new_urls + stale_urls
+                        queue.add_results(WorkQueue.FRESH, [{'Ссылка': url} for url in fresh_urls])
+
+                    # Магазины с данными из ответов поиска сразу попадают в результаты
+                    api_results, urls_to_fetch = parser.split_by_search_api(urls)
+                    queue.add_results(WorkQueue.STORE, api_results)
+                    added = queue.add_jobs(WorkQueue.STORE, [{'url': url, 'city': parser.url_cities.get(url)}
+                                                             for url in urls_to_fetch])
+                    queue.complete(job['id'], {'urls': len(parser.all_urls), 'added': added,
+                                               'subareas': len(children)})
+                    print(f"[{worker_id}] ✅ Ссылок: {len(parser.all_urls)}, новых в очереди: {added}, "
+                          f"подобластей: {len(children)}")
+                except Exception as e:
+                    print(f"[{worker_id}] ❌ Ошибка области: {e}")
+                    queue.fail(job['id'], str(e))
+                continue
+
+            # 2. Страницы магазинов
+            stores = queue.claim(WorkQueue.STORE, worker_id, limit=parser.max_tabs)
+            if stores:
+                for job in stores:
+                    if job.get('city'):
+                        parser.url_cities[job['url']] = job['city']
+                try:
+                    results = await parser.parse_store_pages([job['url'] for job in stores], pool)
+                    by_url = {data.get('Ссылка'): data for data in results}
+                    for job in stores:
+                        queue.complete(job['id'], by_url.get(job['url']))
+                except Exception as e:
+                    print(f"[{worker_id}] ❌ Ошибка парсинга магазинов: {e}")
+                    for job in stores:
+                        queue.fail(job['id'], str(e))
+                continue
+
+            if queue.is_drained():
+                break
+
+            # Другие воркеры еще обрабатывают области - ждем новых ссылок
+            await asyncio.sleep(poll_interval)
+
+    finally:
+        await pool.close()
+        await parser.close()
+        queue.close()
+        if html_cache:
+            html_cache.close()
+        if isinstance(db, SqlitePyroDatabase):
+            db.close()
+
+    print(f"[{worker_id}] 🏁 Очередь пуста, воркер завершен")
+
+
+def worker_process(queue_path: str, worker_id: str, headless: bool = True, max_tabs: int = 3,
+                   html_cache_dir: str = None, config_path: str = None, workers: int = 1,
+                   db_path: str = None, max_age: float = 0):
+    """Точка входа процесса воркера"""
+    asyncio.run(run_worker(queue_path, worker_id, headless, max_tabs, html_cache_dir=html_cache_dir,
+                           config_path=config_path, workers=workers, db_path=db_path, max_age=max_age))
+
+
+async def run_coordinator(search_areas: List[Dict], queue_path: str = "data/queue.sqlite",
+                          workers: int = 2, headless: bool = True, max_tabs: int = 3,
+                          poll_interval: float = 5, html_cache_dir: str = None,
+                          config_path: str = None, max_restarts: int = 2,
+                          idle_timeout: float = 1800, db_path: str = None,
+                          max_age: float = 0) -> Tuple[List[Dict], List[str], bool]:
+    """Координатор: раскладывает области по очереди, запускает локальных воркеров
+    и собирает результаты всех воркеров (в том числе запущенных отдельно через
+    worker.py с той же очередью)
+
+    Лимит запросов из настроек делится между локальными воркерами, свежесть
+    магазинов (max_age) проверяется воркерами по базе db_path.
+
+    Задания завершившихся воркеров сразу возвращаются в очередь, а если
+    завершились все локальные воркеры, они перезапускаются (не больше
+    max_restarts раз). Если очередь не продвигается idle_timeout секунд,
+    координатор останавливается с частичными результатами.
+
+    Возвращает результаты, ссылки свежих магазинов и признак того, что очередь
+    обработана полностью: все задания выполнены и ни одно не провалено после
+    всех попыток
+    """
+    print(f"🗂 Очередь заданий: {queue_path}")
+    queue = WorkQueue(queue_path)
+    queue.clear()
+    queue.add_jobs(WorkQueue.AREA, search_areas)
+
+    host = socket.gethostname()
+    worker_ids = [f"{host}-{os.getpid()}-{i + 1}" for i in range(workers)]
+
+    def start_worker(worker_id: str) -> multiprocessing.Process:
+        process = multiprocessing.Process(
+            target=worker_process,
+            args=(queue_path, worker_id, headless, max_tabs, html_cache_dir, config_path,
+                  max(1, workers), db_path, max_age)
+        )
+        process.start()
+        return process
+
+    processes = {worker_id: start_worker(worker_id) for worker_id in worker_ids}
+    print(f"👷 Запущено локальных воркеров: {len(processes)}")
+
+    restarts = 0
+    progress = None
+    last_progress = time.monotonic()
+    try:
+        while not queue.is_drained():
+            await asyncio.sleep(poll_interval)
+            counts = (queue.counts(WorkQueue.AREA), queue.counts(WorkQueue.STORE))
+            print(f"   📊 Области: {counts[0]}, магазины: {counts[1]}")
+
+            if counts != progress:
+                progress = counts
+                last_progress = time.monotonic()
+
+            # Задания упавших воркеров не ждут stale_timeout, зависшие - возвращаются по таймауту
+            dead = [worker_id for worker_id, process in processes.items() if not process.is_alive()]
+            queue.release(dead)
+            queue.requeue_stale()
+
+            if processes and len(dead) == len(processes) and not queue.is_drained():
+                if restarts < max_restarts:
+                    restarts += 1
+                    print(f"♻ Локальные воркеры завершились, перезапускаем ({restarts}/{max_restarts})...")
+                    for process in processes.values():
+                        process.join()
+                    processes = {worker_id: start_worker(worker_id) for worker_id in worker_ids}
+                    last_progress = time.monotonic()
+                else:
+                    print("⚠ Локальные воркеры завершились, ожидаем внешних воркеров...")
+                    processes = {}
+
+            if time.monotonic() - last_progress > idle_timeout:
+                print(f"❌ Очередь не продвигается {idle_timeout / 60:.0f} мин - "
+                      f"останавливаемся с частичными результатами")
+                break
+    finally:
+        drained = queue.is_drained()
+        for process in processes.values():
+            if not drained:
+                process.terminate()
+            await asyncio.to_thread(process.join)
+
+    # Проваленная область или страница - магазины из нее не найдены, но не пропали
+    failures = queue.failures()
+    if failures:
+        print(f"❌ Проваленных заданий: {len(failures)}")
+        for failure in failures[:10]:
+            print(f"   {failure['kind']} #{failure['id']}: {failure['key']} - {failure['error']}")
+    complete = drained and not failures
+
+    results = queue.results(WorkQueue.STORE)
+    fresh_urls = [data['Ссылка'] for data in queue.results(WorkQueue.FRESH)]
+    queue.close()
+
+    # Объединяем результаты и убираем дубликаты одним шагом
+    merger = YandexPyroParser()
+    merger.results = results
+    merger.remove_duplicates()
+    return merger.results, fresh_urls, complete
@@ -0,0 +1,100 @@
+# reextract.py
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Dict, List
+
+from core.database import open_database
+from parser import YandexPyroParser
+from parser.html_cache import HtmlCache
+from parser.jobs import CrawlConfig
+
+# Парсер и кэш создаются один раз в каждом процессе пула
+_parser = None
+_cache = None
+
+
+def _init_process(cache_dir: str, html_backend: str, config_path: str = None):
+    global _parser, _cache
+    # Города из тех же настроек, что и у парсинга: по ним фильтруются адреса
+    _parser = YandexPyroParser(html_backend=html_backend, jobs=CrawlConfig.load(config_path).jobs())
+    _cache = HtmlCache(cache_dir)
+
+
+def _extract(page: Dict) -> Dict:
+    """Повторное извлечение данных из сохраненной страницы"""
+    html = _cache.load(page['digest'])
+    if not html:
+        return None
+
+    # Страницы старого кэша сохранены без города - пробуем все города настроек
+    data = None
+    for city in [page['city']] if page.get('city') else list(_parser.cities):
+        _parser.url_cities[page['url']] = city
+        data = _parser.parse_store_data(page['url'], html)
+        if data:
+            break
+    if data:
+        # Дата сбора - время загрузки страницы, а не время повторного извлечения
+        data['Дата сбора'] = datetime.fromtimestamp(page['fetched_at']).strftime('%Y-%m-%d %H:%M:%S')
+    return data
+
+
+def reextract(cache_dir: str, workers: int = None, html_backend: str = None,
+              config_path: str = None) -> List[Dict]:
+    """Прогоняем parse_store_data по всем страницам магазинов из кэша параллельно"""
+    cache = HtmlCache(cache_dir)
+    pages = list(cache.iter_latest(HtmlCache.STORE))
+    cache.close()
+
+    print(f"📦 Страниц магазинов в кэше: {len(pages)}")
+    if not pages:
+        return []
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_process,
+                             initargs=(cache_dir, html_backend, config_path)) as executor:
+        results = [data for data in executor.map(_extract, pages, chunksize=32) if data]
+
+    # Удаляем дубликаты так же, как после живого парсинга
+    merger = YandexPyroParser(html_backend=html_backend)
+    merger.results = results
+    merger.remove_duplicates()
+    return merger.results
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(
+        description="Повторное извлечение данных магазинов из кэша HTML без обращения к сети"
+    )
+    arg_parser.add_argument("--cache", default="data/html_cache", help="Папка кэша HTML")
+    arg_parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Количество процессов")
+    arg_parser.add_argument("--backend", default=None, help="HTML-парсер: selectolax, lxml или bs4")
+    arg_parser.add_argument("--db", default="data/database.json", help="Файл базы магазинов: .json или .sqlite")
+    arg_parser.add_argument("--config", default="crawl.json",
+                            help="Настройки городов (тот же файл, что у парсинга)")
+    arg_parser.add_argument("--dry-run", action="store_true", help="Не сохранять результат в базу")
+    args = arg_parser.parse_args()
+
+    started = time.time()
+    results = reextract(args.cache, args.workers, args.backend, args.config)
+    print(f"✅ Извлечено магазинов: {len(results)} за {time.time() - started:.1f} сек")
+
+    if args.dry_run or not results:
+        return
+
+    db = open_database(args.db)
+    new_count = 0
+    for shop_data in results:
+        _, is_new = db.add_or_update_shop(shop_data, seen_at=shop_data.get('Дата сбора'))
+        if is_new:
+            new_count += 1
+
+    db.set_last_update()
+    db.save_db()
+    print(f"💾 База обновлена: новых {new_count}, обновленных {len(results) - new_count}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+import pytest
+
+import daemon
+from parser.rate_limiter import HostRateLimiter
+
+
+class FakePool:
+    size = 2
+    busy = 0
+
+    def __init__(self):
+        self.browsers = ["browser-1", "browser-2"]
+
+    @asynccontextmanager
+    async def acquire(self):
+        browser = self.browsers.pop()
+        try:
+            yield browser
+        finally:
+            self.browsers.append(browser)
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    calls = []
+
+    async def fake_crawl(args, browser=None, rate_limiter=None, report_stage=None):
+        calls.append((args, browser, rate_limiter))
+        report_stage.submit("Ростов-на-Дону", iter(()), iter(()), iter(()), "report", "Ростов-на-Дону")
+        await asyncio.sleep(0)
+        return args.db != "fail"
+
+    monkeypatch.setattr(daemon, "run_crawl", fake_crawl)
+    return calls
+
+
+def run_jobs(crawl_daemon, *argvs):
+    async def run():
+        jobs = [crawl_daemon.submit(list(argv)) for argv in argvs]
+        await asyncio.gather(*crawl_daemon.tasks.values())
+        return jobs
+    return asyncio.run(run())
+
+
+def test_jobs_share_one_rate_limiter(tmp_path, calls):
+    limiter = HostRateLimiter(rate=0.5, burst=2)
+    crawl_daemon = daemon.CrawlDaemon(FakePool(), str(tmp_path), rate_limiter=limiter)
+    jobs = run_jobs(crawl_daemon, ["--db", "a.json"], ["--db", "b.json"])
+
+    assert [job["state"] for job in jobs] == ["done", "done"]
+    assert [rate_limiter for _, _, rate_limiter in calls] == [limiter, limiter]
+    assert {browser for _, browser, _ in calls} == {"browser-1", "browser-2"}
+
+
+def test_job_waits_for_its_reports(tmp_path, calls):
+    job, = run_jobs(daemon.CrawlDaemon(FakePool(), str(tmp_path)), ["--db", "a.json", "--report-format", "csv"])
+    # Без спарсенных магазинов отчет не строится, но ошибка видна в задании
+    report, = job["reports"]
+    assert (report["key"], report["format"], report["path"]) == ("Ростов-на-Дону", "csv", "")
+
+
+def test_failed_crawl_marks_job_failed(tmp_path, calls):
+    job, = run_jobs(daemon.CrawlDaemon(FakePool(), str(tmp_path)), ["--db", "fail"])
+    assert job["state"] == "failed"
+    assert job["error"]
+
+
+def test_checkpoint_depends_on_args_without_resume(tmp_path, calls):
+    crawl_daemon = daemon.CrawlDaemon(FakePool(), str(tmp_path))
+    path = crawl_daemon.checkpoint_path(["--config", "a.json"])
+    assert crawl_daemon.checkpoint_path(["--config", "a.json", "--resume"]) == path
+    assert crawl_daemon.checkpoint_path(["--config", "b.json"]) != path
+
+    first, second = run_jobs(crawl_daemon, ["--config", "a.json"], ["--config", "b.json"])
+    assert first["checkpoint"] == path
+    assert calls[0][0].checkpoint == path
+
+
+def test_same_checkpoint_is_rejected_while_running(tmp_path, calls):
+    crawl_daemon = daemon.CrawlDaemon(FakePool(), str(tmp_path))
+
+    async def run():
+        crawl_daemon.submit(["--config", "a.json"])
+        with pytest.raises(ValueError):
+            crawl_daemon.submit(["--config", "a.json", "--resume"])
+        await asyncio.gather(*crawl_daemon.tasks.values())
+        # Задание завершено - тот же журнал снова можно продолжить
+        crawl_daemon.submit(["--config", "a.json", "--resume"])
+        await asyncio.gather(*crawl_daemon.tasks.values())
+
+    asyncio.run(run())
+    assert len(calls) == 2
@@ -0,0 +1,334 @@
+import csv
+import json
+import os
+import pickle
+
+import pytest
+
+from core.database import DEFAULT_CITY, PyroDatabase, SqlitePyroDatabase, SqliteShopsReader, open_database
+from core.report_writers import CsvReportWriter
+from main import shops_in_city
+
+CITIES = ("Ростов-на-Дону", "Таганрог")
+
+
+def make_shop(n: int, city: str = "Ростов-на-Дону", **fields):
+    shop = {
+        "Ссылка": f"https://yandex.ru/maps/org/shop/{1000 + n}/",
+        "Название магазина": f"Магазин {n}",
+        "Адрес": f"{city}, улица {n}",
+        "Телефон": f"+7863000{n:04d}",
+        "Сайт": "",
+        "Город": city,
+    }
+    shop.update(fields)
+    return shop
+
+
+@pytest.fixture(params=["json", "sqlite"])
+def db(request, tmp_path):
+    db = open_database(str(tmp_path / f"database.{request.param}"))
+    yield db
+    if isinstance(db, SqlitePyroDatabase):
+        db.close()
+
+
+def read_csv(path):
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        return list(csv.DictReader(f))
+
+
+def test_two_city_report(db, tmp_path):
+    records = [make_shop(n, CITIES[n % 2]) for n in range(6)]
+    diff = db.merge_run(records)
+    db.save_db()
+
+    all_shops = db.get_all_shops_for_excel()
+    assert {shop["Город"] for shop in all_shops} == set(CITIES)
+
+    writer = CsvReportWriter(str(tmp_path / "results"))
+    for i, city in enumerate(CITIES):
+        report_dir = writer.write(shops_in_city(diff.new, city),
+                                  shops_in_city(diff.parsed, city),
+                                  db.get_city_shops_for_excel(city),
+                                  f"report_{i}", city)
+        rows = read_csv(os.path.join(report_dir, "all.csv"))
+        assert sorted(row["Название магазина"] for row in rows) == [
+            f"Магазин {n}" for n in range(6) if CITIES[n % 2] == city]
+        assert {row["Статус"] for row in rows} == {"Новый"}
+        stats = dict((row["Показатель"], row["Значение"]) for row in read_csv(os.path.join(report_dir, "stats.csv")))
+        assert stats["Город"] == city
+
+
+def test_shops_without_city_go_to_default_city():
+    shops = [{"Название магазина": "старый"}, {"Название магазина": "пустой", "Город": ""},
+             {"Название магазина": "Таганрог", "Город": "Таганрог"}]
+    assert [shop["Название магазина"] for shop in shops_in_city(shops, CITIES[0])] == ["старый", "пустой"]
+
+
+def test_city_shops_reader_streams_from_file(tmp_path):
+    db = open_database(str(tmp_path / "database.sqlite"))
+    db.merge_run([make_shop(n, CITIES[n % 2]) for n in range(4)])
+    db.save_db()
+
+    # В процесс пула уходит только путь к базе и город
+    reader = pickle.loads(pickle.dumps(db.get_city_shops_for_excel(CITIES[1])))
+    assert isinstance(reader, SqliteShopsReader) and reader.conn is None
+    assert sorted(shop["Название магазина"] for shop in reader) == ["Магазин 1", "Магазин 3"]
+    # Каждый проход читает базу заново
+    assert len(list(reader)) == 2
+    assert [shop["Ссылка"] for shop in db.get_all_shops_for_excel()] == \
+        [shop["Ссылка"] for shop in SqliteShopsReader(db.db_file)]
+    db.close()
+
+
+def test_merge_run_limits_missing_to_its_cities(db):
+    db.merge_run([make_shop(n, CITIES[n % 2]) for n in range(4)])
+    db.save_db()
+
+    # Запуск по одному городу не трогает флаги магазинов другого города
+    diff = db.merge_run([make_shop(0, CITIES[0])], cities=[CITIES[0]])
+    db.save_db()
+    assert [shop["Название магазина"] for shop in diff.missing] == ["Магазин 2"]
+
+    found = {shop["Название магазина"]: shop["Обнаружен_в_последнем_парсинге"]
+             for shop in db.get_all_shops_for_excel()}
+    assert found == {"Магазин 0": True, "Магазин 1": True, "Магазин 2": False, "Магазин 3": True}
+
+    db.mark_all_unfound([CITIES[1]])
+    found = {shop["Название магазина"]: shop["Обнаружен_в_последнем_парсинге"]
+             for shop in db.get_all_shops_for_excel()}
+    assert found == {"Магазин 0": True, "Магазин 1": False, "Магазин 2": False, "Магазин 3": False}
+
+
+def test_shops_without_city_belong_to_default_city(tmp_path):
+    db = PyroDatabase(str(tmp_path / "database.json"))
+    db.merge_run([make_shop(1)])
+    del db.db["shops"][0]["Город"]
+    diff = db.merge_run([], cities=[DEFAULT_CITY])
+    assert len(diff.missing) == 1
+
+
+def test_scoped_unfound_survives_journal_replay(tmp_path):
+    db = PyroDatabase(str(tmp_path / "database.json"))
+    db.merge_run([make_shop(n, CITIES[n % 2]) for n in range(4)])
+    db.save_db()
+    db.merge_run([], cities=[CITIES[1]])
+    db.save_db()
+
+    replayed = PyroDatabase(db.db_file)
+    assert {shop["id"]: shop["Обнаружен_в_последнем_парсинге"] for shop in replayed.db["shops"]} == \
+        {shop["id"]: shop["Обнаружен_в_последнем_парсинге"] for shop in db.db["shops"]}
+    assert replayed.get_stats()["found_in_last_parse"] == 2
+
+
+def test_sqlite_import_and_export_match_json(tmp_path):
+    json_db = PyroDatabase(str(tmp_path / "database.json"))
+    json_db.merge_run([make_shop(n, CITIES[n % 2]) for n in range(4)], seen_at="2026-01-01 10:00:00")
+    json_db.set_last_update("2026-01-01 10:00:00")
+    json_db.save_db()
+    # Маленькая база еще не свернута в снимок: все изменения только в журнале
+    assert not os.path.exists(json_db.db_file) and os.path.exists(json_db.journal_file)
+
+    # Новая SQLite база рядом с JSON заполняется из нее при открытии
+    sqlite_db = open_database(str(tmp_path / "database.sqlite"))
+    try:
+        assert sqlite_db.get_stats() == json_db.get_stats()
+        assert sorted(sqlite_db._select(), key=lambda shop: shop["id"]) == \
+            sorted(json_db.db["shops"], key=lambda shop: shop["id"])
+
+        sqlite_db.export_json(str(tmp_path / "export.json"))
+        exported = PyroDatabase(str(tmp_path / "export.json"))
+        assert exported.get_stats() == json_db.get_stats()
+        assert exported.index == json_db.index
+    finally:
+        sqlite_db.close()
+
+    # Существующая SQLite база повторно не импортируется
+    json_db.merge_run([make_shop(9)])
+    json_db.save_db()
+    sqlite_db = open_database(str(tmp_path / "database.sqlite"))
+    assert sqlite_db.get_stats()["total_shops"] == 4
+    sqlite_db.close()
+
+
+def test_sqlite_imports_old_lowercase_flag(tmp_path):
+    shop = make_shop(1)
+    shop["обнаружен_в_последнем_парсинге"] = True
+    with open(tmp_path / "database.json", "w", encoding="utf-8") as f:
+        json.dump({"last_update": None, "total_shops": 1, "shops": [shop]}, f, ensure_ascii=False)
+
+    db = open_database(str(tmp_path / "database.sqlite"))
+    stored = db.find_shop_by_id("yandex_1001")
+    assert stored["Обнаружен_в_последнем_парсинге"] is True
+    assert stored["Город"] == "Ростов-на-Дону"
+    db.close()
+
+
+@pytest.mark.parametrize("db_file, backend", [
+    ("database.json", PyroDatabase),
+    ("database.sqlite", SqlitePyroDatabase),
+    ("shops.db", SqlitePyroDatabase),
+])
+def test_open_database_by_extension(tmp_path, db_file, backend):
+    db = open_database(str(tmp_path / db_file))
+    assert type(db) is backend
+    if isinstance(db, SqlitePyroDatabase):
+        db.close()
+
+
+def test_merge_run_marks_new_updated_and_missing(db):
+    db.merge_run([make_shop(1), make_shop(2), make_shop(3)], seen_at="2026-01-01 10:00:00")
+    db.save_db()
+
+    diff = db.merge_run([make_shop(1), make_shop(2, **{"Телефон": "+78630009999"})],
+                        seen_at="2026-01-02 10:00:00")
+    db.save_db()
+
+    assert [shop["Название магазина"] for shop in diff.unchanged] == ["Магазин 1"]
+    assert [shop["Название магазина"] for shop in diff.updated] == ["Магазин 2"]
+    assert [shop["Название магазина"] for shop in diff.missing] == ["Магазин 3"]
+    assert diff.changes[diff.updated[0]["id"]] == {"Телефон": ("+78630000002", "+78630009999")}
+
+    stats = db.get_stats()
+    assert (stats["total_shops"], stats["found_in_last_parse"], stats["missing_in_last_parse"]) == (3, 2, 1)
+    shop = db.find_shop_by_id(diff.unchanged[0]["id"])
+    assert (shop["Дата добавления"], shop["Дата последнего обнаружения"]) == \
+        ("2026-01-01 10:00:00", "2026-01-02 10:00:00")
+
+
+def test_merge_run_fresh_urls_are_found_without_card_update(db):
+    db.merge_run([make_shop(1), make_shop(2)], seen_at="2026-01-01 10:00:00")
+    db.save_db()
+
+    diff = db.merge_run([], [make_shop(1)["Ссылка"], "https://yandex.ru/maps/org/unknown/9/"],
+                        seen_at="2026-01-02 10:00:00")
+    assert [shop["Название магазина"] for shop in diff.fresh] == ["Магазин 1"]
+    assert [shop["Название магазина"] for shop in diff.missing] == ["Магазин 2"]
+    shop = db.find_shop_by_id(diff.fresh[0]["id"])
+    assert shop["Обнаружен_в_последнем_парсинге"] is True
+    assert (shop["Дата последнего обнаружения"], shop["Дата обновления карточки"]) == \
+        ("2026-01-02 10:00:00", "2026-01-01 10:00:00")
+
+
+def test_bulk_upsert_counts(db):
+    counts = db.bulk_upsert([make_shop(1), make_shop(2), make_shop(1)])
+    assert counts == {"new": 2, "updated": 0, "unchanged": 1}
+
+    counts = db.bulk_upsert([make_shop(1, **{"Сайт": "https://salyut.ru"}), make_shop(3)])
+    assert counts == {"new": 1, "updated": 1, "unchanged": 0}
+    assert db.find_shop_by_id(db.extract_id(make_shop(1)["Ссылка"]))["Сайт"] == "https://salyut.ru"
+    assert db.get_stats()["total_shops"] == 3
+
+
+def test_bulk_upsert_across_batches(tmp_path, monkeypatch):
+    monkeypatch.setattr(SqlitePyroDatabase, "BATCH_SIZE", 2)
+    db = open_database(str(tmp_path / "database.sqlite"))
+    # Повтор магазина в следующем пакете видит уже записанную версию
+    records = [make_shop(1), make_shop(2), make_shop(3),
+               make_shop(1, **{"Телефон": "+78630009999"}), make_shop(3)]
+    assert db.bulk_upsert(records) == {"new": 3, "updated": 1, "unchanged": 1}
+    db.save_db()
+    assert db.find_shop_by_id(db.extract_id(make_shop(1)["Ссылка"]))["Телефон"] == "+78630009999"
+    assert db.get_stats()["total_shops"] == 3
+    db.close()
+
+
+def test_add_or_update_shop(db):
+    shop, is_new = db.add_or_update_shop(make_shop(1), seen_at="2026-01-01 10:00:00")
+    assert is_new and shop["id"] == db.extract_id(make_shop(1)["Ссылка"])
+    shop, is_new = db.add_or_update_shop(make_shop(1, **{"Адрес": "Ростов-на-Дону, улица 100"}))
+    assert not is_new and shop["Адрес"] == "Ростов-на-Дону, улица 100"
+
+
+def reopen(db):
+    if isinstance(db, SqlitePyroDatabase):
+        db.close()
+    return open_database(db.db_file)
+
+
+def test_changes_survive_reopen(db):
+    db.merge_run([make_shop(n) for n in range(3)], ["https://yandex.ru/maps/org/shop/1001/"])
+    db.set_last_update("2026-01-01 10:00:00")
+    db.save_db()
+    db = reopen(db)
+    try:
+        assert db.get_stats()["total_shops"] == 3
+        assert db.get_stats()["last_update"] == "2026-01-01 10:00:00"
+        assert db.find_shop_by_id(db.extract_id(make_shop(2)["Ссылка"]))["Адрес"] == "Ростов-на-Дону, улица 2"
+    finally:
+        if isinstance(db, SqlitePyroDatabase):
+            db.close()
+
+
+def test_journal_keeps_only_changes(tmp_path):
+    db = PyroDatabase(str(tmp_path / "database.json"))
+    db.merge_run([make_shop(n) for n in range(3)])
+    db.save_db()
+    db.merge_run([make_shop(1, **{"Телефон": "+78630009999"})])
+    db.save_db()
+
+    with open(db.journal_file, encoding="utf-8") as f:
+        ops = [json.loads(line)["op"] for line in f]
+    # Второй запуск: сброс флагов и одна измененная запись
+    assert ops == ["unfound_all", "upsert", "upsert", "upsert", "unfound_all", "upsert"]
+    assert db.journal_records == 6
+
+    replayed = PyroDatabase(db.db_file)
+    assert replayed.db["shops"] == db.db["shops"]
+    assert replayed.journal_records == 6
+
+
+def test_compact_rewrites_snapshot(tmp_path, monkeypatch):
+    monkeypatch.setattr(PyroDatabase, "COMPACT_MIN_RECORDS", 3)
+    db = PyroDatabase(str(tmp_path / "database.json"))
+    db.merge_run([make_shop(n) for n in range(2)])
+    db.set_last_update("2026-01-01 10:00:00")
+    # 4 записи журнала больше и порога, и числа магазинов
+    db.save_db()
+
+    assert os.path.exists(db.db_file) and not os.path.exists(db.journal_file)
+    assert db.journal_records == 0
+    replayed = PyroDatabase(db.db_file)
+    assert replayed.db == db.db
+
+    # После сворачивания изменения снова идут в журнал поверх снимка
+    db.merge_run([make_shop(0)])
+    db.save_db()
+    replayed = PyroDatabase(db.db_file)
+    assert replayed.get_stats() == db.get_stats() == {
+        "total_shops": 2, "found_in_last_parse": 1, "missing_in_last_parse": 1,
+        "last_update": "2026-01-01 10:00:00"}
+
+
+def test_replay_after_crash_before_journal_cleanup(tmp_path, monkeypatch):
+    monkeypatch.setattr(PyroDatabase, "COMPACT_MIN_RECORDS", 3)
+    db = PyroDatabase(str(tmp_path / "database.json"))
+    db.merge_run([make_shop(n) for n in range(2)])
+    db.set_last_update("2026-01-01 10:00:00")
+    journal = [json.dumps(record, ensure_ascii=False) + "\n" for record in db.pending]
+    db.save_db()
+    assert not os.path.exists(db.journal_file)
+
+    # Процесс упал после записи снимка, но до удаления журнала
+    with open(db.journal_file, "w", encoding="utf-8") as f:
+        f.writelines(journal)
+    assert PyroDatabase(db.db_file).db["shops"] == db.db["shops"]
+
+
+def test_torn_journal_line_is_cut(tmp_path):
+    db = PyroDatabase(str(tmp_path / "database.json"))
+    db.merge_run([make_shop(1)])
+    db.save_db()
+    size = os.path.getsize(db.journal_file)
+    with open(db.journal_file, "a", encoding="utf-8") as f:
+        f.write('{"op": "upsert", "shop": {"id": "обрыв')
+
+    replayed = PyroDatabase(db.db_file)
+    assert replayed.get_stats()["total_shops"] == 1
+    assert os.path.getsize(db.journal_file) == size
+
+    # Следующие записи дописываются после целой строки
+    replayed.merge_run([make_shop(2)])
+    replayed.save_db()
+    assert PyroDatabase(db.db_file).get_stats()["total_shops"] == 2
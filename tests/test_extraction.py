@@ -0,0 +1,105 @@
+import os
+
+import pytest
+
+from parser.extraction import (ADDRESS_SELECTORS, SITE_SELECTORS, STORE_PLAN, TITLE_SELECTORS,
+                               ExtractionPlan, SimpleSelector)
+from parser.html_backends import HTML_BACKENDS, get_html_backend
+
+FIXTURE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                       "benchmarks", "fixtures", "org_page_sample.html")
+
+PAGE = """<html><body>
+<h1 class="card-title-view__title">Запасной заголовок</h1>
+<h1 class="orgpage-header-view__header extra">Салют</h1>
+<div class="orgpage-header-view__header">Не h1</div>
+<span itemprop="address">Ростов-на-Дону, улица Садовая, 1</span>
+<address>Второй адрес</address>
+<div class="orgpage-phones-view__phone-number">+7 (863) 000-00-01</div>
+<a href="tel:+78630000002">Позвонить</a>
+<a href="https://salut.ru">Сайт</a>
+<div class="orgpage-phones-view__phone-number">+7 (863) 000-00-03</div>
+</body></html>"""
+
+
+def backends():
+    installed = []
+    for name in HTML_BACKENDS:
+        try:
+            get_html_backend(name)
+        except ImportError:
+            continue
+        installed.append(name)
+    return installed
+
+
+@pytest.mark.parametrize("selector, tag, classes, attrs, matches", [
+    ("h1.title", "h1", {"title", "x"}, {}, True),
+    ("h1.title", "div", {"title"}, {}, False),
+    (".a.b", "div", {"a"}, {}, False),
+    (".a.b", "span", {"b", "a"}, {}, True),
+    ('[itemprop="address"]', "span", set(), {"itemprop": "address"}, True),
+    ('[itemprop="address"]', "span", set(), {"itemprop": "addressLocality"}, False),
+    ('a[href^="tel:"]', "a", set(), {"href": "tel:+7"}, True),
+    ('a[href^="tel:"]', "a", set(), {"href": None}, False),
+    ("[data-id]", "div", set(), {"data-id": ""}, True),
+    ("address", "address", set(), {}, True),
+])
+def test_simple_selector_matches(selector, tag, classes, attrs, matches):
+    assert SimpleSelector(selector).matches(tag, classes, attrs) is matches
+
+
+@pytest.mark.parametrize("selector", ["", "div > a", "a:hover", ".a .b", "#id"])
+def test_complex_selectors_are_rejected(selector):
+    with pytest.raises(ValueError):
+        SimpleSelector(selector)
+
+
+@pytest.mark.parametrize("selector, key", [
+    ("h1.title.big", ("class", "title")),
+    ("address", ("tag", "address")),
+    ('[itemprop="name"]', ("attr", "itemprop")),
+])
+def test_dispatch_key(selector, key):
+    assert SimpleSelector(selector).dispatch_key == key
+
+
+def test_combined_selector_lists_each_selector_once():
+    plan = ExtractionPlan({"a": [".x", "h1"], "b": [".x"]}, {"c": "a[href]"})
+    assert plan.combined_selector.split(", ") == [".x", "h1", "a[href]"]
+    assert plan.attr_names == []
+
+
+@pytest.mark.parametrize("name", backends())
+@pytest.mark.parametrize("page", ["page", "fixture"])
+def test_walk_matches_separate_selects(name, page):
+    backend = get_html_backend(name)
+    if page == "fixture":
+        with open(FIXTURE, encoding="utf-8") as f:
+            page = f.read()
+    else:
+        page = PAGE
+    doc = backend.parse(page)
+    found = STORE_PLAN.walk(backend, doc)
+
+    # Один обход дает то же, что отдельный поиск по каждому селектору
+    for field, selectors in (("title", TITLE_SELECTORS), ("address", ADDRESS_SELECTORS),
+                             ("site", SITE_SELECTORS)):
+        assert found[field] == [backend.select_one(doc, selector) for selector in selectors], field
+    for field, selector in (("phones", ".orgpage-phones-view__phone-number"),
+                            ("tel_links", 'a[href^="tel:"]'),
+                            ("site_texts", ".business-urls-view__text")):
+        assert found[field] == backend.select(doc, selector), field
+
+
+@pytest.mark.parametrize("name", backends())
+def test_walk_takes_first_element_per_selector(name):
+    backend = get_html_backend(name)
+    found = STORE_PLAN.walk(backend, backend.parse(PAGE))
+    title = [backend.text(node) if node is not None else None for node in found["title"]]
+    assert title[0] == "Салют"
+    assert title[2] == "Запасной заголовок"
+    assert title[4] == "Салют"
+    assert backend.text(found["address"][0]) == "Ростов-на-Дону, улица Садовая, 1"
+    assert [backend.text(node) for node in found["phones"]] == ["+7 (863) 000-00-01", "+7 (863) 000-00-03"]
+    assert [backend.attr(node, "href") for node in found["tel_links"]] == ["tel:+78630000002"]
@@ -0,0 +1,82 @@
+import os
+from datetime import datetime
+
+import pytest
+
+from core.history import ObservationHistory
+
+
+def shop(n, **fields):
+    shop = {"id": f"shop_{n}", "Название магазина": f"Магазин {n}", "Адрес": f"улица {n}",
+            "Телефон": "", "Сайт": ""}
+    shop.update(fields)
+    return shop
+
+
+@pytest.fixture
+def history(tmp_path):
+    return ObservationHistory(str(tmp_path / "history"))
+
+
+def test_runs_in_one_second_get_own_ids(history, monkeypatch):
+    moment = datetime(2025, 1, 15, 10, 30, 0, 123456)
+
+    class FrozenDatetime(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return moment
+
+    monkeypatch.setattr("core.history.datetime", FrozenDatetime)
+    first = history.record_run([shop(1)])
+    second = history.record_run([shop(1), shop(2)])
+
+    assert first == "20250115_103000_123456"
+    assert second == "20250115_103000_123456_2"
+    assert [(run["run_id"], run["rows"]) for run in history.runs()] == [(first, 1), (second, 2)]
+
+
+def test_generated_ids_sort_by_time(history):
+    run_ids = [history.record_run([shop(n)]) for n in range(3)]
+    assert len(set(run_ids)) == 3
+    assert sorted(run_ids) == run_ids
+
+
+def test_explicit_run_id_replaces_run(history):
+    history.record_run([shop(1)], run_id="a")
+    history.record_run([shop(1), shop(2)], run_id="a")
+    run, = history.runs()
+    assert run["rows"] == 2
+    assert list(history.read_column("a", ObservationHistory.SHOP_COLUMN)) == [0, 1]
+
+
+def test_changes_between_runs(history):
+    history.record_run([shop(1), shop(2), shop(3)], run_id="a")
+    history.record_run([shop(1), shop(2, **{"Телефон": "+78630000002"}), shop(4)], run_id="b")
+
+    changes = history.changes_between("a", "b")
+    assert changes["added"] == ["shop_4"]
+    assert changes["removed"] == ["shop_3"]
+    assert changes["changed"] == {"shop_2": {"Телефон": ("", "+78630000002")}}
+    # Значения хранятся в словаре один раз
+    assert history.changes_between("a", "b", ["name"])["changed"] == {}
+
+
+def test_first_last_seen(history):
+    history.record_run([shop(1), shop(2)], run_id="a")
+    history.record_run([shop(2)], run_id="b")
+    history.record_run([shop(1)], run_id="c")
+    assert history.first_last_seen() == {"shop_1": ("a", "c"), "shop_2": ("a", "b")}
+    assert history.first_last_seen(["shop_2", "unknown"]) == {"shop_2": ("a", "b")}
+
+
+def test_torn_dictionary_line_is_cut(history):
+    history.record_run([shop(1)], run_id="a")
+    path = os.path.join(history.root, "dict_name.jsonl")
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('"Оборванная строка')
+
+    reopened = ObservationHistory(history.root)
+    reopened.record_run([shop(1), shop(2)], run_id="b")
+    assert reopened.changes_between("a", "b")["added"] == ["shop_2"]
+    with open(path, encoding="utf-8") as f:
+        assert f.read().splitlines() == ['"Магазин 1"', '"Магазин 2"']
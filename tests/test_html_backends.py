@@ -0,0 +1,64 @@
+import os
+
+import pytest
+
+from parser import YandexPyroParser
+from parser.html_backends import HTML_BACKENDS, get_html_backend
+
+FIXTURE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                       "benchmarks", "fixtures", "org_page_sample.html")
+URL = "https://yandex.ru/maps/org/shop/1/"
+
+HIDDEN_TEXT = """<html><head><style>.phone{}</style><script>var phone = "+7 (863) 000-00-01"</script></head>
+<body><h1 itemprop="name">Салют</h1><div itemprop="address">Ростов-на-Дону, улица Садовая, 1</div>
+<template><p>+7 (863) 000-00-02</p></template>
+<div>Звоните: +7 (863) 000-00-03 <template>+7 (863) 000-00-04</template>ежедневно</div>
+</body></html>"""
+
+
+def backends():
+    """Установленные HTML-парсеры"""
+    installed = []
+    for name in HTML_BACKENDS:
+        try:
+            get_html_backend(name)
+        except ImportError:
+            continue
+        installed.append(name)
+    return installed
+
+
+@pytest.mark.parametrize("name", backends())
+def test_full_text_skips_hidden_tags(name):
+    backend = get_html_backend(name)
+    text = backend.full_text(backend.parse(HIDDEN_TEXT))
+    assert "000-00-03" in text
+    assert not any(hidden in text for hidden in ("000-00-01", "000-00-02", "000-00-04", ".phone"))
+
+
+def test_full_text_is_same_for_all_backends():
+    texts = {name: get_html_backend(name).full_text(get_html_backend(name).parse(HIDDEN_TEXT))
+             for name in backends()}
+    assert len(set(texts.values())) == 1, texts
+
+
+def without_date(data):
+    return {key: value for key, value in data.items() if key != "Дата сбора"}
+
+
+@pytest.mark.parametrize("html", [HIDDEN_TEXT, "fixture"], ids=["hidden_text", "fixture"])
+def test_store_data_is_same_for_all_backends(html):
+    if html == "fixture":
+        with open(FIXTURE, encoding="utf-8") as f:
+            html = f.read()
+    results = {name: without_date(YandexPyroParser(html_backend=name).parse_store_data(URL, html))
+               for name in backends()}
+    assert all(data == results["bs4"] for data in results.values()), results
+
+
+@pytest.mark.parametrize("name", backends())
+def test_phone_from_text_ignores_hidden_tags(name):
+    # Телефона в карточке нет - он ищется в видимом тексте страницы
+    phones = YandexPyroParser(html_backend=name).parse_store_data(URL, HIDDEN_TEXT)["Телефон"]
+    assert "8630000003" in phones
+    assert not any(hidden in phones for hidden in ("0000001", "0000002", "0000004"))
@@ -0,0 +1,124 @@
+import asyncio
+
+import pytest
+
+from parser import YandexPyroParser
+from parser.jobs import CityConfig, CrawlJob
+
+ROSTOV = CityConfig("Ростов-на-Дону", "39/rostov-na-donu", (39.4, 47.1, 40.0, 47.4))
+TAGANROG = CityConfig("Таганрог", "971/taganrog", (38.8, 47.18, 38.98, 47.28))
+
+
+class FakeParser(YandexPyroParser):
+    """Парсер без браузера: области и страницы магазинов отдаются из словарей"""
+
+    def __init__(self, links, **kwargs):
+        super().__init__(jobs=[CrawlJob(ROSTOV, "пиротехника"), CrawlJob(TAGANROG, "пиротехника")],
+                         use_search_api=False, **kwargs)
+        self.links = links
+        self.events = []
+
+    async def init_browser(self):
+        return True
+
+    async def close(self):
+        pass
+
+    async def crawl_area(self, area):
+        self.events.append(("area", area["city"]))
+        for url in self.links[area["city"]]:
+            self.add_store_link(url)
+        self.area_stats.append({"name": area["name"], "hits": len(self.links[area["city"]]), "new": 0,
+                                "scrolls": 1, "seconds": 0, "list_ended": True})
+        return len(self.links[area["city"]])
+
+    async def parse_store_pages(self, urls, pool=None):
+        self.events.append(("stores", sorted(urls)))
+        return [{"Ссылка": url, "Название магазина": url, "Город": self.city_for(url).name} for url in urls]
+
+
+def org(n):
+    return f"https://yandex.ru/maps/org/shop/{n}/"
+
+
+def run_parser(parser):
+    done = []
+    parser.on_city_done = lambda city, shops, fresh_urls: done.append(
+        (city, [shop["Ссылка"] for shop in shops], list(parser.events)))
+    results = asyncio.run(parser.parse())
+    return results, done
+
+
+def test_each_city_is_done_before_next_is_crawled():
+    parser = FakeParser({"Ростов-на-Дону": [org(1), org(2)], "Таганрог": [org(3), org(2)]})
+    results, done = run_parser(parser)
+
+    assert parser.completed
+    assert [city for city, _, _ in done] == ["Ростов-на-Дону", "Таганрог"]
+    # Ростов передан до того, как началась первая область Таганрога
+    assert done[0][2] == [("area", "Ростов-на-Дону"), ("stores", [org(1), org(2)])]
+    # Организация, найденная и в Ростове, повторно не открывается
+    assert done[1][1] == [org(3)]
+    assert sorted(shop["Ссылка"] for shop in results) == [org(1), org(2), org(3)]
+
+
+def test_city_without_links_is_not_done():
+    parser = FakeParser({"Ростов-на-Дону": [org(1)], "Таганрог": []})
+    results, done = run_parser(parser)
+
+    assert [city for city, _, _ in done] == ["Ростов-на-Дону"]
+    assert len(results) == 1
+    assert not parser.completed
+
+
+@pytest.mark.parametrize("failing_city", ["Ростов-на-Дону", "Таганрог"])
+def test_crash_keeps_finished_cities(monkeypatch, failing_city):
+    parser = FakeParser({"Ростов-на-Дону": [org(1)], "Таганрог": [org(2)]})
+    crawl_area = parser.crawl_area
+
+    async def crash(area):
+        if area["city"] == failing_city:
+            raise RuntimeError("браузер упал")
+        return await crawl_area(area)
+
+    monkeypatch.setattr(parser, "crawl_area", crash)
+    _, done = run_parser(parser)
+    assert not parser.completed
+    assert [city for city, _, _ in done] == (["Ростов-на-Дону"] if failing_city == "Таганрог" else [])
+
+
+def api_item(n, **fields):
+    item = {"id": str(n), "title": f"Салют {n}", "fullAddress": f"Ростов-на-Дону, улица {n}"}
+    item.update(fields)
+    return item
+
+
+@pytest.mark.parametrize("fields, from_api, phone, site", [
+    ({"phones": [{"number": "+7 (863) 000-00-01"}], "urls": ["salut.ru"]}, True, "+78630000001", "https://salut.ru"),
+    # Пустые списки - в карточке нет телефона и сайта, страница не нужна
+    ({"phones": [], "urls": []}, True, "", ""),
+    ({"phones": [{"number": "+7 (863) 000-00-01"}], "urls": ["https://yandex.ru/maps/org/1/"]},
+     True, "+78630000001", ""),
+    # Ответ без ключа - значение неизвестно, открываем страницу
+    ({"phones": []}, False, "", None),
+    ({}, False, None, None),
+])
+def test_search_api_fields_present_even_if_empty(fields, from_api, phone, site):
+    parser = FakeParser({})
+    url = org(1)
+    parser.add_store_link(url)
+    parser.api_items["1"] = api_item(1, **fields)
+
+    data = parser.parse_search_item(url, parser.api_items["1"])
+    assert (data.get("Телефон"), data.get("Сайт")) == (phone, site)
+
+    results, urls_to_fetch = parser.split_by_search_api([url])
+    assert (len(results), urls_to_fetch) == ((1, []) if from_api else (0, [url]))
+
+
+def test_search_api_skips_other_cities():
+    parser = FakeParser({})
+    url = org(2)
+    parser.add_store_link(url)
+    parser.api_items["2"] = api_item(2, fullAddress="Батайск, улица 2", phones=[], urls=[])
+    assert parser.split_by_search_api([url]) == ([], [])
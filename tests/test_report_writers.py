@@ -0,0 +1,107 @@
+import csv
+import json
+import os
+
+import pytest
+
+from core.report_model import ReportSections
+from core.report_writers import ParquetReportWriter, get_report_writer
+
+
+def shop(n, found=True, **fields):
+    shop = {
+        "Название магазина": f"Магазин {n}",
+        "Адрес": f"Ростов-на-Дону, улица {n}",
+        "Телефон": f"+7863000{n:04d}" if n % 2 else "",
+        "Сайт": "",
+        "Ссылка": f"https://yandex.ru/maps/org/shop/{n}/",
+        "Дата сбора": "2025-01-15 10:30:00",
+        "Дата добавления": "2025-01-01 10:00:00",
+        "Дата последнего обнаружения": "2025-01-15 10:30:00",
+        "Обнаружен_в_последнем_парсинге": found,
+    }
+    shop.update(fields)
+    return shop
+
+
+def report_input():
+    """Магазин 1 новый, 2 уже был в базе, 3 не найден в этом парсинге"""
+    new = [shop(1)]
+    parsed = [shop(1), shop(2)]
+    all_shops = [shop(1), shop(2), shop(3, found=False)]
+    return new, parsed, all_shops
+
+
+def read_section(writer, report_dir, section):
+    path = writer.section_path(report_dir, section)
+    if writer.name == "csv":
+        with open(path, encoding="utf-8-sig", newline="") as f:
+            return list(csv.DictReader(f))
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+@pytest.mark.parametrize("report_format, found, missing", [("csv", "Да", "Нет"), ("jsonl", True, False)])
+def test_sections_from_generators(tmp_path, report_format, found, missing):
+    writer = get_report_writer(report_format, str(tmp_path))
+    new, parsed, all_shops = report_input()
+    report_dir = writer.write(iter(new), iter(parsed), iter(all_shops), "report", "Таганрог")
+    assert report_dir == os.path.join(str(tmp_path), "report")
+
+    assert [row["Название магазина"] for row in read_section(writer, report_dir, ReportSections.NEW)] == ["Магазин 1"]
+    assert len(read_section(writer, report_dir, ReportSections.PARSED)) == 2
+
+    rows = read_section(writer, report_dir, ReportSections.ALL)
+    assert [(row["Статус"], row["В последнем парсинге"]) for row in rows] == [
+        (ReportSections.STATUS_NEW, found), (ReportSections.STATUS_IN_DB, found),
+        (ReportSections.STATUS_MISSING, missing)]
+
+    stats = {row["Показатель"]: row["Значение"] for row in read_section(writer, report_dir, ReportSections.STATS)}
+    assert str(stats["Всего в базе данных"]) == "3"
+    assert str(stats["Магазинов с телефоном"]) == "1"
+    assert stats["Процент покрытия"] == "66.7%"
+    assert stats["Город"] == "Таганрог"
+
+
+@pytest.mark.parametrize("report_format", ["csv", "jsonl"])
+def test_no_parsed_shops_no_report(tmp_path, report_format):
+    writer = get_report_writer(report_format, str(tmp_path))
+    assert writer.write([], iter(()), [shop(3, found=False)], "report") == ""
+    assert not os.path.exists(tmp_path / "report")
+
+
+def test_unknown_format():
+    with pytest.raises(ValueError):
+        get_report_writer("xml")
+
+
+def test_excel_report(tmp_path):
+    pytest.importorskip("xlsxwriter")
+    new, parsed, all_shops = report_input()
+    path = get_report_writer("excel", str(tmp_path), constant_memory=True).write(
+        iter(new), iter(parsed), iter(all_shops), "report")
+    assert path.endswith("report.xlsx") and os.path.getsize(path) > 0
+
+
+def test_parquet_report(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    writer = get_report_writer("parquet", str(tmp_path))
+    report_dir = writer.write(*report_input(), "report")
+    table = pq.read_table(writer.section_path(report_dir, ReportSections.ALL))
+    assert table.column("В последнем парсинге").to_pylist() == [True, True, False]
+    assert table.column("Статус").to_pylist()[-1] == ReportSections.STATUS_MISSING
+
+
+def test_parquet_without_pyarrow_names_package(monkeypatch, tmp_path):
+    import builtins
+
+    real_import = builtins.__import__
+
+    def no_pyarrow(name, *args, **kwargs):
+        if name.startswith("pyarrow"):
+            raise ImportError(name)
+        return real_import(name, *args, **kwargs)
+
+    monkeypatch.setattr(builtins, "__import__", no_pyarrow)
+    with pytest.raises(ImportError, match="pip install"):
+        ParquetReportWriter(str(tmp_path))
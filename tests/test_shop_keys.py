@@ -0,0 +1,136 @@
+import hashlib
+import json
+import os
+import random
+import subprocess
+import sys
+
+import pytest
+
+from core.database import PyroDatabase
+from core.shop_keys import dedup_key, extract_org_id, normalize_shop_url, shop_key
+from parser import YandexPyroParser
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Разные записи одного магазина: вкладки карточки, параметры, якоря, слеши
+SAME_SHOP = {
+    "yandex_1234567890": [
+        "https://yandex.ru/maps/org/salyut/1234567890/",
+        "https://yandex.ru/maps/org/salyut/1234567890",
+        "https://yandex.ru/maps/org/salyut/1234567890/reviews/",
+        "https://yandex.ru/maps/org/salyut/1234567890/photos/?ll=39.7%2C47.2&z=16",
+        "/maps/org/salyut/1234567890/gallery/#top",
+        "//yandex.ru/maps/org/salyut/1234567890/menu",
+        "  https://yandex.ru/maps/org/1234567890/  ",
+        "https://yandex.ru/maps/?businessId=1234567890&ll=39.7%2C47.2",
+        "https://yandex.ru/maps/?ll=39.7%2C47.2&businessId=1234567890#reviews",
+        "https://yandex.ru/maps/39/rostov-na-donu/1234567890/details/",
+        "https://yandex.ru/firm/1234567890",
+    ],
+}
+
+URLS = [url for urls in SAME_SHOP.values() for url in urls] + [
+    "https://yandex.ru/maps/org/fejerverk/",
+    "https://yandex.ru/maps/org/fejerverk/reviews/?tab=1",
+    "https://example.com/shop/",
+    "HTTPS://EXAMPLE.COM/SHOP",
+    "https://yandex.ru/maps/org/ /",
+    "/",
+    "//",
+    "not a url",
+    "",
+]
+
+# Алфавит случайных ссылок: разделители, вкладки карточки и параметры
+PIECES = ["https://", "http://", "//", "/", "yandex.ru", "maps", "org", "firm", "salyut", "123",
+          "4567", "/reviews", "/photos", "/gallery", "/menu", "?", "#", "&", "=", "businessId=",
+          "/details", " ", "\t", "ll=39.7%2C47.2", "ё", "Магазин"]
+
+
+def random_urls(count: int = 3000, seed: int = 20261017):
+    rng = random.Random(seed)
+    for _ in range(count):
+        yield "".join(rng.choice(PIECES) for _ in range(rng.randint(0, 12)))
+
+
+@pytest.mark.parametrize("url", URLS + list(random_urls()))
+def test_normalize_is_idempotent(url):
+    normalized = normalize_shop_url(url)
+    assert normalize_shop_url(normalized) == normalized
+
+
+@pytest.mark.parametrize("url", URLS)
+def test_key_survives_normalization(url):
+    # Нормализованная ссылка - тот же магазин
+    if normalize_shop_url(url):
+        assert shop_key(normalize_shop_url(url)) == shop_key(url)
+
+
+@pytest.mark.parametrize("key, urls", SAME_SHOP.items())
+def test_same_shop_has_one_key(key, urls):
+    assert {shop_key(url) for url in urls} == {key}
+    assert {extract_org_id(url) for url in urls} == {key[len("yandex_"):]}
+
+
+def test_hash_key_is_blake2b_of_normalized_url():
+    url = "https://Example.com/Shop/?utm=1"
+    expected = hashlib.blake2b(b"https://example.com/shop", digest_size=8).hexdigest()
+    assert shop_key(url) == f"hash_{expected}"
+    assert shop_key("HTTPS://EXAMPLE.COM/SHOP/") == shop_key(url)
+
+
+@pytest.mark.parametrize("seed", ["0", "1", "4242", "random"])
+def test_keys_are_stable_across_processes(seed):
+    script = (
+        "import json, sys\n"
+        "from core.shop_keys import dedup_key, shop_key\n"
+        "urls = json.loads(sys.stdin.read())\n"
+        "print(json.dumps([[shop_key(url), dedup_key({'Ссылка': url})] for url in urls]))\n"
+    )
+    env = dict(os.environ, PYTHONHASHSEED=seed)
+    output = subprocess.run([sys.executable, "-c", script], input=json.dumps(URLS), env=env, cwd=ROOT,
+                            capture_output=True, text=True, check=True).stdout
+    assert json.loads(output) == [[shop_key(url), dedup_key({"Ссылка": url})] for url in URLS]
+
+
+@pytest.mark.parametrize("url", URLS + list(random_urls(500)))
+def test_database_and_dedup_keys_agree(url, tmp_path):
+    db = PyroDatabase(str(tmp_path / "database.json"))
+    assert db.extract_id(url) == shop_key(url) == dedup_key({"Ссылка": url})
+
+
+def test_dedup_key_without_url():
+    assert dedup_key({"Название магазина": " Салют ", "Адрес": "Ростов, ул. Ленина 1"}) == \
+        "салют|ростов, ул. ленина 1"
+    assert dedup_key({"Название магазина": "Салют"}) == "салют"
+    assert dedup_key({}) == ""
+
+
+def test_remove_duplicates_matches_database_ids(tmp_path):
+    records = [{"Ссылка": url, "Название магазина": f"Магазин {i}", "Адрес": f"Адрес {i}"}
+               for i, url in enumerate(URLS + list(random_urls(300)))]
+    records += [{"Название магазина": "Без ссылки", "Адрес": "Адрес"}] * 2 + [{}] * 2
+
+    parser = YandexPyroParser()
+    parser.results = list(records)
+    parser.remove_duplicates()
+
+    # Остается первая запись каждого ключа, записи без ключа не трогаются
+    keys = [dedup_key(item) for item in parser.results]
+    assert len([key for key in keys if key]) == len({key for key in keys if key})
+    assert {dedup_key(item) for item in records} == set(keys)
+    assert keys.count("") == 2
+
+    # Тот же ключ - тот же ID магазина в базе
+    db = PyroDatabase(str(tmp_path / "database.json"))
+    for item in parser.results:
+        if item.get("Ссылка"):
+            assert db.extract_id(item["Ссылка"]) == dedup_key(item)
+
+
+def test_business_id_links_stay_distinct():
+    first = normalize_shop_url("https://yandex.ru/maps/?businessId=111&ll=39.7%2C47.2")
+    second = normalize_shop_url("https://yandex.ru/maps/?businessId=222")
+    assert first == "https://yandex.ru/maps?businessId=111"
+    assert first != second
@@ -0,0 +1,137 @@
+import json
+
+import pytest
+
+from parser.checkpoint import CrawlCheckpoint
+from parser.jobs import CityConfig, CrawlConfig, CrawlJob
+from parser.tiling import ROSTOV_BBOX, TilePlanner, area_summary
+
+
+@pytest.fixture
+def planner():
+    return TilePlanner(saturation=50, max_depth=2, city="Ростов-на-Дону")
+
+
+def test_root_covers_city(planner):
+    root, = planner.root()
+    west, south, east, north = ROSTOV_BBOX
+    assert root["depth"] == 0
+    assert root["spn"] == [round(east - west, 6), round(north - south, 6)]
+    assert root["city"] == "Ростов-на-Дону"
+    assert "sspn=0.672226%2C0.318267&z=11" in root["url"]
+
+
+@pytest.mark.parametrize("hits, list_ended, splits", [
+    (0, True, False),
+    (10, True, False),
+    (49, True, False),
+    (50, True, True),
+    (10, False, True),
+    # Пустой список, который не успел закончиться, - не повод делить
+    (0, False, False),
+])
+def test_split_only_saturated(planner, hits, list_ended, splits):
+    root, = planner.root()
+    assert bool(planner.split(root, hits, list_ended)) is splits
+
+
+def test_quadrants_tile_parent(planner):
+    root, = planner.root()
+    children = planner.split(root, 50)
+    assert [child["name"].rsplit(" / ", 1)[1] for child in children] == ["СЗ", "СВ", "ЮЗ", "ЮВ"]
+    assert {child["depth"] for child in children} == {1}
+    assert {child["city"] for child in children} == {"Ростов-на-Дону"}
+    assert {child["search_url"] for child in children} == {root["search_url"]}
+
+    # Каждая точка окна родителя попадает ровно в одну четверть
+    (lon, lat), (span_lon, span_lat) = root["ll"], root["spn"]
+    for fx in (0.01, 0.25, 0.5, 0.75, 0.99):
+        for fy in (0.01, 0.25, 0.5, 0.75, 0.99):
+            point = (lon - span_lon / 2 + fx * span_lon, lat - span_lat / 2 + fy * span_lat)
+            assert sum(TilePlanner.contains(child, *point) for child in children) == 1
+
+    # Четверть на уровень масштаба ближе
+    assert all(f"z={TilePlanner.zoom(root['spn'][0]) + 1}" in child["url"] for child in children)
+
+
+def test_max_depth_stops_splitting(planner):
+    area, = planner.root()
+    for depth in range(planner.max_depth):
+        area = planner.split(area, 100)[0]
+        assert area["depth"] == depth + 1
+    assert planner.split(area, 100) == []
+    assert planner.scroll_limit(area) is None
+
+
+def test_manual_areas_are_not_split(planner):
+    area = {"name": "Центр", "url": "https://yandex.ru/maps/39/rostov-na-donu/search/x/"}
+    assert planner.split(area, 100, False) == []
+    assert planner.scroll_limit(area) is None
+
+
+@pytest.mark.parametrize("probe, limit", [(None, 50), (0, 50), (10, 10), (80, 50)])
+def test_scroll_limit_of_splittable_area(probe, limit):
+    planner = TilePlanner(saturation=50, probe=probe)
+    assert planner.scroll_limit(planner.root()[0]) == limit
+
+
+def test_probe_is_off_by_default():
+    assert TilePlanner().probe == TilePlanner().saturation
+    assert CrawlConfig().jobs()[0].planner.probe == 50
+
+
+def test_other_planner_splits_area_alike(planner):
+    # Область из очереди или журнала делит любой планировщик с теми же настройками
+    area = planner.split(planner.root()[0], 50)[1]
+    other = TilePlanner(saturation=50, max_depth=2)
+    assert other.split(json.loads(json.dumps(area)), 50) == planner.split(area, 50)
+
+
+def test_checkpoint_resplits_saturated_areas(tmp_path, planner):
+    path = str(tmp_path / "checkpoint.jsonl")
+    root, = planner.root()
+    children = planner.split(root, 50)
+
+    checkpoint = CrawlCheckpoint(path)
+    checkpoint.area_done(root, ["https://yandex.ru/maps/org/1/"], {}, hits=50, list_ended=False,
+                         city="Ростов-на-Дону")
+    checkpoint.area_done(children[0], [], {}, hits=3, list_ended=True, city="Ростов-на-Дону")
+    checkpoint.close()
+
+    # После перезапуска пройденные области делятся на те же четверти без загрузки
+    restored = CrawlCheckpoint(path, resume=True)
+    assert restored.done_areas == {root["url"], children[0]["url"]}
+    assert planner.split(root, *restored.area_hits[root["url"]]) == children
+    assert planner.split(children[0], *restored.area_hits[children[0]["url"]]) == []
+    assert restored.url_cities == {"https://yandex.ru/maps/org/1/": "Ростов-на-Дону"}
+    restored.close()
+
+
+def test_checkpoint_without_hits_does_not_split(tmp_path, planner):
+    # Записи старых журналов без hits: область считается прокрученной до конца
+    path = tmp_path / "checkpoint.jsonl"
+    root, = planner.root()
+    path.write_text(json.dumps({"type": "area", "url": root["url"], "links": [], "api_items": {}}) + "\n",
+                    encoding="utf-8")
+    restored = CrawlCheckpoint(str(path), resume=True)
+    assert root["url"] in restored.done_areas
+    assert restored.area_hits.get(root["url"], (0, True)) == (0, True)
+    restored.close()
+
+
+def test_jobs_have_their_own_trees():
+    taganrog = CityConfig("Таганрог", "971/taganrog", (38.8, 47.18, 38.98, 47.28))
+    jobs = CrawlConfig(cities=[taganrog], queries=["пиротехника", "салюты/фейерверки"]).jobs()
+    assert [job.name for job in jobs] == ["Таганрог: пиротехника", "Таганрог: салюты/фейерверки"]
+    area = jobs[1].areas()[0]
+    assert area["search_url"] == "https://yandex.ru/maps/971/taganrog/search/%D1%81%D0%B0%D0%BB%D1%8E%D1%82%D1%8B" \
+                                 "%2F%D1%84%D0%B5%D0%B9%D0%B5%D1%80%D0%B2%D0%B5%D1%80%D0%BA%D0%B8/"
+    assert all(child["search_url"] == area["search_url"] and child["city"] == "Таганрог"
+               for child in jobs[0].planner.split(area, 50))
+
+
+def test_area_summary_counts_redundant_hits():
+    stats = [{"scrolls": 3, "hits": 20, "new": 20, "seconds": 1.5},
+             {"scrolls": 2, "hits": 10, "new": 4, "seconds": 0.5}]
+    assert area_summary(stats) == {"areas": 2, "scrolls": 5, "seconds": 2.0, "hits": 30, "redundant": 6}
+    assert area_summary([]) is None
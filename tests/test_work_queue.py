@@ -0,0 +1,121 @@
+import asyncio
+import time
+
+import pytest
+
+from parser import workers
+from parser.jobs import CrawlConfig
+from parser.work_queue import WorkQueue
+
+
+@pytest.fixture
+def queue(tmp_path):
+    queue = WorkQueue(str(tmp_path / "queue.sqlite"))
+    yield queue
+    queue.close()
+
+
+def areas(*names):
+    return [{"url": f"https://yandex.ru/maps/search/{name}/", "name": name} for name in names]
+
+
+def test_add_jobs_skips_known_keys(queue):
+    assert queue.add_jobs(WorkQueue.AREA, areas("a", "b")) == 2
+    assert queue.add_jobs(WorkQueue.AREA, areas("b", "c")) == 1
+    assert queue.counts(WorkQueue.AREA) == {"pending": 3}
+
+
+def test_claim_is_exclusive_and_ordered(queue):
+    queue.add_jobs(WorkQueue.AREA, areas("a", "b", "c"))
+    first = queue.claim(WorkQueue.AREA, "w1", limit=2)
+    second = queue.claim(WorkQueue.AREA, "w2", limit=2)
+    assert [job["name"] for job in first] == ["a", "b"]
+    assert [job["name"] for job in second] == ["c"]
+    assert queue.claim(WorkQueue.AREA, "w3") == []
+
+
+def test_drained_after_complete(queue):
+    queue.add_jobs(WorkQueue.STORE, [{"url": "u1"}, {"url": "u2"}])
+    for job in queue.claim(WorkQueue.STORE, "w1", limit=2):
+        assert not queue.is_drained()
+        queue.complete(job["id"], {"Ссылка": job["url"]} if job["url"] == "u1" else None)
+    assert queue.is_drained()
+    # Пустой результат (магазин не из города) не попадает в результаты
+    assert queue.results(WorkQueue.STORE) == [{"Ссылка": "u1"}]
+
+
+def test_fail_retries_then_fails(queue):
+    queue.add_jobs(WorkQueue.AREA, areas("a"))
+    for attempt in range(3):
+        job, = queue.claim(WorkQueue.AREA, "w1")
+        queue.fail(job["id"], f"ошибка {attempt + 1}", max_attempts=3)
+    assert queue.counts() == {"failed": 1}
+    assert queue.claim(WorkQueue.AREA, "w1") == []
+
+    # Очередь пуста, но проваленное задание видно вызывающему
+    assert queue.is_drained()
+    failure, = queue.failures()
+    assert (failure["kind"], failure["key"], failure["error"]) == (WorkQueue.AREA, areas("a")[0]["url"], "ошибка 3")
+    assert queue.failures(WorkQueue.STORE) == []
+
+
+def test_release_returns_jobs_of_dead_workers(queue):
+    queue.add_jobs(WorkQueue.AREA, areas("a", "b"))
+    queue.claim(WorkQueue.AREA, "dead")
+    queue.claim(WorkQueue.AREA, "alive")
+    assert queue.release(["dead"]) == 1
+    assert queue.counts() == {"pending": 1, "running": 1}
+    assert queue.release([]) == 0
+
+
+def test_stale_jobs_are_requeued(queue):
+    queue.stale_timeout = 0.05
+    queue.add_jobs(WorkQueue.AREA, areas("a"))
+    job, = queue.claim(WorkQueue.AREA, "hung")
+    time.sleep(0.1)
+    assert queue.requeue_stale() == 1
+    job_again, = queue.claim(WorkQueue.AREA, "w2")
+    assert job_again["id"] == job["id"]
+
+
+def test_add_results_are_done(queue):
+    queue.add_results(WorkQueue.STORE, [{"Ссылка": "u1", "Адрес": "x"}])
+    queue.add_jobs(WorkQueue.STORE, [{"url": "u1"}])
+    assert queue.counts() == {"done": 1}
+    assert queue.results(WorkQueue.STORE) == [{"Ссылка": "u1", "Адрес": "x"}]
+
+
+def failing_worker(queue_path, worker_id, *args):
+    queue = WorkQueue(queue_path)
+    while True:
+        jobs = queue.claim(WorkQueue.AREA, worker_id)
+        if not jobs:
+            break
+        queue.fail(jobs[0]["id"], "браузер упал")
+    queue.close()
+
+
+def store_worker(queue_path, worker_id, *args):
+    queue = WorkQueue(queue_path)
+    for job in queue.claim(WorkQueue.AREA, worker_id, limit=10):
+        queue.add_results(WorkQueue.STORE, [{"Ссылка": f"{job['url']}shop", "Адрес": job["name"]}])
+        queue.complete(job["id"])
+    queue.add_results(WorkQueue.FRESH, [{"Ссылка": "fresh"}])
+    queue.close()
+
+
+@pytest.mark.parametrize("worker, complete", [(store_worker, True), (failing_worker, False)])
+def test_coordinator_reports_failed_jobs(tmp_path, monkeypatch, worker, complete):
+    monkeypatch.setattr(workers, "worker_process", worker)
+    results, fresh_urls, done = asyncio.run(workers.run_coordinator(
+        areas("a", "b"), queue_path=str(tmp_path / "queue.sqlite"), workers=1, poll_interval=0.05))
+    assert done is complete
+    assert len(results) == (2 if complete else 0)
+    assert fresh_urls == (["fresh"] if complete else [])
+
+
+@pytest.mark.parametrize("count, rate, burst", [(1, 0.5, 2), (2, 0.25, 1), (4, 0.125, 1), (0, 0.5, 2)])
+def test_workers_share_request_budget(count, rate, burst):
+    options = workers.worker_parser_options(CrawlConfig(requests_per_second=0.5, burst=2), count)
+    assert (options["requests_per_second"], options["burst"]) == (rate, burst)
+    assert "max_tabs" not in options
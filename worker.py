@@ -0,0 +1,28 @@
+# worker.py
+import argparse
+import asyncio
+import os
+import socket
+
+from parser.workers import run_worker
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Воркер парсера: обрабатывает задания из общей очереди")
+    arg_parser.add_argument("--queue", default="data/queue.sqlite", help="Путь к файлу очереди (SQLite)")
+    arg_parser.add_argument("--id", default=f"{socket.gethostname()}-{os.getpid()}", help="Имя воркера")
+    arg_parser.add_argument("--tabs", type=int, default=3, help="Количество вкладок браузера")
+    arg_parser.add_argument("--html-cache", metavar="DIR", help="Папка кэша сырого HTML")
+    arg_parser.add_argument("--show-browser", action="store_true", help="Запуск браузера с окном")
+    arg_parser.add_argument("--config", default="crawl.json",
+                            help="Настройки городов и запросов (тот же файл, что у координатора)")
+    arg_parser.add_argument("--workers", type=int, default=1,
+                            help="Сколько воркеров всего делят лимит запросов из настроек")
+    arg_parser.add_argument("--db", help="База магазинов для проверки свежести (вместе с --max-age)")
+    arg_parser.add_argument("--max-age", type=float, default=0, metavar="DAYS",
+                            help="Не открывать страницы магазинов, обновленных за последние DAYS дней")
+    args = arg_parser.parse_args()
+
+    asyncio.run(run_worker(args.queue, args.id, headless=not args.show_browser, max_tabs=args.tabs,
+                           html_cache_dir=args.html_cache, config_path=args.config, workers=args.workers,
+                           db_path=args.db, max_age=args.max_age))